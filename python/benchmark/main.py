@@ -0,0 +1,366 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to measure the throughput and the latency of the sample clients against the local mock API.
+Each operation is run at several concurrency levels with the unpooled requests of the original samples,
+the shared keep-alive transport of the sample clients and the async client, and the results are written as JSON
+so that two runs can be compared to catch regressions between releases.
+The pooled and async clients send every request, as the unpooled ones: the merging of identical reads in flight
+(see tidbcloud.singleflight) is measured apart by the pooled_merged and async_merged transports.
+
+    python benchmark/main.py --concurrency 1,8,64,512 --output results.json --baseline previous.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the catalog of the mock server out of the on-disk cache
+os.environ.setdefault("TIDBCLOUD_CACHE_FILE", "")
+import manage_backup.main as manage_backup_sample  # noqa: E402
+import scale_out_tiflash.main as scale_out_tiflash_sample  # noqa: E402
+from tidbcloud import auth, transport  # noqa: E402
+from tidbcloud.singleflight import Group  # noqa: E402
+from tidbcloud.mockserver import DEFAULT_PRIVATE_KEY, DEFAULT_PUBLIC_KEY  # noqa: E402
+
+OPERATIONS = ["get_cluster_by_id", "create_manual_backup", "modify_cluster", "create_restore_task"]
+TRANSPORTS = ["unpooled", "pooled", "async", "pooled_merged", "async_merged"]
+DEFAULT_CONCURRENCY = [1, 8, 64, 512]
+DEFAULT_REQUESTS = 200
+DEFAULT_TOLERANCE = 0.2
+# The root password of the clusters restored on the mock API
+ROOT_PASSWORD = "benchmark-root-password"
+RESULTS_VERSION = 1
+
+
+class _Unpooled:
+    """
+    Transport sending every request on a new connection, as the samples did before tidbcloud.transport
+    """
+
+    def request(self, method: str, url: str, **kwargs) -> requests.models.Response:
+        return requests.request(method=method, url=url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.models.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.models.Response:
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.models.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.models.Response:
+        return self.request("DELETE", url, **kwargs)
+
+
+class Target:
+    def __init__(self, url: str, project_id: str, cluster_id: str, public_key: str = DEFAULT_PUBLIC_KEY,
+                 private_key: str = DEFAULT_PRIVATE_KEY):
+        """
+        The mock API and the cluster the operations are run on
+        :param url: The mock API url
+        :param project_id: The project id
+        :param cluster_id: The Dedicated Tier cluster id, with at least one successful backup
+        :param public_key: The public key accepted by the mock API
+        :param private_key: The private key accepted by the mock API
+        """
+        self.url = url
+        self.project_id = project_id
+        self.cluster_id = cluster_id
+        self.public_key = public_key
+        self.private_key = private_key
+        self.cluster = None
+        self.backup_id = None
+
+
+def _percentile(latencies: list, p: float) -> float:
+    """
+    Nearest-rank percentile of sorted latencies, as tidbcloud.metrics
+    """
+    if not latencies:
+        return 0.0
+    return latencies[max(0, math.ceil(p / 100 * len(latencies)) - 1)]
+
+
+def _result(operation: str, transport_name: str, concurrency: int, latencies: list, errors: int,
+            seconds: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "operation": operation,
+        "transport": transport_name,
+        "concurrency": concurrency,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "seconds": seconds,
+        "ops_per_sec": len(latencies) / seconds if seconds else 0.0,
+        "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50": _percentile(latencies, 50),
+        "p95": _percentile(latencies, 95),
+        "p99": _percentile(latencies, 99),
+        "max": latencies[-1] if latencies else 0.0,
+    }
+
+
+def _sync_operation(target: Target, operation: str, client_transport):
+    """
+    Build a function calling one operation of the sample clients on the given transport
+    """
+    digest_auth = auth.PreemptiveDigestAuth(target.public_key, target.private_key)
+    backup = manage_backup_sample.ManageBackup()
+    scale = scale_out_tiflash_sample.ScaleOutTiFlash()
+    for client in (backup, scale):
+        client.transport = client_transport
+        client.digest_auth = digest_auth
+    project_id, cluster_id = target.project_id, target.cluster_id
+    return {
+        "get_cluster_by_id": lambda: scale.get_cluster_by_id(project_id, cluster_id),
+        "create_manual_backup": lambda: backup.create_manual_backup(project_id, cluster_id),
+        "modify_cluster": lambda: scale.modify_cluster(project_id, cluster_id, target.cluster),
+        "create_restore_task": lambda: backup.create_restore_task(project_id, target.backup_id, target.cluster,
+                                                                ROOT_PASSWORD),
+    }[operation]
+
+
+def _run_sync(target: Target, operation: str, transport_name: str, concurrency: int, total: int) -> dict:
+    if transport_name in ("pooled", "pooled_merged"):
+        client_transport = transport.Transport(pool_maxsize=concurrency, singleflight=Group())
+        if transport_name == "pooled":
+            # Send every call, so that the run measures the connection reuse and not the merged reads
+            client_transport.singleflight = None
+    else:
+        client_transport = _Unpooled()
+    call = _sync_operation(target, operation, client_transport)
+    # Take the digest challenge and fill the catalog cache before timing
+    call()
+    latencies = []
+    errors = 0
+    remaining = [total]
+    lock = threading.Lock()
+
+    def worker():
+        nonlocal errors
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                call()
+            except Exception:
+                with lock:
+                    errors += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    seconds = time.perf_counter() - start
+    if transport_name != "unpooled":
+        client_transport.close()
+    return _result(operation, transport_name, concurrency, latencies, errors, seconds)
+
+
+async def _run_async(target: Target, operation: str, transport_name: str, concurrency: int, total: int) -> dict:
+    from tidbcloud.aio import AsyncTiDBCloud
+
+    project_id, cluster_id = target.project_id, target.cluster_id
+    async with AsyncTiDBCloud(target.public_key, target.private_key, host=target.url, max_connections=concurrency,
+                              max_concurrency=concurrency, singleflight=Group()) as client:
+        if transport_name == "async":
+            client.singleflight = None
+        call = {
+            "get_cluster_by_id": lambda: client.get_cluster_by_id(project_id, cluster_id),
+            "create_manual_backup": lambda: client.create_manual_backup(project_id, cluster_id),
+            "modify_cluster": lambda: client.modify_cluster(project_id, cluster_id, target.cluster),
+            "create_restore_task": lambda: client.create_restore_task(project_id, target.backup_id, target.cluster,
+                                                                    ROOT_PASSWORD),
+        }[operation]
+        await call()
+        latencies = []
+        errors = 0
+        remaining = total
+
+        async def worker():
+            nonlocal errors, remaining
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                try:
+                    await call()
+                except Exception:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        seconds = time.perf_counter() - start
+    return _result(operation, transport_name, concurrency, latencies, errors, seconds)
+
+
+def _prepare(target: Target):
+    """
+    Point the sample clients at the mock API and fetch the cluster detail and a successful backup
+    """
+    for module in (manage_backup_sample, scale_out_tiflash_sample):
+        module.HOST = target.url
+    os.environ["TIDBCLOUD_PUBLIC_KEY"] = target.public_key
+    os.environ["TIDBCLOUD_PRIVATE_KEY"] = target.private_key
+    client = manage_backup_sample.ManageBackup()
+    target.cluster = client.get_cluster_by_id(target.project_id, target.cluster_id)
+    backups = client.get_backups_of_cluster(target.project_id, target.cluster_id, page_size=100)["items"]
+    succeeded = [backup for backup in backups if backup.get("status") == "SUCCESS"]
+    if not succeeded:
+        raise Exception(f"cluster {target.cluster_id} has no successful backup to restore.")
+    target.backup_id = succeeded[0]["id"]
+
+
+def run_benchmark(target: Target, operations: list = None, transports: list = None, concurrency: list = None,
+                  total: int = DEFAULT_REQUESTS, on_result=None) -> dict:
+    """
+    Run every operation with every transport at every concurrency level
+    :param target: The mock API and the cluster to run the operations on
+    :param operations: The operations, all of OPERATIONS if None
+    :param transports: The transports, all of TRANSPORTS if None
+    :param concurrency: The concurrency levels
+    :param total: The number of timed requests of each run, raised to the concurrency level
+    :param on_result: Function called with each result as soon as it is measured
+    :return: The machine-readable results
+    """
+    _prepare(target)
+    results = []
+    for operation in operations or OPERATIONS:
+        for transport_name in transports or TRANSPORTS:
+            for level in concurrency or DEFAULT_CONCURRENCY:
+                requests_count = max(total, level)
+                if transport_name.startswith("async"):
+                    result = asyncio.run(_run_async(target, operation, transport_name, level, requests_count))
+                else:
+                    result = _run_sync(target, operation, transport_name, level, requests_count)
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+    return {
+        "version": RESULTS_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+    Find the runs slower than in the baseline
+    :param baseline: Results of a previous run
+    :param current: Results of this run
+    :param tolerance: The accepted relative drop of ops/sec and rise of p99 latency
+    :return: One message per regression, empty if none
+    """
+    previous = {(result["operation"], result["transport"], result["concurrency"]): result
+                for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        key = (result["operation"], result["transport"], result["concurrency"])
+        before = previous.get(key)
+        if before is None:
+            continue
+        name = f"{result['operation']} {result['transport']} x{result['concurrency']}"
+        if result["ops_per_sec"] < before["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name} : {result['ops_per_sec']:.1f} ops/s, was {before['ops_per_sec']:.1f}")
+        if result["p99"] > before["p99"] * (1 + tolerance):
+            regressions.append(f"{name} : p99 {result['p99'] * 1000:.1f}ms, was {before['p99'] * 1000:.1f}ms")
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{name} : {result['errors']} errors, was {before['errors']}")
+    return regressions
+
+
+def _format(result: dict) -> str:
+    return (f"{result['operation']:<22}{result['transport']:<15}{result['concurrency']:>6}"
+            f"{result['ops_per_sec']:>12.1f}{result['p50'] * 1000:>10.2f}{result['p95'] * 1000:>10.2f}"
+            f"{result['p99'] * 1000:>10.2f}{result['errors']:>8}")
+
+
+def _start_mock_server(latency: float) -> tuple:
+    """
+    Start the mock API in a child process, so that it does not share the GIL with the clients
+    :return: (process, Target)
+    """
+    python_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen([sys.executable, "-m", "tidbcloud.mockserver", "--port", "0", "--latency",
+                                str(latency), "--create-seconds", "0", "--modify-seconds", "0",
+                                "--backup-seconds", "0", "--restore-seconds", "0"],
+                               cwd=python_dir, stdout=subprocess.PIPE, text=True)
+    url = project_id = cluster_id = None
+    for line in process.stdout:
+        for field in line.split():
+            key, _, value = field.partition("=")
+            if key == "TIDBCLOUD_HOST":
+                url = value
+            elif key == "DEDICATED_PROJECT_ID":
+                project_id = value
+            elif key == "DEDICATED_CLUSTER_ID":
+                cluster_id = value
+        if project_id is not None:
+            break
+    if url is None or cluster_id is None:
+        process.kill()
+        raise Exception("the mock server did not start.")
+    return process, Target(url, project_id, cluster_id)
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the sample clients against the local mock API")
+    parser.add_argument("--operations", default=",".join(OPERATIONS))
+    parser.add_argument("--transports", default=",".join(TRANSPORTS))
+    parser.add_argument("--concurrency", default=",".join(str(level) for level in DEFAULT_CONCURRENCY))
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="timed requests per run")
+    parser.add_argument("--latency", type=float, default=0.0, help="latency added by the mock server, in seconds")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="results of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+    process, target = _start_mock_server(args.latency)
+    print(f"{'operation':<22}{'transport':<15}{'conc':>6}{'ops/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'errors':>8}")
+    try:
+        results = run_benchmark(target, args.operations.split(","), args.transports.split(","),
+                                [int(level) for level in args.concurrency.split(",")], args.requests,
+                                on_result=lambda result: print(_format(result), flush=True))
+    finally:
+        process.kill()
+        process.wait()
+    results["mock_latency"] = args.latency
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        for regression in regressions:
+            print(f"regression : {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
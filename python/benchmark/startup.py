@@ -0,0 +1,225 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to measure the cold start of the `python -m tidbcloud` command, as run by a cron job: every run is a
+new Python process against the local mock API. The wall time of each subcommand and the import time of the
+modules it loads (`python -X importtime`) are written as JSON, so that two runs can be compared to catch an
+import that makes every cron job slower. With `--daemon`, the subcommands are sent to a warm tidbcloud.daemon.
+
+    python benchmark/startup.py --runs 20 --output startup.json --baseline previous.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PYTHON_DIR)
+from benchmark.main import _percentile, _start_mock_server  # noqa: E402
+
+COMMANDS = ["help", "backup", "restore", "create-cluster", "scale-tiflash", "delete"]
+DEFAULT_RUNS = 10
+DEFAULT_TOLERANCE = 0.2
+RESULTS_VERSION = 1
+
+
+def import_times(report: str) -> dict:
+    """
+    Parse the report of `python -X importtime`
+    :param report: The stderr of the process
+    :return: The cumulative import seconds of each top-level module, nested imports included
+    """
+    modules = {}
+    for line in report.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        # Nested imports are indented under the module importing them
+        if name.startswith("  "):
+            continue
+        modules[name.strip()] = modules.get(name.strip(), 0.0) + int(fields[1]) / 1e6
+    return modules
+
+
+def _command_args(command: str, target, backup_ids: list, daemon: str = None) -> list:
+    project_id, cluster_id = target.project_id, target.cluster_id
+    options = ["--host", target.url] + (["--daemon", daemon] if daemon else [])
+    if command == "help":
+        return ["--help"]
+    if command == "create-cluster":
+        return [*options, command, project_id]
+    if command == "delete":
+        return [*options, command, project_id, cluster_id, "--backup-id", backup_ids.pop()]
+    return [*options, command, project_id, cluster_id]
+
+
+def _cold_start(args: list, env: dict, importtime: bool = False) -> tuple:
+    """
+    Run `python -m tidbcloud` in a new process
+    :return: (wall seconds, completed process)
+    """
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, *(["-X", "importtime"] if importtime else []), "-m", "tidbcloud",
+                              *args], cwd=PYTHON_DIR, env=env, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if process.returncode != 0:
+        raise Exception(f"tidbcloud {' '.join(args)} failed : {process.stderr.strip()[-500:]}")
+    return seconds, process
+
+
+def _environment(target) -> dict:
+    env = dict(os.environ)
+    env.update({"TIDBCLOUD_PUBLIC_KEY": target.public_key, "TIDBCLOUD_PRIVATE_KEY": target.private_key,
+                "TIDBCLOUD_CACHE_FILE": ""})
+    return env
+
+
+def _start_daemon(target) -> tuple:
+    """
+    Start a daemon on the mock API in a child process
+    :return: (process, socket path)
+    """
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="tidbcloud-"), "daemon.sock")
+    process = subprocess.Popen([sys.executable, "-m", "tidbcloud.daemon", "--socket", socket_path, "--host",
+                                target.url], cwd=PYTHON_DIR, env=_environment(target), stdout=subprocess.PIPE,
+                               text=True)
+    for line in process.stdout:
+        if line.startswith("export TIDBCLOUD_DAEMON="):
+            return process, socket_path
+    process.kill()
+    raise Exception("the daemon did not start.")
+
+
+def run_startup(target, commands: list = None, runs: int = DEFAULT_RUNS, on_result=None, daemon: str = None) -> dict:
+    """
+    Time the cold start of every subcommand
+    :param target: The mock API and the cluster to run the subcommands on, see main.Target
+    :param commands: The subcommands, all of COMMANDS if None ("help" only parses the arguments)
+    :param runs: The number of timed processes per subcommand
+    :param on_result: Function called with each result as soon as it is measured
+    :param daemon: The address of a daemon to send the subcommands to, they run in each process if None
+    :return: The machine-readable results
+    """
+    env = _environment(target)
+    backup_ids = []
+    results = []
+    for command in commands or COMMANDS:
+        if command == "delete":
+            # Delete the backups of the backup runs, and make the missing ones without timing them
+            while len(backup_ids) < runs + 1:
+                _, process = _cold_start(_command_args("backup", target, backup_ids, daemon), env)
+                backup_ids.append(json.loads(process.stdout)["id"])
+        latencies = []
+        # The last run reports the import time and is not timed, -X importtime itself slows it down
+        for run in range(runs + 1):
+            seconds, process = _cold_start(_command_args(command, target, backup_ids, daemon), env,
+                                           importtime=run == runs)
+            if run < runs:
+                latencies.append(seconds)
+            if command == "backup":
+                backup_ids.append(json.loads(process.stdout)["id"])
+        modules = import_times(process.stderr)
+        latencies.sort()
+        result = {
+            "command": command,
+            "runs": runs,
+            "mean": sum(latencies) / len(latencies),
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "max": latencies[-1],
+            "import_seconds": sum(modules.values()),
+            "slowest_imports": dict(sorted(modules.items(), key=lambda item: item[1], reverse=True)[:5]),
+        }
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+    return {
+        "version": RESULTS_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "daemon": daemon is not None,
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+    Find the subcommands starting slower than in the baseline
+    :param baseline: Results of a previous run
+    :param current: Results of this run
+    :param tolerance: The accepted relative rise of the p50 wall time and of the import time
+    :return: One message per regression, empty if none
+    """
+    previous = {result["command"]: result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(result["command"])
+        if before is None:
+            continue
+        if result["p50"] > before["p50"] * (1 + tolerance):
+            regressions.append(f"{result['command']} : p50 {result['p50'] * 1000:.1f}ms, "
+                               f"was {before['p50'] * 1000:.1f}ms")
+        if result["import_seconds"] > before["import_seconds"] * (1 + tolerance):
+            regressions.append(f"{result['command']} : imports {result['import_seconds'] * 1000:.1f}ms, "
+                               f"was {before['import_seconds'] * 1000:.1f}ms")
+    return regressions
+
+
+def _format(result: dict) -> str:
+    slowest = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in
+                        list(result["slowest_imports"].items())[:3])
+    return (f"{result['command']:<16}{result['p50'] * 1000:>10.1f}{result['p95'] * 1000:>10.1f}"
+            f"{result['import_seconds'] * 1000:>12.1f}  {slowest}")
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the cold start of python -m tidbcloud")
+    parser.add_argument("--commands", default=",".join(COMMANDS))
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="timed processes per subcommand")
+    parser.add_argument("--output", default="startup_results.json")
+    parser.add_argument("--baseline", default=None, help="results of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--daemon", action="store_true", help="send the subcommands to a warm tidbcloud.daemon")
+    args = parser.parse_args(argv)
+    process, target = _start_mock_server(0.0)
+    processes = [process]
+    print(f"{'command':<16}{'p50 ms':>10}{'p95 ms':>10}{'imports ms':>12}  slowest imports")
+    daemon = None
+    try:
+        if args.daemon:
+            daemon_process, daemon = _start_daemon(target)
+            processes.append(daemon_process)
+        results = run_startup(target, args.commands.split(","), args.runs,
+                              on_result=lambda result: print(_format(result), flush=True), daemon=daemon)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait()
+        if daemon is not None:
+            shutil.rmtree(os.path.dirname(daemon), ignore_errors=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        for regression in regressions:
+            print(f"regression : {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import pytest
+
+pytest.importorskip("httpx")
+
+from python.benchmark.main import OPERATIONS, TRANSPORTS, Target, compare, run_benchmark  # noqa: E402
+from python.tidbcloud.mockserver import MockConfig, MockServer  # noqa: E402
+
+
+class TestBenchmark:
+    def setup_method(self):
+        self.server = MockServer(MockConfig(create_seconds=0, modify_seconds=0, backup_seconds=0,
+                                            restore_seconds=0)).start()
+        self.project_id, self.cluster_id = self.server.state.seed()[0]
+
+    def teardown_method(self):
+        self.server.stop()
+
+    def test_run_benchmark(self, monkeypatch):
+        print("test : run every operation with every transport.")
+        monkeypatch.setenv("TIDBCLOUD_PUBLIC_KEY", "public")
+        monkeypatch.setenv("TIDBCLOUD_PRIVATE_KEY", "private")
+        results = run_benchmark(Target(self.server.url, self.project_id, self.cluster_id), concurrency=[1, 4],
+                                total=8)
+
+        # assert content
+        assert len(results["results"]) == len(OPERATIONS) * len(TRANSPORTS) * 2
+        for result in results["results"]:
+            assert result["errors"] == 0
+            assert result["requests"] == 8
+            assert result["ops_per_sec"] > 0
+            assert 0 < result["p50"] <= result["p95"] <= result["p99"] <= result["max"]
+
+    def test_compare(self):
+        print("test : compare with a baseline.")
+        baseline = {"results": [{"operation": "get_cluster_by_id", "transport": "pooled", "concurrency": 8,
+                                 "ops_per_sec": 100.0, "p99": 0.010, "errors": 0}]}
+        same = {"results": [dict(baseline["results"][0], ops_per_sec=90.0)]}
+        slower = {"results": [dict(baseline["results"][0], ops_per_sec=50.0, p99=0.020)]}
+
+        # assert content
+        assert compare(baseline, same) == []
+        assert compare(baseline, slower) == ["get_cluster_by_id pooled x8 : 50.0 ops/s, was 100.0",
+                                             "get_cluster_by_id pooled x8 : p99 20.0ms, was 10.0ms"]
+
+
+if __name__ == "__main__":
+    pytest.main()
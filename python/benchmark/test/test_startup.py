@@ -0,0 +1,77 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import pytest
+
+from python.benchmark.main import Target
+from python.benchmark.startup import compare, import_times, run_startup
+from python.tidbcloud.daemon import Daemon, DaemonServer
+from python.tidbcloud.mockserver import MockConfig, MockServer
+
+REPORT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      3000 |      45000 | site
+import time:       500 |        500 |     urllib3.util
+import time:       700 |      95000 |   requests
+import time:      2000 |     100000 | tidbcloud.auth
+"""
+
+
+class TestStartup:
+    def setup_method(self):
+        self.server = MockServer(MockConfig(backup_seconds=0)).start()
+        self.project_id, self.cluster_id = self.server.state.seed(backups=0)[0]
+
+    def teardown_method(self):
+        self.server.stop()
+
+    def test_run_startup(self):
+        print("test : time the cold start of the subcommands.")
+        results = run_startup(Target(self.server.url, self.project_id, self.cluster_id),
+                              commands=["help", "backup", "delete"], runs=1)
+
+        # assert content
+        assert [result["command"] for result in results["results"]] == ["help", "backup", "delete"]
+        for result in results["results"]:
+            assert 0 < result["p50"] <= result["p95"] <= result["max"]
+            assert result["import_seconds"] > 0
+        assert "tidbcloud.cli" in results["results"][0]["slowest_imports"]
+        assert "tidbcloud.auth" in results["results"][1]["slowest_imports"]
+        # the backups of the backup runs are deleted, plus the one of the import time run of delete
+        assert self.server.state.backups == {}
+
+    def test_run_startup_with_daemon(self, tmp_path, monkeypatch):
+        print("test : time the subcommands sent to a daemon.")
+        monkeypatch.setenv("TIDBCLOUD_PUBLIC_KEY", self.server.config.public_key)
+        monkeypatch.setenv("TIDBCLOUD_PRIVATE_KEY", self.server.config.private_key)
+        with DaemonServer(Daemon(self.server.url), str(tmp_path / "daemon.sock")) as daemon_server:
+            results = run_startup(Target(self.server.url, self.project_id, self.cluster_id), commands=["backup"],
+                                  runs=1, daemon=daemon_server.address)
+
+        # assert content
+        assert results["daemon"] is True
+        assert "tidbcloud.daemon" in results["results"][0]["slowest_imports"]
+        assert "tidbcloud.auth" not in results["results"][0]["slowest_imports"]
+        assert len(self.server.state.backups) == 2
+
+    def test_import_times(self):
+        print("test : parse the import time report.")
+
+        # assert content
+        assert import_times(REPORT) == {"site": 0.045, "tidbcloud.auth": 0.1}
+
+    def test_compare(self):
+        print("test : compare with a baseline.")
+        baseline = {"results": [{"command": "backup", "p50": 0.200, "import_seconds": 0.150}]}
+        same = {"results": [dict(baseline["results"][0], p50=0.210)]}
+        slower = {"results": [dict(baseline["results"][0], p50=0.300, import_seconds=0.250)]}
+
+        # assert content
+        assert compare(baseline, same) == []
+        assert compare(baseline, slower) == ["backup : p50 300.0ms, was 200.0ms",
+                                             "backup : imports 250.0ms, was 150.0ms"]
+
+
+if __name__ == "__main__":
+    pytest.main()
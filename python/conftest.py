@@ -0,0 +1,48 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Make the shared `tidbcloud` package importable the same way the samples import it,
+and replay the recorded API exchanges of the sample tests.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tidbcloud import cache, cassette, transport  # noqa: E402
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers",
+                            "cassette: replay the recorded API exchanges of the test, see tidbcloud.cassette")
+
+
+@pytest.fixture(autouse=True)
+def memory_catalog_cache(monkeypatch):
+    """
+    Keep the catalog cache of every test in memory, so that tests neither read nor write ~/.cache
+    """
+    monkeypatch.setattr(cache, "_shared_cache", cache.CatalogCache(path=""))
+
+
+@pytest.fixture(autouse=True)
+def api_cassette(request, monkeypatch):
+    """
+    Replay the recorded API exchanges of the tests marked with `cassette`, from test/cassettes/<class>.<test>.json
+    Autouse, so that the exchanges of setup_method and teardown_method are replayed too.
+    """
+    if request.node.get_closest_marker("cassette") is None:
+        yield None
+        return
+    name = f"{request.node.cls.__name__}.{request.node.name}.json" if request.node.cls else f"{request.node.name}.json"
+    recording = cassette.Cassette(os.path.join(os.path.dirname(str(request.node.fspath)), "cassettes", name))
+    if recording.replaying:
+        for key, value in recording.env.items():
+            monkeypatch.setenv(key, value)
+        # The clients need an API key, it is never recorded
+        for key in ("TIDBCLOUD_PUBLIC_KEY", "TIDBCLOUD_PRIVATE_KEY"):
+            if key not in os.environ:
+                monkeypatch.setenv(key, "replay")
+    with recording.use(transport.get_transport().session):
+        yield recording
@@ -6,13 +6,15 @@ Shows how to create a TiDB cluster and get cluster's detail.
 """
 import json
 import os
-import time
+import sys
 
 import requests
-from requests.auth import HTTPDigestAuth
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tidbcloud import auth, cache, catalog, log, pagination, payloads, preflight, transport  # noqa: E402
 
 # Basic config
-HOST = "https://api.tidbcloud.com"
+HOST = os.environ.get("TIDBCLOUD_HOST", "https://api.tidbcloud.com")
 
 
 class CreateDedicatedCluster:
@@ -21,26 +23,43 @@ class CreateDedicatedCluster:
         Generate authorization by public key and private key (https://tidbcloud.com/console/clusters)
         """
         self.digest_auth = _authorization()
+        self.transport = transport.get_transport()
 
-    def get_all_projects(self):
+    def get_all_projects(self, page: int = 1, page_size: int = 10):
         """
         Get all projects
+        Use pagination.iter_projects to walk all the pages lazily.
+        :param page: The page number
+        :param page_size: The page size
         :return: Projects detail
         """
-        url = f"{HOST}/api/v1beta/projects"
-        resp = requests.get(url=url, auth=self.digest_auth)
-        print(f"Method: {resp.request.method}, Request: {url}")
+        url = f"{HOST}/api/v1beta/projects?page={page}&page_size={page_size}"
+        resp = self.transport.get(url=url, auth=self.digest_auth)
+        log.log_request(resp.request.method, url)
+        return _response(resp)
+
+    def get_clusters_of_project(self, project_id: str, page: int = 1, page_size: int = 10):
+        """
+        Get the clusters of a project
+        Use pagination.iter_clusters to walk all the pages lazily.
+        :param project_id: The project id
+        :param page: The page number
+        :param page_size: The page size
+        :return: Clusters detail
+        """
+        url = f"{HOST}/api/v1beta/projects/{project_id}/clusters?page={page}&page_size={page_size}"
+        resp = self.transport.get(url=url, auth=self.digest_auth)
+        log.log_request(resp.request.method, url)
         return _response(resp)
 
     def get_provider_regions_specifications(self):
         """
         Get cloud providers, regions and available specifications.
+        The catalog is cached in memory and on disk, see tidbcloud.cache.
         :return: List the cloud providers, regions and available specifications.
         """
         url = f"{HOST}/api/v1beta/clusters/provider/regions"
-        resp = requests.get(url=url, auth=self.digest_auth)
-        print(f"Method: {resp.request.method}, Request: {url}")
-        return _response(resp)
+        return cache.get_catalog_cache().fetch(self.transport, url, self.digest_auth)
 
     def create_dedicated_cluster(self, project_id: str, dedicated_config: dict) -> dict:
         """
@@ -49,58 +68,15 @@ class CreateDedicatedCluster:
         :param dedicated_config: The dedicated config
         :return: Dedicated cluster id
         """
-        try:
-            region = dedicated_config["region"]
-            cloud_provider = dedicated_config["cloud_provider"]
-            tidb_size = dedicated_config["tidb"][0]["node_size"]
-            tidb_quantity_range = dedicated_config["tidb"][0]["node_quantity_range"]["min"]
-            tikv_size = dedicated_config["tikv"][0]["node_size"]
-            tikv_quantity_range = dedicated_config["tikv"][0]["node_quantity_range"]["min"]
-            tikv_storage_size_gib_range = dedicated_config["tikv"][0]["storage_size_gib_range"]["min"]
-        except (KeyError, IndexError) as e:
-            print(f"cloud provider or region or available specifications not found! exception: {e}")
-            raise
         url = f"{HOST}/api/v1beta/projects/{project_id}/clusters"
-        ts = int(time.time())
-        data_config = \
-            {
-                "name": f"tidbcloud-sample-{ts}",
-                "cluster_type": "DEDICATED",
-                "cloud_provider": f"{cloud_provider}",
-                "region": f"{region}",
-                "config":
-                    {
-                        "root_password": "input_your_password",
-                        "port": 4000,
-                        "components":
-                            {
-                                "tidb":
-                                    {
-                                        "node_size": f"{tidb_size}",
-                                        "node_quantity": f"{tidb_quantity_range}"
-                                    },
-                                "tikv":
-                                    {
-                                        "node_size": f"{tikv_size}",
-                                        "storage_size_gib": f"{tikv_storage_size_gib_range}",
-                                        "node_quantity": f"{tikv_quantity_range}"
-                                    }
-                            },
-                        "ip_access_list":
-                            [
-                                {
-                                    "cidr": "0.0.0.0/0",
-                                    "description": "Allow Access from Anywhere."
-                                }
-                            ]
-
-                    }
-            }
+        data_config = payloads.dedicated_cluster_payload(dedicated_config)
+        # Reject an invalid shape locally instead of after a round trip
+        preflight.check_cluster(data_config, catalog.RegionSpec(dedicated_config))
         data_config_json = json.dumps(data_config)
-        resp = requests.post(url=url,
-                             auth=self.digest_auth,
-                             data=data_config_json)
-        print(f"Method: {resp.request.method}, Request: {url}, Payload: {data_config_json}")
+        resp = self.transport.post(url=url,
+                                   auth=self.digest_auth,
+                                   data=data_config_json)
+        log.log_request(resp.request.method, url, data_config_json)
         return _response(resp)
 
     def get_cluster_by_id(self, project_id: str, cluster_id: str) -> dict:
@@ -113,9 +89,9 @@ class CreateDedicatedCluster:
         :return: The cluster detail
         """
         url = f"{HOST}/api/v1beta/projects/{project_id}/clusters/{cluster_id}"
-        resp = requests.get(url=url,
-                            auth=self.digest_auth)
-        print(f"Method: {resp.request.method}, Request: {url}")
+        resp = self.transport.get(url=url,
+                                  auth=self.digest_auth)
+        log.log_request(resp.request.method, url)
         return _response(resp)
 
     def delete_cluster(self, project_id: str, cluster_id: str) -> dict:
@@ -126,9 +102,9 @@ class CreateDedicatedCluster:
         :return: Result for deletion
         """
         url = f"{HOST}/api/v1beta/projects/{project_id}/clusters/{cluster_id}"
-        resp = requests.delete(url=url,
-                               auth=self.digest_auth)
-        print(f"Method: {resp.request.method}, Request: {url}")
+        resp = self.transport.delete(url=url,
+                                     auth=self.digest_auth)
+        log.log_request(resp.request.method, url)
         return _response(resp)
 
 
@@ -137,13 +113,7 @@ def _authorization():
     Generate authorization by public key and private key (https://tidbcloud.com/console/clusters)
     :return: Digest auth
     """
-    public_key = os.environ.get("TIDBCLOUD_PUBLIC_KEY", None)
-    private_key = os.environ.get("TIDBCLOUD_PRIVATE_KEY", None)
-    if public_key is None or private_key is None:
-        print("TIDBCLOUD_PUBLIC_KEY or TIDBCLOUD_PRIVATE_KEY is None, you should set TIDBCLOUD_PUBLIC_KEY and "
-              "TIDBCLOUD_PRIVATE_KEY firstly.")
-        raise Exception("TIDBCLOUD_PUBLIC_KEY or TIDBCLOUD_PRIVATE_KEY not set.")
-    return HTTPDigestAuth(public_key, private_key)
+    return auth.PreemptiveDigestAuth(*auth.credentials())
 
 
 def _response(resp: requests.models.Response) -> dict:
@@ -153,43 +123,37 @@ def _response(resp: requests.models.Response) -> dict:
     :return: Format response
     """
     if resp.status_code != 200:
-        print(f"request invalid, code : {resp.status_code}, message : {resp.text}")
+        log.log_error(resp)
         raise Exception(f"request invalid, code : {resp.status_code}, message : {resp.text}")
-    print(f"response : {resp.text}")
+    log.log_response(resp)
     return resp.json()
 
 
-def _get_dedicated_config(provider_region_specifications: dict) -> dict:
+def _get_dedicated_config(provider_region_specifications: dict, cloud_provider: str = None,
+                          region: str = None) -> dict:
     """
     Get cloud providers, regions and available specifications of dedicated
     :param provider_region_specifications: Result of  cloud providers, regions and available specifications
+    :param cloud_provider: The wanted cloud provider, any if None
+    :param region: The wanted region, any of the cloud provider if None
     :return: Available dedicated config
     """
-    try:
-        items = provider_region_specifications["items"]
-        for item in items:
-            if item["cluster_type"] == "DEDICATED":
-                return item
-    except KeyError:
-        print("dedicate config not found!")
-        raise
-    raise Exception("dedicate config not found!")
+    return catalog.get_catalog(provider_region_specifications).require("DEDICATED", cloud_provider, region).item
 
 
 def usage_demo():
+    log.setup()
     print("-" * 88)
     print("Welcome to the TiDB Cloud API samples!")
     print("-" * 88)
 
     create_cluster = CreateDedicatedCluster()
 
-    print("1. Get all projects. ")
-    projects = create_cluster.get_all_projects()
+    print("1. Get the first project. ")
     try:
-        items = projects["items"]
-        if len(items) > 0:
-            sample_project_id = items[0]["id"]
-    except KeyError:
+        # Stops after the first page, the other pages are never fetched
+        sample_project_id = next(pagination.iter_projects(create_cluster))["id"]
+    except (KeyError, StopIteration):
         print("project id not found!")
         raise
     print()
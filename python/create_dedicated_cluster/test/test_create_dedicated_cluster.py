@@ -8,6 +8,7 @@ import pytest
 from python.create_dedicated_cluster.main import CreateDedicatedCluster
 
 
+@pytest.mark.cassette
 class TestCreateCluster:
     def setup_method(self):
         self.create_cluster = CreateDedicatedCluster()
@@ -6,13 +6,16 @@ Shows how to create a TiDB cluster and get cluster's detail.
 """
 import json
 import os
+import sys
 import time
 
 import requests
-from requests.auth import HTTPDigestAuth
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tidbcloud import auth, cache, catalog, log, pagination, transport  # noqa: E402
 
 # Basic config
-HOST = "https://api.tidbcloud.com"
+HOST = os.environ.get("TIDBCLOUD_HOST", "https://api.tidbcloud.com")
 
 
 class CreateDeveloperCluster:
@@ -21,26 +24,43 @@ class CreateDeveloperCluster:
         Generate authorization by public key and private key (https://tidbcloud.com/console/clusters)
         """
         self.digest_auth = _authorization()
+        self.transport = transport.get_transport()
 
-    def get_all_projects(self):
+    def get_all_projects(self, page: int = 1, page_size: int = 10):
         """
         Get all projects
+        Use pagination.iter_projects to walk all the pages lazily.
+        :param page: The page number
+        :param page_size: The page size
         :return: Projects detail
         """
-        url = f"{HOST}/api/v1beta/projects"
-        resp = requests.get(url=url, auth=self.digest_auth)
-        print(f"Method: {resp.request.method}, Request: {url}")
+        url = f"{HOST}/api/v1beta/projects?page={page}&page_size={page_size}"
+        resp = self.transport.get(url=url, auth=self.digest_auth)
+        log.log_request(resp.request.method, url)
+        return _response(resp)
+
+    def get_clusters_of_project(self, project_id: str, page: int = 1, page_size: int = 10):
+        """
+        Get the clusters of a project
+        Use pagination.iter_clusters to walk all the pages lazily.
+        :param project_id: The project id
+        :param page: The page number
+        :param page_size: The page size
+        :return: Clusters detail
+        """
+        url = f"{HOST}/api/v1beta/projects/{project_id}/clusters?page={page}&page_size={page_size}"
+        resp = self.transport.get(url=url, auth=self.digest_auth)
+        log.log_request(resp.request.method, url)
         return _response(resp)
 
     def get_provider_regions_specifications(self):
         """
         Get cloud providers, regions and available specifications.
+        The catalog is cached in memory and on disk, see tidbcloud.cache.
         :return: List the cloud providers, regions and available specifications.
         """
         url = f"{HOST}/api/v1beta/clusters/provider/regions"
-        resp = requests.get(url=url, auth=self.digest_auth)
-        print(f"Method: {resp.request.method}, Request: {url}")
-        return _response(resp)
+        return cache.get_catalog_cache().fetch(self.transport, url, self.digest_auth)
 
     def create_developer_cluster(self, project_id: str, region: str) -> dict:
         """
@@ -71,10 +91,10 @@ class CreateDeveloperCluster:
                     }
             }
         data_config_json = json.dumps(data_config)
-        resp = requests.post(url=url,
-                             auth=self.digest_auth,
-                             data=data_config_json)
-        print(f"Method: {resp.request.method}, Request: {url}, Payload: {data_config_json}")
+        resp = self.transport.post(url=url,
+                                   auth=self.digest_auth,
+                                   data=data_config_json)
+        log.log_request(resp.request.method, url, data_config_json)
         return _response(resp)
 
     def get_cluster_by_id(self, project_id: str, cluster_id: str) -> dict:
@@ -86,8 +106,8 @@ class CreateDeveloperCluster:
         :param cluster_id: The cluster id
         :return: The cluster detail
         """
-        resp = requests.get(url=f"{HOST}/api/v1beta/projects/{project_id}/clusters/{cluster_id}",
-                            auth=self.digest_auth)
+        resp = self.transport.get(url=f"{HOST}/api/v1beta/projects/{project_id}/clusters/{cluster_id}",
+                                  auth=self.digest_auth)
         return _response(resp)
 
     def delete_cluster(self, project_id: str, cluster_id: str) -> dict:
@@ -98,9 +118,9 @@ class CreateDeveloperCluster:
         :return: Result for deletion
         """
         url = f"{HOST}/api/v1beta/projects/{project_id}/clusters/{cluster_id}"
-        resp = requests.delete(url=url,
-                               auth=self.digest_auth)
-        print(f"Method: {resp.request.method}, Request: {url}")
+        resp = self.transport.delete(url=url,
+                                     auth=self.digest_auth)
+        log.log_request(resp.request.method, url)
         return _response(resp)
 
 
@@ -109,13 +129,7 @@ def _authorization():
     Generate authorization by public key and private key (https://tidbcloud.com/console/clusters)
     :return: Digest auth
     """
-    public_key = os.environ.get("TIDBCLOUD_PUBLIC_KEY", None)
-    private_key = os.environ.get("TIDBCLOUD_PRIVATE_KEY", None)
-    if public_key is None or private_key is None:
-        print("TIDBCLOUD_PUBLIC_KEY or TIDBCLOUD_PRIVATE_KEY is None, you should set TIDBCLOUD_PUBLIC_KEY and "
-              "TIDBCLOUD_PRIVATE_KEY firstly.")
-        raise Exception("TIDBCLOUD_PUBLIC_KEY or TIDBCLOUD_PRIVATE_KEY not set.")
-    return HTTPDigestAuth(public_key, private_key)
+    return auth.PreemptiveDigestAuth(*auth.credentials())
 
 
 def _response(resp: requests.models.Response) -> dict:
@@ -125,44 +139,35 @@ def _response(resp: requests.models.Response) -> dict:
     :return: Format response
     """
     if resp.status_code != 200:
-        print(f"request invalid, code : {resp.status_code}, message : {resp.text}")
+        log.log_error(resp)
         raise Exception(f"request invalid, code : {resp.status_code}, message : {resp.text}")
-    print(f"response : {resp.text}")
+    log.log_response(resp)
     return resp.json()
 
 
-def _get_developer_region(provider_region_specifications: dict) -> str:
+def _get_developer_region(provider_region_specifications: dict, cloud_provider: str = "AWS") -> str:
     """
     Get a available region
     :param provider_region_specifications: Result of  cloud providers, regions and available specifications
+    :param cloud_provider: The cloud provider of the developer cluster
     :return: A available region
     """
-    try:
-        items = provider_region_specifications["items"]
-        for item in items:
-            if item["cluster_type"] == "DEVELOPER":
-                region = item["region"]
-                return region
-    except KeyError:
-        print("developer region not found!")
-        raise
-    raise Exception("developer region not found!")
+    return catalog.get_catalog(provider_region_specifications).require("DEVELOPER", cloud_provider).region
 
 
 def usage_demo():
+    log.setup()
     print("-" * 88)
     print("Welcome to the TiDB Cloud API samples!")
     print("-" * 88)
 
     create_cluster = CreateDeveloperCluster()
 
-    print("1. Get all projects. ")
-    projects = create_cluster.get_all_projects()
+    print("1. Get the first project. ")
     try:
-        items = projects["items"]
-        if len(items) > 0:
-            sample_project_id = items[0]["id"]
-    except KeyError:
+        # Stops after the first page, the other pages are never fetched
+        sample_project_id = next(pagination.iter_projects(create_cluster))["id"]
+    except (KeyError, StopIteration):
         print("project id not found!")
         raise
     print()
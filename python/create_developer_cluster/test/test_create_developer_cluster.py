@@ -8,6 +8,7 @@ import pytest
 from python.create_developer_cluster.main import CreateDeveloperCluster
 
 
+@pytest.mark.cassette
 class TestCreateCluster:
     def setup_method(self):
         self.create_cluster = CreateDeveloperCluster()
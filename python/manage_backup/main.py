@@ -7,12 +7,15 @@ Shows how to  create a manual backup cyclically and restore last backup data to
 import datetime
 import json
 import os
+import sys
 
 import requests
-from requests.auth import HTTPDigestAuth
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tidbcloud import auth, cache, catalog, log, payloads, preflight, transport, waiter  # noqa: E402
 
 # Basic config
-HOST = "https://api.tidbcloud.com"
+HOST = os.environ.get("TIDBCLOUD_HOST", "https://api.tidbcloud.com")
 
 
 class ManageBackup:
@@ -21,6 +24,7 @@ class ManageBackup:
         Generate authorization by public key and private key (https://tidbcloud.com/console/clusters)
         """
         self.digest_auth = _authorization()
+        self.transport = transport.get_transport()
 
     def create_manual_backup(self, project_id: str, cluster_id: str) -> dict:
         """
@@ -33,10 +37,10 @@ class ManageBackup:
         cur_date = datetime.datetime.now().strftime("%Y-%m-%d")
         data_for_backup = {"name": f"tidbcloud-backup-{cur_date}", "description": f"tidbcloud-backup-{cur_date}"}
         data_for_backup_json = json.dumps(data_for_backup)
-        resp = requests.post(url=url,
-                             data=data_for_backup_json,
-                             auth=self.digest_auth)
-        print(f"Method: {resp.request.method}, Request: {url}, Payload:{data_for_backup_json}")
+        resp = self.transport.post(url=url,
+                                   data=data_for_backup_json,
+                                   auth=self.digest_auth)
+        log.log_request(resp.request.method, url, data_for_backup_json)
         return _response(resp)
 
     def get_backup_info(self, project_id: str, cluster_id: str, backup_id: str) -> dict:
@@ -48,9 +52,25 @@ class ManageBackup:
         :return: The backup detail
         """
         url = f"{HOST}/api/v1beta/projects/{project_id}/clusters/{cluster_id}/backups/{backup_id}"
-        resp = requests.get(url=url,
-                            auth=self.digest_auth)
-        print(f"Method: {resp.request.method}, Request: {url}")
+        resp = self.transport.get(url=url,
+                                  auth=self.digest_auth)
+        log.log_request(resp.request.method, url)
+        return _response(resp)
+
+    def get_backups_of_cluster(self, project_id: str, cluster_id: str, page: int = 1, page_size: int = 10) -> dict:
+        """
+        Get the backups of a cluster
+        Use pagination.iter_backups to walk all the pages lazily.
+        :param project_id: The project id
+        :param cluster_id: The cluster id
+        :param page: The page number
+        :param page_size: The page size
+        :return: Backups detail
+        """
+        url = f"{HOST}/api/v1beta/projects/{project_id}/clusters/{cluster_id}/backups" \
+              f"?page={page}&page_size={page_size}"
+        resp = self.transport.get(url=url, auth=self.digest_auth)
+        log.log_request(resp.request.method, url)
         return _response(resp)
 
     def delete_backup(self, project_id: str, cluster_id: str, backup_id: str) -> dict:
@@ -62,113 +82,43 @@ class ManageBackup:
         :return:
         """
         url = f"{HOST}/api/v1beta/projects/{project_id}/clusters/{cluster_id}/backups/{backup_id}"
-        resp = requests.delete(url=url,
-                               auth=self.digest_auth)
-        print(f"Method: {resp.request.method}, Request: {url}")
+        resp = self.transport.delete(url=url,
+                                     auth=self.digest_auth)
+        log.log_request(resp.request.method, url)
         return _response(resp)
 
-    def create_restore_task(self, project_id: str, back_up_id: str, dedicated_config: dict) -> dict:
+    def get_dedicated_region_specifications(self, cloud_provider: str = None,
+                                            region: str = None) -> catalog.RegionSpec:
+        """
+        Get the dedicated specifications of a region.
+        The catalog is cached in memory and on disk, see tidbcloud.cache.
+        :param cloud_provider: The cloud provider, any if None
+        :param region: The region, any of the cloud provider if None
+        :return: The region specifications
+        """
+        url = f"{HOST}/api/v1beta/clusters/provider/regions"
+        resp_body = cache.get_catalog_cache().fetch(self.transport, url, self.digest_auth)
+        return catalog.get_catalog(resp_body).require("DEDICATED", cloud_provider, region)
+
+    def create_restore_task(self, project_id: str, back_up_id: str, dedicated_config: dict,
+                            root_password: str) -> dict:
         """
         Create restore task
         :param project_id: The project id
         :param back_up_id: The backup id
         :param dedicated_config: The dedicated cluster config
+        :param root_password: The root password of the new cluster
         :return: The restore task id
         """
-        try:
-            tidb_size = dedicated_config["config"]["components"]["tidb"]["node_size"]
-            tidb_quantity_range = dedicated_config["config"]["components"]["tidb"]["node_quantity"]
-            tikv_size = dedicated_config["config"]["components"]["tikv"]["node_size"]
-            tikv_quantity_range = dedicated_config["config"]["components"]["tikv"]["node_quantity"]
-            tikv_storage_size_gib_range = dedicated_config["config"]["components"]["tikv"]["storage_size_gib"]
-            tiflash_exist = False
-            if dedicated_config["config"]["components"]["tiflash"] is not None:
-                tiflash_exist = True
-                tiflash_size = dedicated_config["config"]["components"]["tiflash"]["node_size"]
-                tiflash_quantity_range = dedicated_config["config"]["components"]["tiflash"]["node_quantity"]
-                tiflash_storage_size_gib_range = dedicated_config["config"]["components"]["tiflash"]["storage_size_gib"]
-        except KeyError:
-            print("cloud provider or region or available specifications not found!")
-            raise
         url = f"{HOST}/api/v1beta/projects/{project_id}/restores"
-        cur_date = datetime.datetime.now().strftime("%Y-%m-%d")
-        if tiflash_exist:
-            data_for_restore = \
-                {
-                    "backup_id": f"{back_up_id}",
-                    "name": f"tidbcloud-restore-{cur_date}",
-                    "config":
-                        {
-                            "root_password": "input_your_password",
-                            "port": 4000,
-                            "components":
-                                {
-                                    "tidb":
-                                        {
-                                            "node_size": f"{tidb_size}",
-                                            "node_quantity": f"{tidb_quantity_range}"
-                                        },
-                                    "tikv":
-                                        {
-                                            "node_size": f"{tikv_size}",
-                                            "storage_size_gib": f"{tikv_storage_size_gib_range}",
-                                            "node_quantity": f"{tikv_quantity_range}"
-                                        },
-                                    "tiflash":
-                                        {
-                                            "node_size": f"{tiflash_size}",
-                                            "storage_size_gib": f"{tiflash_storage_size_gib_range}",
-                                            "node_quantity": f"{tiflash_quantity_range}"
-                                        }
-
-                                },
-                            "ip_access_list":
-                                [
-                                    {
-                                        "cidr": "0.0.0.0/0",
-                                        "description": "Allow Access from Anywhere."
-                                    }
-                                ]
-
-                        }
-                }
-        else:
-            data_for_restore = \
-                {
-                    "backup_id": f"{back_up_id}",
-                    "name": f"tidbcloud-restore-{cur_date}",
-                    "config":
-                        {
-                            "root_password": "input_your_password",
-                            "port": 4000,
-                            "components":
-                                {
-                                    "tidb":
-                                        {
-                                            "node_size": f"{tidb_size}",
-                                            "node_quantity": f"{tidb_quantity_range}"
-                                        },
-                                    "tikv":
-                                        {
-                                            "node_size": f"{tikv_size}",
-                                            "storage_size_gib": f"{tikv_storage_size_gib_range}",
-                                            "node_quantity": f"{tikv_quantity_range}"
-                                        }
-                                },
-                            "ip_access_list":
-                                [
-                                    {
-                                        "cidr": "0.0.0.0/0",
-                                        "description": "Allow Access from Anywhere."
-                                    }
-                                ]
-
-                        }
-                }
+        data_for_restore = payloads.restore_payload(back_up_id, dedicated_config, root_password)
+        # Reject an invalid shape locally instead of after a round trip
+        preflight.check_cluster(data_for_restore, self.get_dedicated_region_specifications(
+            dedicated_config.get("cloud_provider"), dedicated_config.get("region")))
         data_for_restore_json = json.dumps(data_for_restore)
-        resp = requests.post(url=url, auth=self.digest_auth,
-                             data=data_for_restore_json)
-        print(f"Method: {resp.request.method}, Request: {url}, Payload:{data_for_restore_json}")
+        resp = self.transport.post(url=url, auth=self.digest_auth,
+                                   data=data_for_restore_json)
+        log.log_request(resp.request.method, url, data_for_restore_json)
         return _response(resp)
 
     def get_cluster_by_id(self, project_id: str, cluster_id: str) -> dict:
@@ -181,9 +131,9 @@ class ManageBackup:
         :return: The cluster detail
         """
         url = f"{HOST}/api/v1beta/projects/{project_id}/clusters/{cluster_id}"
-        resp = requests.get(url=url,
-                            auth=self.digest_auth)
-        print(f"Method: {resp.request.method}, Request: {url}")
+        resp = self.transport.get(url=url,
+                                  auth=self.digest_auth)
+        log.log_request(resp.request.method, url)
         return _response(resp)
 
     def delete_cluster(self, project_id: str, cluster_id: str) -> dict:
@@ -194,9 +144,9 @@ class ManageBackup:
         :return: Result for deletion
         """
         url = f"{HOST}/api/v1beta/projects/{project_id}/clusters/{cluster_id}"
-        resp = requests.delete(url=url,
-                               auth=self.digest_auth)
-        print(f"Method: {resp.request.method}, Request: {url}")
+        resp = self.transport.delete(url=url,
+                                     auth=self.digest_auth)
+        log.log_request(resp.request.method, url)
         return _response(resp)
 
 
@@ -205,13 +155,19 @@ def _authorization():
     Generate authorization by public key and private key (https://tidbcloud.com/console/clusters)
     :return: Digest auth
     """
-    public_key = os.environ.get("TIDBCLOUD_PUBLIC_KEY", None)
-    private_key = os.environ.get("TIDBCLOUD_PRIVATE_KEY", None)
-    if public_key is None or private_key is None:
-        print("TIDBCLOUD_PUBLIC_KEY or TIDBCLOUD_PRIVATE_KEY is None, you should set TIDBCLOUD_PUBLIC_KEY and "
-              "TIDBCLOUD_PRIVATE_KEY firstly.")
-        raise Exception("TIDBCLOUD_PUBLIC_KEY or TIDBCLOUD_PRIVATE_KEY not set.")
-    return HTTPDigestAuth(public_key, private_key)
+    return auth.PreemptiveDigestAuth(*auth.credentials())
+
+
+def _root_password() -> str:
+    """
+    The root password of the restored clusters, from TIDBCLOUD_ROOT_PASSWORD
+    :return: The root password
+    """
+    root_password = os.environ.get("TIDBCLOUD_ROOT_PASSWORD", None)
+    if not root_password:
+        print("TIDBCLOUD_ROOT_PASSWORD is None, you should set the root password of the restored cluster firstly.")
+        raise Exception("TIDBCLOUD_ROOT_PASSWORD not set!")
+    return root_password
 
 
 def _response(resp: requests.models.Response) -> dict:
@@ -221,13 +177,14 @@ def _response(resp: requests.models.Response) -> dict:
     :return: Format response
     """
     if resp.status_code != 200:
-        print(f"request invalid, code : {resp.status_code}, message : {resp.text}")
+        log.log_error(resp)
         raise Exception(f"request invalid, code : {resp.status_code}, message : {resp.text}")
-    print(f"response : {resp.text}")
+    log.log_response(resp)
     return resp.json()
 
 
 def usage_demo():
+    log.setup()
     print("-" * 88)
     print("Welcome to the TiDB Cloud API samples!")
     print("-" * 88)
@@ -240,6 +197,7 @@ def usage_demo():
             "DEDICATED_PROJECT_ID or DEDICATED_CLUSTER_ID is None, you should set DEDICATED_PROJECT_ID and "
             "DEDICATED_CLUSTER_ID firstly.")
         raise Exception("DEDICATED_PROJECT_ID or DEDICATED_CLUSTER_ID not set!")
+    root_password = _root_password()
 
     print("1. Create a manual backup.")
     backup = manage_backup.create_manual_backup(dedicated_project_id, dedicated_cluster_id)
@@ -254,20 +212,21 @@ def usage_demo():
     manage_backup.get_backup_info(dedicated_project_id, dedicated_cluster_id, sample_backup_id)
     print()
 
-    # # tips: wait until backup completed before restore
-    # print("3. Restore backup data to a new cluster.")
-    # dedicated_cluster_detail = manage_backup.get_cluster_by_id(dedicated_project_id, dedicated_cluster_id)
-    # restore = manage_backup.create_restore_task(dedicated_project_id, sample_backup_id, dedicated_cluster_detail)
-    # try:
-    #     sample_restore_cluster_id = restore["cluster_id"]
-    # except KeyError:
-    #     print("the restore cluster id not found!")
-    #     raise
-    # print()
-    #
-    # print(f"4. Get the new cluster ( cluster id : {sample_restore_cluster_id} ) detail.")
-    # manage_backup.get_cluster_by_id(dedicated_project_id, sample_restore_cluster_id)
-    # print()
+    print("3. Wait until the backup is completed, then restore backup data to a new cluster.")
+    waiter.wait_for_backup(manage_backup, dedicated_project_id, dedicated_cluster_id, sample_backup_id)
+    dedicated_cluster_detail = manage_backup.get_cluster_by_id(dedicated_project_id, dedicated_cluster_id)
+    restore = manage_backup.create_restore_task(dedicated_project_id, sample_backup_id, dedicated_cluster_detail,
+                                                root_password)
+    try:
+        sample_restore_cluster_id = restore["cluster_id"]
+    except KeyError:
+        print("the restore cluster id not found!")
+        raise
+    print()
+
+    print(f"4. Wait until the new cluster ( cluster id : {sample_restore_cluster_id} ) is available.")
+    waiter.wait_for_cluster(manage_backup, dedicated_project_id, sample_restore_cluster_id)
+    print()
 
     # # tear down if necessary
     # print("If necessary , delete the backup.")
@@ -281,5 +240,107 @@ def usage_demo():
     print("-" * 88)
 
 
+def fleet_usage_demo():
+    log.setup()
+    print("-" * 88)
+    print("Welcome to the TiDB Cloud API samples!")
+    print("-" * 88)
+
+    # Imported here so that the single cluster demo does not need httpx
+    import asyncio
+    from tidbcloud import aio, fleet
+
+    dedicated_project_ids = os.environ.get("DEDICATED_PROJECT_IDS", None)
+    if dedicated_project_ids is None:
+        print("DEDICATED_PROJECT_IDS is None, you should set DEDICATED_PROJECT_IDS (comma separated) firstly.")
+        raise Exception("DEDICATED_PROJECT_IDS not set!")
+    project_ids = [project_id.strip() for project_id in dedicated_project_ids.split(",") if project_id.strip()]
+
+    async def run():
+        async with aio.AsyncTiDBCloud() as client:
+            return await fleet.backup_fleet(client, project_ids=project_ids)
+
+    print(f"1. Create a manual backup for every Dedicated Tier cluster of projects {project_ids} and wait for them.")
+    report = asyncio.run(run())
+    print(report.summary())
+    print()
+
+    print("Thanks for watching!")
+    print("-" * 88)
+
+
+def drill_usage_demo():
+    log.setup()
+    print("-" * 88)
+    print("Welcome to the TiDB Cloud API samples!")
+    print("-" * 88)
+
+    # Imported here so that the single cluster demo does not need httpx
+    import asyncio
+    from tidbcloud import aio, restore
+
+    dedicated_project_id = os.environ.get("DEDICATED_PROJECT_ID", None)
+    dedicated_cluster_ids = os.environ.get("DEDICATED_CLUSTER_IDS", None)
+    if dedicated_project_id is None or dedicated_cluster_ids is None:
+        print("DEDICATED_PROJECT_ID or DEDICATED_CLUSTER_IDS is None, you should set DEDICATED_PROJECT_ID and "
+              "DEDICATED_CLUSTER_IDS (comma separated) firstly.")
+        raise Exception("DEDICATED_PROJECT_ID or DEDICATED_CLUSTER_IDS not set!")
+    clusters = [(dedicated_project_id, cluster_id.strip()) for cluster_id in dedicated_cluster_ids.split(",")
+                if cluster_id.strip()]
+    root_password = _root_password()
+
+    async def run():
+        async with aio.AsyncTiDBCloud() as client:
+            return await restore.restore_drill(client, clusters, root_password)
+
+    print(f"1. Restore the latest backup of clusters {[cluster_id for _, cluster_id in clusters]} "
+          f"and wait until the new clusters are available.")
+    report = asyncio.run(run())
+    print(report.summary())
+    print()
+
+    print("Thanks for watching!")
+    print("-" * 88)
+
+
+def gc_usage_demo(dry_run: bool = True):
+    log.setup()
+    print("-" * 88)
+    print("Welcome to the TiDB Cloud API samples!")
+    print("-" * 88)
+
+    # Imported here so that the single cluster demo does not need httpx
+    import asyncio
+    from tidbcloud import aio, retention
+
+    dedicated_project_ids = os.environ.get("DEDICATED_PROJECT_IDS", None)
+    if dedicated_project_ids is None:
+        print("DEDICATED_PROJECT_IDS is None, you should set DEDICATED_PROJECT_IDS (comma separated) firstly.")
+        raise Exception("DEDICATED_PROJECT_IDS not set!")
+    project_ids = [project_id.strip() for project_id in dedicated_project_ids.split(",") if project_id.strip()]
+    policy = retention.RetentionPolicy(keep_last=int(os.environ.get("RETENTION_KEEP_LAST", 7)),
+                                       keep_weekly=int(os.environ.get("RETENTION_KEEP_WEEKLY", 4)),
+                                       max_age_days=float(os.environ.get("RETENTION_MAX_AGE_DAYS", 30)))
+
+    async def run():
+        async with aio.AsyncTiDBCloud() as client:
+            return await retention.collect_garbage(client, policy, project_ids=project_ids, dry_run=dry_run)
+
+    print(f"1. {'Plan the deletion of' if dry_run else 'Delete'} the expired manual backups of projects {project_ids}.")
+    report = asyncio.run(run())
+    print(report.summary())
+    print()
+
+    print("Thanks for watching!")
+    print("-" * 88)
+
+
 if __name__ == "__main__":
-    usage_demo()
+    if len(sys.argv) > 1 and sys.argv[1] == "fleet":
+        fleet_usage_demo()
+    elif len(sys.argv) > 1 and sys.argv[1] == "drill":
+        drill_usage_demo()
+    elif len(sys.argv) > 1 and sys.argv[1] == "gc":
+        gc_usage_demo(dry_run=sys.argv[2:] != ["apply"])
+    else:
+        usage_demo()
@@ -9,6 +9,7 @@ import pytest
 from python.manage_backup.main import ManageBackup
 
 
+@pytest.mark.cassette
 class TestManageBackup:
     def setup_method(self):
         self.manage_backup = ManageBackup()
@@ -46,6 +47,14 @@ class TestManageBackup:
 
         self.backup_id = resp_body["id"]
 
+    def test_get_backups_of_cluster(self, setup_backup):
+        print("test : get backups of cluster.")
+        resp_body = self.manage_backup.get_backups_of_cluster(self.project_id, self.cluster_id, page_size=100)
+
+        # assert content
+        assert "items" in resp_body
+        assert any(backup["id"] == self.backup_id for backup in resp_body["items"])
+
     # # tips: test before backup is ready
     # def test_create_restore_task(self, setup_backup):
     #     print("test : create restore task.")
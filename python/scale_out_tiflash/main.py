@@ -7,12 +7,15 @@ Shows how to scale-out one Tiflash node for existing cluster.
 """
 import json
 import os
+import sys
 
 import requests
-from requests.auth import HTTPDigestAuth
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tidbcloud import auth, cache, catalog, log, payloads, preflight, shape, transport  # noqa: E402
 
 # Basic config
-HOST = "https://api.tidbcloud.com"
+HOST = os.environ.get("TIDBCLOUD_HOST", "https://api.tidbcloud.com")
 
 
 class ScaleOutTiFlash:
@@ -21,25 +24,29 @@ class ScaleOutTiFlash:
         Generate authorization by public key and private key (https://tidbcloud.com/console/clusters)
         """
         self.digest_auth = _authorization()
+        self.transport = transport.get_transport()
 
-    def get_dedicated_provider_regions_specifications(self):
+    def get_dedicated_provider_regions_specifications(self, cloud_provider: str = None, region: str = None):
         """
         Get dedicated cloud providers, regions and available specifications.
+        The catalog is cached in memory and on disk, see tidbcloud.cache.
+        :param cloud_provider: The wanted cloud provider, any if None
+        :param region: The wanted region, any of the cloud provider if None
         :return: List the cloud providers, regions and available specifications.
         """
+        return self.get_dedicated_region_specifications(cloud_provider, region).item
+
+    def get_dedicated_region_specifications(self, cloud_provider: str = None,
+                                            region: str = None) -> catalog.RegionSpec:
+        """
+        Get the dedicated specifications of a region, indexed by component and node size.
+        :param cloud_provider: The cloud provider, any if None
+        :param region: The region, any of the cloud provider if None
+        :return: The region specifications
+        """
         url = f"{HOST}/api/v1beta/clusters/provider/regions"
-        resp = requests.get(url=url, auth=self.digest_auth)
-        print(f"Method: {resp.request.method}, Request: {url}")
-        resp_body = _response(resp)
-        try:
-            items = resp_body["items"]
-            for item in items:
-                if item["cluster_type"] == "DEDICATED":
-                    return item
-        except KeyError:
-            print("dedicate config not found!")
-            raise
-        raise Exception("dedicate config not found!")
+        resp_body = cache.get_catalog_cache().fetch(self.transport, url, self.digest_auth)
+        return catalog.get_catalog(resp_body).require("DEDICATED", cloud_provider, region)
 
     def modify_cluster(self, project_id: str, cluster_id: str, dedicated_config: dict) -> dict:
         """
@@ -50,53 +57,46 @@ class ScaleOutTiFlash:
         :param dedicated_config: The dedicated config
         :return: If success,return None. Else, return message
         """
-        try:
-            provider_regions_specifications = self.get_dedicated_provider_regions_specifications()
-            tidb_quantity_range = dedicated_config["config"]["components"]["tidb"]["node_quantity"]
-            tikv_quantity_range = dedicated_config["config"]["components"]["tikv"]["node_quantity"]
-            if dedicated_config["config"]["components"]["tiflash"] is not None:
-                tiflash_size = dedicated_config["config"]["components"]["tiflash"]["node_size"]
-                tiflash_storage_size_gib = dedicated_config["config"]["components"]["tiflash"]["storage_size_gib"]
-                tiflash_node_quantity = dedicated_config["config"]["components"]["tiflash"]["node_quantity"] + 1
-            else:
-                tiflash_size = provider_regions_specifications["tiflash"][0]["node_size"]
-                tiflash_storage_size_gib = provider_regions_specifications["tiflash"][0]["storage_size_gib_range"][
-                    "min"]
-                tiflash_node_quantity = provider_regions_specifications["tiflash"][0]["node_quantity_range"]["step"]
-        except (KeyError, IndexError) as e:
-            print(f"cloud provider or region or available specifications not found! exception: {e}")
-            raise
+        region_spec = self.get_dedicated_region_specifications(dedicated_config.get("cloud_provider"),
+                                                               dedicated_config.get("region"))
         url = f"{HOST}/api/v1beta/projects/{project_id}/clusters/{cluster_id}"
-        data_add_tiflash = \
-            {
-                "config":
-                    {
-                        "components":
-                            {
-                                "tidb":
-                                    {
-                                        "node_quantity": f"{tidb_quantity_range}"
-                                    },
-                                "tikv":
-                                    {
-                                        "node_quantity": f"{tikv_quantity_range}"
-                                    },
-                                "tiflash":
-                                    {
-                                        "node_quantity": f"{tiflash_node_quantity}",
-                                        "node_size": f"{tiflash_size}",
-                                        "storage_size_gib": f"{tiflash_storage_size_gib}"
-                                    }
-                            }
-                    }
-            }
+        data_add_tiflash = payloads.add_tiflash_payload(dedicated_config, region_spec.item)
+        # Reject an invalid shape locally, e.g. TiFlash with a 2 or 4 vCPUs TiDB, instead of after a round trip
+        preflight.check_modify(data_add_tiflash, dedicated_config, region_spec)
         data_add_tiflash_json = json.dumps(data_add_tiflash)
-        resp = requests.patch(url=url,
-                              auth=self.digest_auth,
-                              data=data_add_tiflash_json)
-        print(f"Method: {resp.request.method}, Request: {url}, Payload:{data_add_tiflash_json}")
+        resp = self.transport.patch(url=url,
+                                    auth=self.digest_auth,
+                                    data=data_add_tiflash_json)
+        log.log_request(resp.request.method, url, data_add_tiflash_json)
         return _response(resp)
 
+    def apply(self, project_id: str, cluster_id: str, desired_shape: dict, dedicated_config: dict = None) -> dict:
+        """
+        Scale specified cluster to the desired TiDB, TiKV and TiFlash shape
+        Only the fields that differ are sent, and no request is sent when the cluster already has the shape.
+        :param project_id: The project id
+        :param cluster_id: The cluster id
+        :param desired_shape: e.g. {"tidb": {"node_quantity": 3}, "tiflash": {"node_quantity": 2}}
+        :param dedicated_config: The cluster detail, fetched if None
+        :return: The changed fields by component, empty if nothing was sent
+        """
+        if dedicated_config is None:
+            dedicated_config = self.get_cluster_by_id(project_id, cluster_id)
+        changes = shape.diff_shape(dedicated_config, desired_shape)
+        if not changes:
+            return changes
+        url = f"{HOST}/api/v1beta/projects/{project_id}/clusters/{cluster_id}"
+        data_apply = shape.patch_payload(changes)
+        preflight.check_modify(data_apply, dedicated_config, self.get_dedicated_region_specifications(
+            dedicated_config.get("cloud_provider"), dedicated_config.get("region")))
+        data_apply_json = json.dumps(data_apply)
+        resp = self.transport.patch(url=url,
+                                    auth=self.digest_auth,
+                                    data=data_apply_json)
+        log.log_request(resp.request.method, url, data_apply_json)
+        _response(resp)
+        return changes
+
     def get_cluster_by_id(self, project_id: str, cluster_id: str) -> dict:
         """
         Get the cluster detail
@@ -107,9 +107,9 @@ class ScaleOutTiFlash:
         :return: The cluster detail
         """
         url = f"{HOST}/api/v1beta/projects/{project_id}/clusters/{cluster_id}"
-        resp = requests.get(url=url,
-                            auth=self.digest_auth)
-        print(f"Method: {resp.request.method}, Request: {url}")
+        resp = self.transport.get(url=url,
+                                  auth=self.digest_auth)
+        log.log_request(resp.request.method, url)
         return _response(resp)
 
 
@@ -118,13 +118,7 @@ def _authorization():
     Generate authorization by public key and private key (https://tidbcloud.com/console/clusters)
     :return: Digest auth
     """
-    public_key = os.environ.get("TIDBCLOUD_PUBLIC_KEY", None)
-    private_key = os.environ.get("TIDBCLOUD_PRIVATE_KEY", None)
-    if public_key is None or private_key is None:
-        print("TIDBCLOUD_PUBLIC_KEY or TIDBCLOUD_PRIVATE_KEY is None, you should set TIDBCLOUD_PUBLIC_KEY and "
-              "TIDBCLOUD_PRIVATE_KEY firstly.")
-        raise Exception("TIDBCLOUD_PUBLIC_KEY or TIDBCLOUD_PRIVATE_KEY not set.")
-    return HTTPDigestAuth(public_key, private_key)
+    return auth.PreemptiveDigestAuth(*auth.credentials())
 
 
 def _response(resp: requests.models.Response) -> dict:
@@ -134,13 +128,14 @@ def _response(resp: requests.models.Response) -> dict:
     :return: Format response
     """
     if resp.status_code != 200:
-        print(f"request invalid, code : {resp.status_code}, message : {resp.text}")
+        log.log_error(resp)
         raise Exception(f"request invalid, code : {resp.status_code}, message : {resp.text}")
-    print(f"response : {resp.text}")
+    log.log_response(resp)
     return resp.json()
 
 
 def usage_demo():
+    log.setup()
     print("-" * 88)
     print("Welcome to the TiDB Cloud API samples!")
     print("-" * 88)
@@ -160,12 +155,54 @@ def usage_demo():
     print()
 
     print("2. View the scale-out progress.")
-    scale_out_tiflash.get_cluster_by_id(dedicated_project_id, dedicated_cluster_id)
+    dedicated_cluster_info = scale_out_tiflash.get_cluster_by_id(dedicated_project_id, dedicated_cluster_id)
+    print()
+
+    print("3. Apply the current shape again, no request is sent.")
+    changes = scale_out_tiflash.apply(dedicated_project_id, dedicated_cluster_id,
+                                      shape.current_shape(dedicated_cluster_info), dedicated_cluster_info)
+    print(f"changes : {changes}")
     print()
 
     print("Thanks for watching! ")
     print("-" * 88)
 
 
+def bulk_usage_demo():
+    log.setup()
+    print("-" * 88)
+    print("Welcome to the TiDB Cloud API samples!")
+    print("-" * 88)
+
+    # Imported here so that the single cluster demo does not need httpx
+    import asyncio
+    from tidbcloud import aio, scaling
+
+    dedicated_project_ids = os.environ.get("DEDICATED_PROJECT_IDS", None)
+    if dedicated_project_ids is None:
+        print("DEDICATED_PROJECT_IDS is None, you should set DEDICATED_PROJECT_IDS (comma separated) firstly.")
+        raise Exception("DEDICATED_PROJECT_IDS not set!")
+    project_ids = [project_id.strip() for project_id in dedicated_project_ids.split(",") if project_id.strip()]
+    tiflash_target = os.environ.get("TIFLASH_TARGET", None)
+    target = int(tiflash_target) if tiflash_target else None
+    delta = None if target is not None else int(os.environ.get("TIFLASH_DELTA", 1))
+
+    async def run():
+        async with aio.AsyncTiDBCloud() as client:
+            return await scaling.scale_out_tiflash(client, project_ids=project_ids, target=target, delta=delta)
+
+    print(f"1. Scale out TiFlash of every Dedicated Tier cluster of projects {project_ids} "
+          f"({f'to {target} nodes' if target is not None else f'by {delta} nodes'}) and wait for them.")
+    report = asyncio.run(run())
+    print(report.summary())
+    print()
+
+    print("Thanks for watching!")
+    print("-" * 88)
+
+
 if __name__ == "__main__":
-    usage_demo()
+    if len(sys.argv) > 1 and sys.argv[1] == "bulk":
+        bulk_usage_demo()
+    else:
+        usage_demo()
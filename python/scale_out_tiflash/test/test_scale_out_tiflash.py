@@ -2,25 +2,46 @@
 """
 Unit tests
 """
+import json
 import os
 
 import pytest
 
 from python.scale_out_tiflash.main import ScaleOutTiFlash
+# The tidbcloud package put on sys.path by main.py, so that the test shares the singletons of the sample
+from tidbcloud import shape, transport
 
 
+@pytest.mark.cassette
 class TestScaleOutTiFlash:
     def setup_method(self):
         self.scale_out_tiflash = ScaleOutTiFlash()
         self.project_id = os.environ.get("DEDICATED_PROJECT_ID", None)
         self.cluster_id = os.environ.get("DEDICATED_CLUSTER_ID", None)
 
-    def test_modify_cluster(self):
+    def test_modify_cluster(self, api_cassette):
         print("test : modify cluster.")
         dedicated_config = self.scale_out_tiflash.get_cluster_by_id(self.project_id, self.cluster_id)
         resp_body = self.scale_out_tiflash.modify_cluster(self.project_id, self.cluster_id, dedicated_config)
+        sent = [request for request in api_cassette.requests if request.method == "PATCH"]
 
+        # assert content, the quantities and sizes are sent as JSON numbers
         assert resp_body == {}
+        assert len(sent) == 1
+        assert json.loads(sent[0].body) == {"config": {"components": {
+            "tidb": {"node_quantity": 2},
+            "tikv": {"node_quantity": 3},
+            "tiflash": {"node_size": "8C64G", "node_quantity": 1, "storage_size_gib": 500}}}}
+
+    def test_apply_current_shape(self):
+        print("test : apply current shape.")
+        dedicated_config = self.scale_out_tiflash.get_cluster_by_id(self.project_id, self.cluster_id)
+        changes = self.scale_out_tiflash.apply(self.project_id, self.cluster_id,
+                                               shape.current_shape(dedicated_config), dedicated_config)
+
+        # assert content
+        assert changes == {}
+        assert self.scale_out_tiflash.transport is transport.get_transport()
 
 
 if __name__ == "__main__":
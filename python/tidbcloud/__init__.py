@@ -0,0 +1,6 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shared helpers used by all the TiDB Cloud API Python samples.
+"""
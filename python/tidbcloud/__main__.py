@@ -0,0 +1,11 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to run the operations of tidbcloud.cli with `python -m tidbcloud`.
+"""
+import sys
+
+from .cli import main
+
+sys.exit(main())
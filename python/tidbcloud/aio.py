@@ -0,0 +1,327 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to drive many cluster, backup, restore and scaling operations from one asyncio event loop.
+The client keeps a pool of keep-alive connections and bounds the number of in-flight requests with a semaphore.
+"""
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+from . import auth, cache, catalog, log, payloads, preflight, ratelimit, shape
+from . import breaker as circuit_breaker
+from .hedge import HedgePolicy
+from .metrics import Metrics, RequestEvent, get_metrics
+from .singleflight import Group
+from .transport import HOST
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_CONCURRENCY = 100
+
+
+class ApiError(Exception):
+    def __init__(self, status_code: int, message: str):
+        """
+        The API answered a request with an error status
+        :param status_code: The HTTP status code
+        :param message: The response body
+        """
+        super().__init__(f"request invalid, code : {status_code}, message : {message}")
+        self.status_code = status_code
+        self.message = message
+
+
+class AsyncTiDBCloud:
+    def __init__(self, public_key: str = None, private_key: str = None, host: str = HOST,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 http_transport: httpx.AsyncBaseTransport = None, limiter: ratelimit.RateLimiter = None,
+                 metrics: Metrics = None, singleflight: Group = None, hedge: HedgePolicy = None,
+                 breaker: circuit_breaker.CircuitBreaker = None):
+        """
+        Async counterpart of the sample clients
+        The API key is read from the environment when it is not given.
+        :param public_key: The public key
+        :param private_key: The private key
+        :param host: The API host
+        :param max_connections: The maximum number of pooled connections
+        :param max_concurrency: The maximum number of in-flight requests
+        :param http_transport: The httpx transport, the default network transport if None
+        :param limiter: The rate limiter, the shared one if None
+        :param metrics: The request metrics, the shared ones if None
+        :param singleflight: Merges the identical GET requests of concurrent coroutines, a new group if None,
+                             none when TIDBCLOUD_SINGLEFLIGHT is 0
+        :param hedge: Sends a second request for the slow GET requests, from the environment if None,
+                      see tidbcloud.hedge
+        :param breaker: The circuit breaker, the shared one if None
+        """
+        if public_key is None or private_key is None:
+            public_key, private_key = auth.credentials()
+        self.host = host
+        self.limiter = limiter
+        self.metrics = metrics
+        self.hedge = hedge or HedgePolicy.from_environment()
+        self.breaker = breaker
+        self.max_concurrency = max_concurrency
+        if singleflight is None and os.environ.get("TIDBCLOUD_SINGLEFLIGHT", "1") != "0":
+            singleflight = Group()
+        self.singleflight = singleflight
+        self._semaphore = None
+        # httpx.DigestAuth reuses the last challenge, so only the first request pays the 401 round trip
+        self.client = httpx.AsyncClient(auth=httpx.DigestAuth(public_key, private_key),
+                                        limits=httpx.Limits(max_connections=max_connections,
+                                                            max_keepalive_connections=max_connections),
+                                        transport=http_transport)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def _slot(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            # Created lazily so that it binds to the running event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def request(self, method: str, path: str, payload: dict = None) -> dict:
+        """
+        Send a request once a concurrency slot is free
+        :param method: The HTTP method
+        :param path: The API path, e.g. /api/v1beta/projects
+        :param payload: The JSON payload
+        :return: Format response, shared with the identical GET requests in flight: treat it as read-only
+        """
+        if self.singleflight is None:
+            return await self._request(method, path, payload)
+        if method.upper() == "GET":
+            return await self.singleflight.ado(path, lambda: self._request(method, path, payload))
+        self.singleflight.forget()
+        try:
+            return await self._request(method, path, payload)
+        finally:
+            # A read sent during the write may have seen the previous state
+            self.singleflight.forget()
+
+    async def _request(self, method: str, path: str, payload: dict = None) -> dict:
+        content = json.dumps(payload) if payload is not None else None
+        url = f"{self.host}{path}"
+        log.log_request(method, url, content)
+        return _response(await self._read(method, url, content=content))
+
+    async def _read(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request, a slow GET may be sent twice when a hedge policy is set, see tidbcloud.hedge
+        """
+        if self.hedge is None or method.upper() != "GET":
+            return await self._send(method, url, **kwargs)
+        return await self.hedge.acall(method, url, lambda: self._send(method, url, **kwargs),
+                                      self.metrics or get_metrics())
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request within the rate limit and the concurrency bound
+        Requests rejected with 429 or a 5xx status are retried, see tidbcloud.ratelimit.
+        The requests to an endpoint failing most of the time raise breaker.CircuitOpenError, see tidbcloud.breaker.
+        """
+        limiter = self.limiter or ratelimit.get_rate_limiter()
+        breaker = self.breaker or circuit_breaker.get_circuit_breaker()
+        metrics = self.metrics or get_metrics()
+        attempt = 0
+        while True:
+            breaker.check(method, url, metrics)
+            try:
+                await limiter.aacquire(method)
+                async with self._slot():
+                    phases = {}
+                    start = time.perf_counter()
+                    try:
+                        resp = await self.client.request(method, url, extensions={"trace": _tracer(phases)},
+                                                         **kwargs)
+                    except Exception as e:
+                        metrics.record(RequestEvent(method, url, seconds=time.perf_counter() - start,
+                                                    phases=phases, error=e))
+                        raise
+            except Exception:
+                breaker.record(method, url, True, metrics)
+                raise
+            except BaseException:
+                # Cancelled, e.g. the losing request of a hedge
+                breaker.record(method, url, None, metrics)
+                raise
+            breaker.record(method, url, resp.status_code >= 500, metrics)
+            metrics.record(RequestEvent(method, url, resp.status_code, time.perf_counter() - start,
+                                        len(resp.request.content), len(resp.content), phases))
+            delay = limiter.retry_delay(method, resp.status_code, resp.headers, attempt)
+            if delay is None:
+                return resp
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get_provider_regions_specifications(self) -> dict:
+        """
+        Get cloud providers, regions and available specifications.
+        The catalog is cached in memory and on disk, see tidbcloud.cache.
+        :return: List the cloud providers, regions and available specifications.
+        """
+        url = f"{self.host}/api/v1beta/clusters/provider/regions"
+        catalog_cache = cache.get_catalog_cache()
+        body = catalog_cache.lookup(url)
+        if body is not None:
+            return body
+
+        async def fetch() -> dict:
+            resp = await self._send("GET", url, headers=catalog_cache.conditional_headers(url))
+            if resp.status_code == 304:
+                body = catalog_cache.revalidated(url)
+                if body is not None:
+                    return body
+                # The entry was invalidated meanwhile, fetch the body again
+                resp = await self._send("GET", url)
+            return catalog_cache.store(url, _response(resp), resp.headers.get("ETag"),
+                                       resp.headers.get("Last-Modified"))
+
+        if self.singleflight is None:
+            return await fetch()
+        # Every coroutine missing the cache at the same time shares one fetch of the catalog
+        return await self.singleflight.ado(("catalog", url), fetch)
+
+    async def get_dedicated_region_specifications(self, dedicated_config: dict) -> catalog.RegionSpec:
+        """
+        Get the dedicated specifications of the region of a cluster, from the cached catalog
+        :param dedicated_config: The cluster detail
+        :return: The region specifications
+        """
+        return catalog.get_catalog(await self.get_provider_regions_specifications()).require(
+            "DEDICATED", dedicated_config.get("cloud_provider"), dedicated_config.get("region"))
+
+    async def get_all_projects(self, page: int = 1, page_size: int = 100) -> dict:
+        return await self.request("GET", f"/api/v1beta/projects?page={page}&page_size={page_size}")
+
+    async def get_clusters_of_project(self, project_id: str, page: int = 1, page_size: int = 100) -> dict:
+        return await self.request("GET",
+                                  f"/api/v1beta/projects/{project_id}/clusters?page={page}&page_size={page_size}")
+
+    async def get_cluster_by_id(self, project_id: str, cluster_id: str) -> dict:
+        return await self.request("GET", f"/api/v1beta/projects/{project_id}/clusters/{cluster_id}")
+
+    async def modify_cluster(self, project_id: str, cluster_id: str, dedicated_config: dict) -> dict:
+        """
+        Add one TiFlash node for specified cluster
+        The payload is checked against the cached specifications catalog before it is sent, see tidbcloud.preflight.
+        :param project_id: The project id
+        :param cluster_id: The cluster id
+        :param dedicated_config: The cluster detail
+        :return: If success, return {}
+        """
+        region_spec = await self.get_dedicated_region_specifications(dedicated_config)
+        payload = payloads.add_tiflash_payload(dedicated_config, region_spec.item)
+        preflight.check_modify(payload, dedicated_config, region_spec)
+        return await self.request("PATCH", f"/api/v1beta/projects/{project_id}/clusters/{cluster_id}", payload)
+
+    async def apply(self, project_id: str, cluster_id: str, desired_shape: dict, dedicated_config: dict = None) -> dict:
+        """
+        Scale specified cluster to the desired shape, see tidbcloud.shape
+        Only the fields that differ are sent, and no request is sent when the cluster already has the shape.
+        :param project_id: The project id
+        :param cluster_id: The cluster id
+        :param desired_shape: e.g. {"tidb": {"node_quantity": 3}, "tiflash": {"node_quantity": 2}}
+        :param dedicated_config: The cluster detail, fetched if None
+        :return: The changed fields by component, empty if nothing was sent
+        """
+        if dedicated_config is None:
+            dedicated_config = await self.get_cluster_by_id(project_id, cluster_id)
+        changes = shape.diff_shape(dedicated_config, desired_shape)
+        if changes:
+            payload = shape.patch_payload(changes)
+            preflight.check_modify(payload, dedicated_config,
+                                   await self.get_dedicated_region_specifications(dedicated_config))
+            await self.request("PATCH", f"/api/v1beta/projects/{project_id}/clusters/{cluster_id}", payload)
+        return changes
+
+    async def scale_tiflash(self, project_id: str, cluster_id: str, dedicated_config: dict, node_size: str,
+                            storage_size_gib: int, node_quantity: int) -> dict:
+        """
+        Set the TiFlash nodes of specified cluster
+        :param project_id: The project id
+        :param cluster_id: The cluster id
+        :param dedicated_config: The cluster detail
+        :param node_size: The TiFlash node size
+        :param storage_size_gib: The TiFlash storage size of each node
+        :param node_quantity: The wanted TiFlash node quantity
+        :return: The changed TiFlash fields, empty if nothing was sent
+        """
+        tiflash = {"node_size": node_size, "storage_size_gib": storage_size_gib, "node_quantity": node_quantity}
+        return await self.apply(project_id, cluster_id, {"tiflash": tiflash}, dedicated_config)
+
+    async def delete_cluster(self, project_id: str, cluster_id: str) -> dict:
+        return await self.request("DELETE", f"/api/v1beta/projects/{project_id}/clusters/{cluster_id}")
+
+    async def create_manual_backup(self, project_id: str, cluster_id: str) -> dict:
+        return await self.request("POST", f"/api/v1beta/projects/{project_id}/clusters/{cluster_id}/backups",
+                                  payloads.backup_payload())
+
+    async def get_backups_of_cluster(self, project_id: str, cluster_id: str, page: int = 1,
+                                     page_size: int = 100) -> dict:
+        return await self.request("GET", f"/api/v1beta/projects/{project_id}/clusters/{cluster_id}/backups"
+                                         f"?page={page}&page_size={page_size}")
+
+    async def get_backup_info(self, project_id: str, cluster_id: str, backup_id: str) -> dict:
+        return await self.request("GET",
+                                  f"/api/v1beta/projects/{project_id}/clusters/{cluster_id}/backups/{backup_id}")
+
+    async def delete_backup(self, project_id: str, cluster_id: str, backup_id: str) -> dict:
+        return await self.request("DELETE",
+                                  f"/api/v1beta/projects/{project_id}/clusters/{cluster_id}/backups/{backup_id}")
+
+    async def create_restore_task(self, project_id: str, back_up_id: str, dedicated_config: dict,
+                                  root_password: str) -> dict:
+        payload = payloads.restore_payload(back_up_id, dedicated_config, root_password)
+        preflight.check_cluster(payload, await self.get_dedicated_region_specifications(dedicated_config))
+        return await self.request("POST", f"/api/v1beta/projects/{project_id}/restores", payload)
+
+
+# httpcore trace events timed as connection phases, the time to first byte runs from sending the headers
+_TRACED_PHASES = {"connection.connect_tcp": "connect", "connection.start_tls": "tls"}
+
+
+def _tracer(phases: dict):
+    """
+    httpx trace extension recording the connect, TLS and time-to-first-byte durations into phases
+    """
+    started = {}
+
+    async def trace(event_name: str, info: dict):
+        name, _, stage = event_name.rpartition(".")
+        now = time.perf_counter()
+        if name.endswith(".send_request_headers") and stage == "started":
+            started["ttfb"] = now
+        elif name.endswith(".receive_response_headers") and stage == "complete" and "ttfb" in started:
+            phases["ttfb"] = now - started.pop("ttfb")
+        elif name in _TRACED_PHASES and stage == "started":
+            started[name] = now
+        elif name in _TRACED_PHASES and stage == "complete" and name in started:
+            phase = _TRACED_PHASES[name]
+            phases[phase] = phases.get(phase, 0.0) + now - started.pop(name)
+
+    return trace
+
+
+def _response(resp: httpx.Response) -> dict:
+    """
+    Response from open api
+    :param resp: Result from the API
+    :return: Format response
+    """
+    if resp.status_code != 200:
+        log.log_error(resp)
+        raise ApiError(resp.status_code, resp.text)
+    log.log_response(resp)
+    return resp.json()
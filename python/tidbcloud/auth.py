@@ -0,0 +1,192 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to send the digest `Authorization` header preemptively.
+The server nonce, realm and opaque are cached per host and shared by every client in the process,
+so only the first request to a host (or a request whose nonce went stale) pays the 401 challenge round trip.
+"""
+import os
+import re
+import threading
+from urllib.parse import urlparse
+
+from requests.auth import HTTPDigestAuth
+from requests.cookies import extract_cookies_to_jar
+from requests.utils import parse_dict_header
+
+_DIGEST_PREFIX = re.compile(r"digest ", flags=re.IGNORECASE)
+
+
+class _Challenge:
+    def __init__(self, chal: dict):
+        """
+        A server challenge and the nonce count already used with its nonce
+        :param chal: The parsed `WWW-Authenticate` header
+        """
+        self.chal = chal
+        self.nonce = chal.get("nonce", "")
+        self.nonce_count = 0
+
+
+class ChallengeCache:
+    def __init__(self):
+        """
+        Digest challenges cached per host, with counters of the 401 round trips taken and avoided
+        """
+        self._challenges = {}
+        self._lock = threading.Lock()
+        self.challenges = 0
+        self.challenges_avoided = 0
+        self.stale_challenges = 0
+
+    def reserve(self, host: str):
+        """
+        Reserve the next nonce count for the cached challenge of a host
+        :param host: The host
+        :return: (challenge, nonce count) or None if the host has not challenged yet
+        """
+        with self._lock:
+            challenge = self._challenges.get(host)
+            if challenge is None:
+                return None
+            challenge.nonce_count += 1
+            return challenge.chal, challenge.nonce_count
+
+    def update(self, host: str, chal: dict, stale: bool = False):
+        with self._lock:
+            self._challenges[host] = _Challenge(chal)
+            if stale:
+                self.stale_challenges += 1
+            else:
+                self.challenges += 1
+
+    def invalidate(self, host: str):
+        with self._lock:
+            self._challenges.pop(host, None)
+
+    def record_avoided(self):
+        with self._lock:
+            self.challenges_avoided += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "challenges": self.challenges,
+                "challenges_avoided": self.challenges_avoided,
+                "stale_challenges": self.stale_challenges,
+            }
+
+
+_shared_cache = ChallengeCache()
+
+
+def get_challenge_cache() -> ChallengeCache:
+    """
+    Get the challenge cache shared by every client in the process
+    :return: The shared challenge cache
+    """
+    return _shared_cache
+
+
+def credentials() -> tuple:
+    """
+    Read the API key from TIDBCLOUD_PUBLIC_KEY and TIDBCLOUD_PRIVATE_KEY (https://tidbcloud.com/console/clusters)
+    :return: (public key, private key)
+    """
+    public_key = os.environ.get("TIDBCLOUD_PUBLIC_KEY", None)
+    private_key = os.environ.get("TIDBCLOUD_PRIVATE_KEY", None)
+    if public_key is None or private_key is None:
+        print("TIDBCLOUD_PUBLIC_KEY or TIDBCLOUD_PRIVATE_KEY is None, you should set TIDBCLOUD_PUBLIC_KEY and "
+              "TIDBCLOUD_PRIVATE_KEY firstly.")
+        raise Exception("TIDBCLOUD_PUBLIC_KEY or TIDBCLOUD_PRIVATE_KEY not set.")
+    return public_key, private_key
+
+
+def _same_challenge(chal: dict, cached: dict) -> bool:
+    return all(chal.get(field) == cached.get(field) for field in ("realm", "nonce", "opaque"))
+
+
+class PreemptiveDigestAuth(HTTPDigestAuth):
+    def __init__(self, username: str, password: str, cache: ChallengeCache = None):
+        """
+        Digest auth that reuses the cached challenge of the host to authenticate the first request
+        :param username: The public key
+        :param password: The private key
+        :param cache: The challenge cache, the shared one by default
+        """
+        super().__init__(username, password)
+        self.cache = cache if cache is not None else _shared_cache
+
+    def _sign(self, prep, host: str) -> bool:
+        reserved = self.cache.reserve(host)
+        if reserved is None:
+            return False
+        chal, nonce_count = reserved
+        # HTTPDigestAuth increments the count itself when the nonce is unchanged
+        self._thread_local.chal = chal
+        self._thread_local.last_nonce = chal.get("nonce", "")
+        self._thread_local.nonce_count = nonce_count - 1
+        header = self.build_digest_header(prep.method, prep.url)
+        if header is None:
+            return False
+        prep.headers["Authorization"] = header
+        return True
+
+    def _resend(self, r, **kwargs):
+        # Consume content and release the original connection
+        # to allow our new request to reuse the same one.
+        r.content
+        r.close()
+        prep = r.request.copy()
+        extract_cookies_to_jar(prep._cookies, r.request, r.raw)
+        prep.prepare_cookies(prep._cookies)
+        if not self._sign(prep, urlparse(prep.url).netloc):
+            return r
+        _r = r.connection.send(prep, **kwargs)
+        _r.history.append(r)
+        _r.request = prep
+        return _r
+
+    def handle_401(self, r, **kwargs):
+        """
+        Takes the given response and answers the digest challenge, if needed.
+        A preemptively signed request is re-sent once when the server says the nonce is stale, or sends another
+        challenge than the cached one, e.g. after a restart or a key rotation.
+        """
+        preemptive = self._thread_local.preemptive
+        self._thread_local.preemptive = False
+        s_auth = r.headers.get("www-authenticate", "")
+        if r.status_code != 401 or "digest" not in s_auth.lower():
+            if preemptive:
+                self.cache.record_avoided()
+            return r
+
+        if self._thread_local.pos is not None:
+            # Rewind the file position indicator of the body to where
+            # it was to resend the request.
+            r.request.body.seek(self._thread_local.pos)
+        host = urlparse(r.request.url).netloc
+        chal = parse_dict_header(_DIGEST_PREFIX.sub("", s_auth, count=1))
+        stale = chal.get("stale", "").lower() == "true"
+        if preemptive and not stale and _same_challenge(chal, self._thread_local.chal):
+            # The credentials were rejected, the cached challenge is of no use anymore
+            self.cache.invalidate(host)
+            return r
+        if self._thread_local.num_401_calls >= 2:
+            return r
+        self._thread_local.num_401_calls += 1
+        self.cache.update(host, chal, stale=stale)
+        return self._resend(r, **kwargs)
+
+    def __call__(self, r):
+        self.init_per_thread_state()
+        self._thread_local.preemptive = self._sign(r, urlparse(r.url).netloc)
+        try:
+            self._thread_local.pos = r.body.tell()
+        except AttributeError:
+            self._thread_local.pos = None
+        r.register_hook("response", self.handle_401)
+        r.register_hook("response", self.handle_redirect)
+        self._thread_local.num_401_calls = 1
+        return r
@@ -0,0 +1,199 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to fail fast when the API is degraded instead of piling up retries and timeouts.
+Each endpoint of each host has its own circuit: it opens when most of its recent requests failed with a 5xx
+status or a network error, and requests to an open circuit raise CircuitOpenError without being sent.
+After a cooldown, one probe request is let through: the circuit closes if it succeeds and opens again otherwise.
+"""
+import os
+import re
+import threading
+import time
+
+from .metrics import Metrics, endpoint
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+DEFAULT_WINDOW = 10.0
+DEFAULT_MIN_REQUESTS = 20
+DEFAULT_FAILURE_RATIO = 0.5
+DEFAULT_COOLDOWN = 5.0
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, method: str, url: str, retry_in: float):
+        """
+        A request was not sent because the circuit of its endpoint is open
+        :param method: The HTTP method
+        :param url: The request url
+        :param retry_in: Seconds before a probe request is let through
+        """
+        super().__init__(f"circuit open for {method.upper()} {endpoint(url)}, the API failed most of the recent "
+                         f"requests, next try in {retry_in:.1f}s")
+        self.method = method.upper()
+        self.url = url
+        self.retry_in = retry_in
+
+
+class _Circuit:
+    def __init__(self):
+        self.state = CLOSED
+        # [second, requests, failures] of the last seconds, oldest first
+        self.buckets = []
+        self.opened_at = 0.0
+        self.probing = False
+
+    def counts(self, now: float, window: float) -> tuple:
+        while self.buckets and self.buckets[0][0] <= now - window:
+            self.buckets.pop(0)
+        return sum(bucket[1] for bucket in self.buckets), sum(bucket[2] for bucket in self.buckets)
+
+    def add(self, now: float, failed: bool):
+        second = int(now)
+        if not self.buckets or self.buckets[-1][0] != second:
+            self.buckets.append([second, 0, 0])
+        self.buckets[-1][1] += 1
+        self.buckets[-1][2] += int(failed)
+
+
+_HOST = re.compile(r"^[a-z]+://[^/]+")
+
+
+class CircuitBreaker:
+    def __init__(self, window: float = DEFAULT_WINDOW, min_requests: int = None,
+                 failure_ratio: float = DEFAULT_FAILURE_RATIO, cooldown: float = None):
+        """
+        Circuits by host, method and endpoint
+        :param window: Seconds of requests the failure ratio is computed on
+        :param min_requests: Requests in the window before the circuit may open, never opens if 0
+                             (env TIDBCLOUD_BREAKER_MIN_REQUESTS)
+        :param failure_ratio: The ratio of failed requests in the window opening the circuit
+        :param cooldown: Seconds an open circuit rejects the requests before the probe (env TIDBCLOUD_BREAKER_COOLDOWN)
+        """
+        if min_requests is None:
+            min_requests = int(os.environ.get("TIDBCLOUD_BREAKER_MIN_REQUESTS", DEFAULT_MIN_REQUESTS))
+        if cooldown is None:
+            cooldown = float(os.environ.get("TIDBCLOUD_BREAKER_COOLDOWN", DEFAULT_COOLDOWN))
+        self.window = window
+        self.min_requests = min_requests
+        self.failure_ratio = failure_ratio
+        self.cooldown = cooldown
+        self.rejected = 0
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(method: str, url: str) -> tuple:
+        host = _HOST.match(url)
+        return host[0] if host else "", method.upper(), endpoint(url)
+
+    def check(self, method: str, url: str, metrics: Metrics = None):
+        """
+        Let a request through, or raise CircuitOpenError when the circuit of its endpoint is open
+        Once the cooldown is over, the first caller becomes the probe and the others are still rejected.
+        :param method: The HTTP method
+        :param url: The request url
+        :param metrics: The metrics recording the state changes and the rejections
+        """
+        if not self.min_requests:
+            return
+        with self._lock:
+            circuit = self._circuits.get(self._key(method, url))
+            if circuit is None or circuit.state == CLOSED:
+                return
+            retry_in = circuit.opened_at + self.cooldown - time.monotonic()
+            half_opened = circuit.state == OPEN and retry_in <= 0
+            if half_opened:
+                circuit.state = HALF_OPEN
+            probe = circuit.state == HALF_OPEN and not circuit.probing
+            if probe:
+                circuit.probing = True
+            else:
+                self.rejected += 1
+            state = circuit.state
+        if metrics is not None and (half_opened or not probe):
+            metrics.record_circuit(method, url, state, rejected=not probe)
+        if probe:
+            return
+        raise CircuitOpenError(method, url, max(0.0, retry_in))
+
+    def record(self, method: str, url: str, failed: bool, metrics: Metrics = None):
+        """
+        Record the outcome of a request let through by check
+        :param method: The HTTP method
+        :param url: The request url
+        :param failed: Whether the API failed it (5xx status or network error), None if it was cancelled
+        :param metrics: The metrics recording the state changes
+        """
+        if not self.min_requests:
+            return
+        now = time.monotonic()
+        with self._lock:
+            key = self._key(method, url)
+            circuit = self._circuits.get(key)
+            if circuit is None:
+                if not failed:
+                    # Healthy endpoints only get a circuit after their first failure
+                    return
+                circuit = self._circuits[key] = _Circuit()
+            previous = circuit.state
+            if circuit.state == HALF_OPEN and circuit.probing:
+                circuit.probing = False
+                if failed is not None:
+                    circuit.state = OPEN if failed else CLOSED
+                    circuit.opened_at = now
+                    circuit.buckets = []
+            elif circuit.state == CLOSED and failed is not None:
+                circuit.add(now, failed)
+                requests, failures = circuit.counts(now, self.window)
+                if requests >= self.min_requests and failures >= requests * self.failure_ratio:
+                    circuit.state = OPEN
+                    circuit.opened_at = now
+            state = circuit.state
+        if state != previous and metrics is not None:
+            metrics.record_circuit(method, url, state)
+
+    def states(self) -> dict:
+        """
+        :return: The state of the circuits that ever failed, by "METHOD host/endpoint"
+        """
+        with self._lock:
+            return {f"{method} {host}{path}": circuit.state
+                    for (host, method, path), circuit in sorted(self._circuits.items())}
+
+    def reset(self):
+        """
+        Close every circuit
+        """
+        with self._lock:
+            self._circuits.clear()
+
+
+_shared_breaker = None
+_shared_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """
+    Get the circuit breaker shared by every client in the process
+    :return: The shared circuit breaker
+    """
+    global _shared_breaker
+    with _shared_lock:
+        if _shared_breaker is None:
+            _shared_breaker = CircuitBreaker()
+        return _shared_breaker
+
+
+def configure(**kwargs) -> CircuitBreaker:
+    """
+    Replace the shared circuit breaker, e.g. configure(min_requests=0) to never open a circuit
+    :return: The new shared circuit breaker
+    """
+    global _shared_breaker
+    with _shared_lock:
+        _shared_breaker = CircuitBreaker(**kwargs)
+        return _shared_breaker
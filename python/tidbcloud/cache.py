@@ -0,0 +1,167 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to cache the cloud providers, regions and available specifications catalog.
+The catalog is kept in memory and on disk for a TTL, so only the first call in a run (or in a cron window)
+touches the network. Once expired, it is revalidated with If-None-Match / If-Modified-Since when the server
+sent an ETag or a Last-Modified header.
+"""
+import json
+import os
+import threading
+import time
+
+from . import log
+
+DEFAULT_TTL = 3600
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "tidbcloud", "provider_regions.json")
+
+
+class CatalogCache:
+    def __init__(self, path: str = None, ttl: float = None):
+        """
+        In-memory and on-disk cache of GET responses, keyed by url
+        The returned bodies are shared, callers must not modify them.
+        :param path: The cache file (env TIDBCLOUD_CACHE_FILE), "" to keep the cache in memory only
+        :param ttl: Seconds a cached response is used without revalidation (env TIDBCLOUD_CACHE_TTL)
+        """
+        if path is None:
+            path = os.environ.get("TIDBCLOUD_CACHE_FILE", DEFAULT_PATH)
+        if ttl is None:
+            ttl = float(os.environ.get("TIDBCLOUD_CACHE_TTL", DEFAULT_TTL))
+        self.path = path
+        self.ttl = ttl
+        self._entries = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            self._entries = {}
+            if self.path:
+                try:
+                    with open(self.path) as f:
+                        self._entries = json.load(f)
+                except (OSError, ValueError):
+                    pass
+        return self._entries
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.logger.warning("catalog cache not saved! exception: %s", e)
+
+    def lookup(self, url: str):
+        """
+        Get the cached body if it is still fresh
+        :param url: The request url
+        :return: The body, or None if it is missing or expired
+        """
+        with self._lock:
+            entry = self._load().get(url)
+            if entry is not None and time.time() - entry["fetched_at"] < self.ttl:
+                self.hits += 1
+                return entry["body"]
+            return None
+
+    def conditional_headers(self, url: str) -> dict:
+        """
+        Headers revalidating the expired entry of the url
+        :param url: The request url
+        :return: If-None-Match / If-Modified-Since headers, empty if nothing is cached
+        """
+        with self._lock:
+            entry = self._load().get(url)
+            headers = {}
+            if entry is not None:
+                if entry.get("etag"):
+                    headers["If-None-Match"] = entry["etag"]
+                if entry.get("last_modified"):
+                    headers["If-Modified-Since"] = entry["last_modified"]
+            return headers
+
+    def revalidated(self, url: str) -> dict:
+        """
+        Mark the expired entry of the url fresh again after a 304 Not Modified
+        :param url: The request url
+        :return: The cached body, None if the entry was dropped since the conditional request was sent
+        """
+        with self._lock:
+            entry = self._load().get(url)
+            if entry is None:
+                return None
+            entry["fetched_at"] = time.time()
+            self.revalidations += 1
+            self._save()
+            return entry["body"]
+
+    def store(self, url: str, body: dict, etag: str = None, last_modified: str = None) -> dict:
+        with self._lock:
+            self._load()[url] = {"fetched_at": time.time(), "etag": etag, "last_modified": last_modified,
+                                 "body": body}
+            self.misses += 1
+            self._save()
+            return body
+
+    def invalidate(self, url: str = None):
+        """
+        Drop the entry of the url, or every entry if url is None
+        """
+        with self._lock:
+            entries = self._load()
+            if url is None:
+                entries.clear()
+            else:
+                entries.pop(url, None)
+            self._save()
+
+    def fetch(self, transport, url: str, auth) -> dict:
+        """
+        Get the body of the url from the cache, or from the API through the shared transport
+        :param transport: The transport sending the request
+        :param url: The request url
+        :param auth: The digest auth
+        :return: The response body
+        """
+        body = self.lookup(url)
+        if body is not None:
+            return body
+        resp = transport.get(url=url, auth=auth, headers=self.conditional_headers(url))
+        log.log_request(resp.request.method, url)
+        if resp.status_code == 304:
+            body = self.revalidated(url)
+            if body is not None:
+                return body
+            # The entry was invalidated meanwhile, e.g. by another thread, fetch the body again
+            resp = transport.get(url=url, auth=auth)
+            log.log_request(resp.request.method, url)
+        if resp.status_code != 200:
+            log.log_error(resp)
+            raise Exception(f"request invalid, code : {resp.status_code}, message : {resp.text}")
+        return self.store(url, resp.json(), resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_catalog_cache() -> CatalogCache:
+    """
+    Get the catalog cache shared by every client in the process
+    :return: The shared catalog cache
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = CatalogCache()
+        return _shared_cache
@@ -0,0 +1,213 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to record the API exchanges of a test once and replay them afterwards, so that the sample tests run
+offline, in milliseconds and in parallel. The exchanges are recorded at the transport level, without the digest
+challenges and the `Authorization` headers, and replayed in order for each method and path, whatever the host.
+A replayed request must send the recorded body, so that a payload regression fails the test.
+Set TIDBCLOUD_CASSETTE_MODE to `record` to refresh the recordings against the API.
+"""
+import collections
+import datetime
+import json
+import os
+import re
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from . import log
+
+MODES = ("auto", "replay", "record", "live")
+DEFAULT_MODE = "auto"
+# The environment the tests read their ids from, saved with the recording and restored on replay
+RECORDED_ENV = ("DEDICATED_PROJECT_ID", "DEDICATED_CLUSTER_ID")
+_KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Retry-After")
+# The fields the samples fill from the clock, e.g. tidbcloud-backup-2022-08-01, compared without their digits
+_CLOCK_FIELDS = ("name", "description")
+_DIGITS = re.compile(r"\d+")
+
+
+def request_key(method: str, url: str) -> str:
+    """
+    The method and the path of a request, with the query sorted and without the host
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{method.upper()} {parts.path}" + (f"?{query}" if query else "")
+
+
+def _text(body) -> str:
+    if body is None:
+        return None
+    return body.decode("utf-8") if isinstance(body, bytes) else body
+
+
+def _comparable(body: str):
+    """
+    A redacted request body as compared on replay, decoded when it is JSON
+    """
+    if body is None:
+        return None
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+    if isinstance(data, dict):
+        for field in _CLOCK_FIELDS:
+            if isinstance(data.get(field), str):
+                data[field] = _DIGITS.sub("0", data[field])
+    return data
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = None):
+        """
+        The recorded exchanges of one test
+        :param path: The JSON file of the recording
+        :param mode: `replay` the file, `record` a new one, use the API (`live`), or replay when the file exists
+                     and use the API otherwise (`auto`) (env TIDBCLOUD_CASSETTE_MODE, `auto` by default)
+        """
+        if mode is None:
+            mode = os.environ.get("TIDBCLOUD_CASSETTE_MODE", DEFAULT_MODE)
+        if mode not in MODES:
+            raise Exception(f"unknown cassette mode {mode}, should be one of {', '.join(MODES)}.")
+        if mode == "auto":
+            mode = "replay" if os.path.exists(path) else "live"
+        self.path = path
+        self.mode = mode
+        self.interactions = []
+        self.env = {}
+        # The requests sent through the cassette in this run, replayed or not, e.g. to assert on their bodies
+        self.requests = []
+        self._replies = None
+        self._lock = threading.Lock()
+        if mode == "replay":
+            with open(path) as f:
+                recording = json.load(f)
+            self.interactions = recording["interactions"]
+            self.env = recording.get("env", {})
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def record(self, request: requests.PreparedRequest, resp: requests.models.Response):
+        """
+        Add an exchange to the recording, digest challenges are left out
+        """
+        if resp.status_code == 401:
+            return
+        try:
+            body = resp.json()
+        except ValueError:
+            body = resp.text
+        with self._lock:
+            self.interactions.append({
+                "request": {"key": request_key(request.method, request.url),
+                            "body": log.redact(_text(request.body)) if request.body else None},
+                "response": {"status_code": resp.status_code,
+                             "headers": {name: resp.headers[name] for name in _KEPT_HEADERS if name in resp.headers},
+                             "body": body},
+            })
+
+    def play(self, request: requests.PreparedRequest) -> requests.models.Response:
+        """
+        The next recorded response to the method and path of the request
+        Raise when the request body differs from the recorded one, the names generated from the clock aside.
+        """
+        key = request_key(request.method, request.url)
+        with self._lock:
+            if self._replies is None:
+                self._replies = {}
+                for interaction in self.interactions:
+                    self._replies.setdefault(interaction["request"]["key"], collections.deque()).append(interaction)
+            replies = self._replies.get(key)
+            if not replies:
+                raise Exception(f"no recorded response left for {key} in {self.path}.")
+            interaction = replies.popleft()
+        sent = log.redact(_text(request.body)) if request.body else None
+        if _comparable(sent) != _comparable(interaction["request"]["body"]):
+            raise Exception(f"request body of {key} differs from the recording in {self.path}: sent {sent}, "
+                            f"recorded {interaction['request']['body']}.")
+        recorded = interaction["response"]
+        body = recorded["body"]
+        resp = requests.models.Response()
+        resp.status_code = recorded["status_code"]
+        resp.headers = CaseInsensitiveDict(recorded["headers"])
+        resp._content = b"" if body is None else (body if isinstance(body, str) else json.dumps(body)).encode("utf-8")
+        resp._content_consumed = True
+        resp.encoding = "utf-8"
+        resp.url = request.url
+        resp.request = request
+        resp.elapsed = datetime.timedelta(0)
+        return resp
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        env = {name: os.environ[name] for name in RECORDED_ENV if name in os.environ}
+        with open(self.path, "w") as f:
+            json.dump({"env": env, "interactions": self.interactions}, f, indent=2)
+            f.write("\n")
+
+    def use(self, session: requests.Session) -> "_Mounted":
+        """
+        Replay or record the exchanges of a session, e.g. `with cassette.use(transport.get_transport().session):`
+        The recording is saved when the block exits.
+        :param session: The session
+        :return: A context manager
+        """
+        return _Mounted(self, session)
+
+
+class _CassetteAdapter(HTTPAdapter):
+    def __init__(self, cassette: Cassette, inner: HTTPAdapter):
+        """
+        Adapter answering from the cassette, or recording the responses of the adapter it replaces
+        """
+        super().__init__()
+        self.cassette = cassette
+        self.inner = inner
+
+    def send(self, request, **kwargs):
+        self.cassette.requests.append(request)
+        if self.cassette.replaying:
+            return self.cassette.play(request)
+        resp = self.inner.send(request, **kwargs)
+        # The digest auth answers the challenge on resp.connection, keep that request recorded too
+        resp.connection = self
+        self.cassette.record(request, resp)
+        return resp
+
+
+class _Mounted:
+    def __init__(self, cassette: Cassette, session: requests.Session):
+        self.cassette = cassette
+        self.session = session
+        self._adapters = {}
+
+    def __enter__(self) -> Cassette:
+        if self.cassette.mode == "live":
+            return self.cassette
+        for prefix in ("https://", "http://"):
+            inner = self.session.get_adapter(prefix)
+            self._adapters[prefix] = inner
+            self.session.mount(prefix, _CassetteAdapter(self.cassette, inner))
+        return self.cassette
+
+    def __exit__(self, exc_type, *exc_info):
+        for prefix, inner in self._adapters.items():
+            self.session.mount(prefix, inner)
+        if self.cassette.recording and exc_type is None:
+            self.cassette.save()
+        return False
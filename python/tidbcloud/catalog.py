@@ -0,0 +1,145 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to index the cloud providers, regions and available specifications catalog once,
+so that planning many clusters across regions looks specifications up in O(1)
+instead of walking the raw `items` for every decision. The index classes are slotted, like tidbcloud.models.
+"""
+import threading
+
+COMPONENTS = ("tidb", "tikv", "tiflash")
+
+
+class ComponentSpec:
+    __slots__ = ("component", "node_size", "min_quantity", "step", "min_storage_gib", "max_storage_gib", "spec")
+
+    def __init__(self, component: str, spec: dict):
+        """
+        One available node size of a component, with its precomputed quantity and storage ranges
+        :param component: tidb, tikv or tiflash
+        :param spec: The specification from the catalog, e.g. {"node_size": "8C16G", "node_quantity_range": {...}}
+        """
+        quantity_range = spec.get("node_quantity_range") or {}
+        storage_range = spec.get("storage_size_gib_range") or {}
+        self.component = component
+        self.node_size = spec["node_size"]
+        self.min_quantity = int(quantity_range.get("min", 0))
+        self.step = int(quantity_range.get("step", 1)) or 1
+        self.min_storage_gib = int(storage_range["min"]) if "min" in storage_range else None
+        self.max_storage_gib = int(storage_range["max"]) if "max" in storage_range else None
+        self.spec = spec
+
+    def is_valid_quantity(self, quantity: int) -> bool:
+        return quantity >= self.min_quantity and quantity % self.step == 0
+
+    def next_quantity(self, current: int, delta: int = 1) -> int:
+        """
+        The smallest valid quantity reached by adding at least `delta` nodes
+        :param current: The current node quantity
+        :param delta: The number of nodes to add
+        :return: The next valid node quantity
+        """
+        target = max(current + delta, self.min_quantity, self.step)
+        return -(-target // self.step) * self.step
+
+    def is_valid_storage(self, storage_size_gib: int) -> bool:
+        if self.min_storage_gib is not None and storage_size_gib < self.min_storage_gib:
+            return False
+        if self.max_storage_gib is not None and storage_size_gib > self.max_storage_gib:
+            return False
+        return True
+
+
+class RegionSpec:
+    __slots__ = ("cluster_type", "cloud_provider", "region", "item", "components")
+
+    def __init__(self, item: dict):
+        """
+        The specifications available for one cluster type, cloud provider and region
+        :param item: The item from the catalog
+        """
+        self.cluster_type = item["cluster_type"]
+        self.cloud_provider = item.get("cloud_provider")
+        self.region = item.get("region")
+        self.item = item
+        self.components = {}
+        for component in COMPONENTS:
+            self.components[component] = {spec["node_size"]: ComponentSpec(component, spec)
+                                          for spec in item.get(component) or []}
+
+    def default(self, component: str) -> ComponentSpec:
+        """
+        The first node size of a component, as picked by the samples
+        :param component: tidb, tikv or tiflash
+        :return: The component specification, None if the component is not available
+        """
+        specs = self.components.get(component)
+        return next(iter(specs.values())) if specs else None
+
+    def component(self, component: str, node_size: str) -> ComponentSpec:
+        return self.components.get(component, {}).get(node_size)
+
+
+class SpecCatalog:
+    __slots__ = ("regions", "_by_region", "_first")
+
+    def __init__(self, provider_regions_specifications: dict):
+        """
+        Index of the catalog by (cluster_type, cloud_provider, region)
+        :param provider_regions_specifications: Result of cloud providers, regions and available specifications
+        """
+        self.regions = {}
+        self._by_region = {}
+        self._first = {}
+        try:
+            items = provider_regions_specifications["items"]
+        except KeyError:
+            print("cloud provider or region or available specifications not found!")
+            raise
+        for item in items:
+            region = RegionSpec(item)
+            self.regions[(region.cluster_type, region.cloud_provider, region.region)] = region
+            self._by_region.setdefault((region.cluster_type, region.region), region)
+            self._first.setdefault((region.cluster_type, None, None), region)
+            self._first.setdefault((region.cluster_type, region.cloud_provider, None), region)
+
+    def find(self, cluster_type: str, cloud_provider: str = None, region: str = None) -> RegionSpec:
+        """
+        Find the specifications of a cluster type, optionally in a cloud provider and a region
+        :param cluster_type: DEDICATED or DEVELOPER
+        :param cloud_provider: The cloud provider, any if None
+        :param region: The region, any of the cloud provider if None
+        :return: The region specifications, None if not available
+        """
+        if region is None:
+            return self._first.get((cluster_type, cloud_provider, None))
+        if cloud_provider is None:
+            return self._by_region.get((cluster_type, region))
+        return self.regions.get((cluster_type, cloud_provider, region))
+
+    def require(self, cluster_type: str, cloud_provider: str = None, region: str = None) -> RegionSpec:
+        region_spec = self.find(cluster_type, cloud_provider, region)
+        if region_spec is None:
+            print(f"{cluster_type} config not found in {cloud_provider or 'any provider'} "
+                  f"{region or 'any region'}!")
+            raise Exception(f"{cluster_type} config not found!")
+        return region_spec
+
+
+_last_catalog = None
+_last_lock = threading.Lock()
+
+
+def get_catalog(provider_regions_specifications: dict) -> SpecCatalog:
+    """
+    Get the index of a catalog response, built once per response
+    The cached catalog (tidbcloud.cache) returns the same response while it is fresh, so the index is reused.
+    :param provider_regions_specifications: Result of cloud providers, regions and available specifications
+    :return: The catalog index
+    """
+    global _last_catalog
+    with _last_lock:
+        if _last_catalog is None or _last_catalog[0] is not provider_regions_specifications:
+            _last_catalog = (provider_regions_specifications, SpecCatalog(provider_regions_specifications))
+        return _last_catalog[1]
@@ -0,0 +1,248 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to run the backup, restore, create-cluster, scale-tiflash, status and delete operations from one command,
+e.g. `python -m tidbcloud backup <project id> <cluster id> --wait` in a cron job.
+Each run is a fresh process, so only the modules of the subcommand in use are imported: `--help` imports none
+of the shared helpers, and no subcommand imports asyncio or httpx. The result is printed as JSON on stdout, the
+logs (`-v`) and the errors on stderr. With `--daemon`, the subcommand is run by a warm tidbcloud.daemon instead.
+"""
+import argparse
+import json
+import os
+import sys
+
+HOST = os.environ.get("TIDBCLOUD_HOST", "https://api.tidbcloud.com")
+
+
+class Client:
+    def __init__(self, host: str):
+        """
+        Sync client on the shared transport, with the methods the shared helpers expect from the sample clients
+        :param host: The API host
+        """
+        from . import auth, transport
+
+        self.host = host
+        self.digest_auth = auth.PreemptiveDigestAuth(*auth.credentials())
+        self.transport = transport.get_transport()
+
+    def request(self, method: str, path: str, payload: dict = None) -> dict:
+        """
+        Send a request and return its JSON body
+        :param method: The HTTP method
+        :param path: The path under the API host
+        :param payload: The JSON payload
+        :return: The response body
+        """
+        from . import log
+
+        url = f"{self.host}{path}"
+        data = json.dumps(payload) if payload is not None else None
+        resp = self.transport.request(method, url, auth=self.digest_auth, data=data)
+        log.log_request(method, url, data)
+        if resp.status_code != 200:
+            log.log_error(resp)
+            raise Exception(f"request invalid, code : {resp.status_code}, message : {resp.text}")
+        log.log_response(resp)
+        return resp.json()
+
+    def get_cluster_by_id(self, project_id: str, cluster_id: str) -> dict:
+        return self.request("GET", f"/api/v1beta/projects/{project_id}/clusters/{cluster_id}")
+
+    def get_backup_info(self, project_id: str, cluster_id: str, backup_id: str) -> dict:
+        return self.request("GET", f"/api/v1beta/projects/{project_id}/clusters/{cluster_id}/backups/{backup_id}")
+
+    def get_backups_of_cluster(self, project_id: str, cluster_id: str, page: int = 1, page_size: int = 10) -> dict:
+        return self.request("GET", f"/api/v1beta/projects/{project_id}/clusters/{cluster_id}/backups"
+                                   f"?page={page}&page_size={page_size}")
+
+    def region_spec(self, cluster_type: str, cloud_provider: str = None, region: str = None):
+        """
+        Get the specifications of a region from the cached catalog
+        :param cluster_type: DEDICATED or DEVELOPER
+        :param cloud_provider: The cloud provider, any if None
+        :param region: The region, any of the cloud provider if None
+        :return: The region specifications
+        """
+        from . import cache, catalog
+
+        url = f"{self.host}/api/v1beta/clusters/provider/regions"
+        resp_body = cache.get_catalog_cache().fetch(self.transport, url, self.digest_auth)
+        return catalog.get_catalog(resp_body).require(cluster_type, cloud_provider, region)
+
+
+def _backup(client: Client, args) -> dict:
+    from . import payloads, waiter
+
+    payload = payloads.backup_payload()
+    if args.name:
+        payload["name"] = payload["description"] = args.name
+    backup = client.request("POST", f"/api/v1beta/projects/{args.project_id}/clusters/{args.cluster_id}/backups",
+                            payload)
+    if args.wait:
+        return waiter.wait_for_backup(client, args.project_id, args.cluster_id, backup["id"], timeout=args.timeout)
+    return backup
+
+
+def _restore(client: Client, args) -> dict:
+    from . import pagination, payloads, preflight, waiter
+
+    backup_id = args.backup_id
+    if backup_id is None:
+        backup = waiter.latest_backup(pagination.iter_backups(client, args.project_id, args.cluster_id))
+        if backup is None:
+            raise Exception(f"no successful backup found for cluster {args.cluster_id}.")
+        backup_id = backup["id"]
+    source = client.get_cluster_by_id(args.project_id, args.cluster_id)
+    payload = payloads.restore_payload(backup_id, source, args.root_password)
+    preflight.check_cluster(payload, client.region_spec("DEDICATED", source.get("cloud_provider"),
+                                                        source.get("region")))
+    restore = client.request("POST", f"/api/v1beta/projects/{args.project_id}/restores", payload)
+    if args.wait:
+        return waiter.wait_for_cluster(client, args.project_id, restore["cluster_id"], timeout=args.timeout)
+    return restore
+
+
+def _create_cluster(client: Client, args) -> dict:
+    from . import payloads, preflight, waiter
+
+    if args.developer:
+        region_spec = client.region_spec("DEVELOPER", args.cloud_provider or "AWS", args.region)
+        payload = payloads.developer_cluster_payload(region_spec.region, args.name, args.root_password,
+                                                     region_spec.cloud_provider)
+    else:
+        region_spec = client.region_spec("DEDICATED", args.cloud_provider, args.region)
+        payload = payloads.dedicated_cluster_payload(region_spec.item, args.name, args.root_password)
+        preflight.check_cluster(payload, region_spec)
+    cluster = client.request("POST", f"/api/v1beta/projects/{args.project_id}/clusters", payload)
+    if args.wait:
+        return waiter.wait_for_cluster(client, args.project_id, cluster["id"], timeout=args.timeout)
+    return cluster
+
+
+def _scale_tiflash(client: Client, args) -> dict:
+    from . import preflight, shape, waiter
+
+    cluster = client.get_cluster_by_id(args.project_id, args.cluster_id)
+    region_spec = client.region_spec("DEDICATED", cluster.get("cloud_provider"), cluster.get("region"))
+    delta = 1 if args.target is None and args.delta is None else args.delta
+    node_size, storage_size_gib, current, quantity = shape.plan_tiflash(cluster, region_spec, args.target, delta)
+    changes = shape.diff_shape(cluster, {"tiflash": {"node_size": node_size, "storage_size_gib": storage_size_gib,
+                                                     "node_quantity": quantity}})
+    if not changes:
+        print(f"TiFlash already has {current} nodes, nothing to do.", file=sys.stderr)
+        return cluster
+    payload = shape.patch_payload(changes)
+    preflight.check_modify(payload, cluster, region_spec)
+    client.request("PATCH", f"/api/v1beta/projects/{args.project_id}/clusters/{args.cluster_id}", payload)
+    if args.wait:
+        return waiter.wait_until(lambda: client.get_cluster_by_id(args.project_id, args.cluster_id),
+                                 lambda c: waiter.cluster_status(c) == waiter.CLUSTER_AVAILABLE
+                                 and shape.tiflash_quantity(c) == quantity,
+                                 timeout=args.timeout)
+    return {"id": args.cluster_id, "tiflash_node_quantity": quantity}
+
+
+def _status(client: Client, args) -> dict:
+    return client.get_cluster_by_id(args.project_id, args.cluster_id)
+
+
+def _delete(client: Client, args) -> dict:
+    path = f"/api/v1beta/projects/{args.project_id}/clusters/{args.cluster_id}"
+    if args.backup_id is not None:
+        path = f"{path}/backups/{args.backup_id}"
+    return client.request("DELETE", path)
+
+
+def build_parser(parser_class=argparse.ArgumentParser) -> argparse.ArgumentParser:
+    """
+    :param parser_class: The parser class, of the subcommand parsers too
+    :return: The parser of the command line
+    """
+    parser = parser_class(prog="tidbcloud", description="TiDB Cloud API operations. The API key is read from "
+                                                        "TIDBCLOUD_PUBLIC_KEY and TIDBCLOUD_PRIVATE_KEY.")
+    parser.add_argument("--host", default=HOST, help="the API host (env TIDBCLOUD_HOST)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log the requests and responses to stderr")
+    parser.add_argument("--daemon", default=os.environ.get("TIDBCLOUD_DAEMON"),
+                        help="send the subcommand to the tidbcloud.daemon listening on this Unix socket path or "
+                             "http://host:port, which uses its own API host and key (env TIDBCLOUD_DAEMON)")
+    commands = parser.add_subparsers(dest="command", metavar="command", required=True)
+
+    def command(name: str, handler, help_text: str, cluster: bool = True) -> argparse.ArgumentParser:
+        sub = commands.add_parser(name, help=help_text, description=help_text)
+        sub.set_defaults(handler=handler)
+        sub.add_argument("project_id")
+        if cluster:
+            sub.add_argument("cluster_id")
+        return sub
+
+    def wait_arguments(sub: argparse.ArgumentParser, what: str):
+        sub.add_argument("--wait", action="store_true", help=f"wait until the {what}")
+        sub.add_argument("--timeout", type=float, default=3600, help="seconds to wait (default: 3600)")
+
+    def root_password_argument(sub: argparse.ArgumentParser):
+        sub.add_argument("--root-password", default=os.environ.get("TIDBCLOUD_ROOT_PASSWORD", "input_your_password"),
+                         help="the root password of the new cluster (env TIDBCLOUD_ROOT_PASSWORD)")
+
+    sub = command("backup", _backup, "create a manual backup of a cluster")
+    sub.add_argument("--name", help="the backup name, named after the current date by default")
+    wait_arguments(sub, "backup succeeds")
+
+    sub = command("restore", _restore, "restore a backup of a cluster to a new cluster with the same shape")
+    sub.add_argument("--backup-id", help="the backup to restore, the newest successful backup by default")
+    root_password_argument(sub)
+    wait_arguments(sub, "new cluster is AVAILABLE")
+
+    sub = command("create-cluster", _create_cluster, "create the smallest cluster of a region", cluster=False)
+    sub.add_argument("--developer", action="store_true", help="create a developer cluster instead of a dedicated one")
+    sub.add_argument("--name", help="the cluster name, named after the current time by default")
+    sub.add_argument("--cloud-provider", help="the cloud provider, any by default")
+    sub.add_argument("--region", help="the region, any of the cloud provider by default")
+    root_password_argument(sub)
+    wait_arguments(sub, "cluster is AVAILABLE")
+
+    sub = command("scale-tiflash", _scale_tiflash, "scale out the TiFlash nodes of a dedicated cluster")
+    target = sub.add_mutually_exclusive_group()
+    target.add_argument("--target", type=int, help="the wanted TiFlash node quantity")
+    target.add_argument("--delta", type=int, help="the number of TiFlash nodes to add (default: 1)")
+    wait_arguments(sub, "cluster is AVAILABLE with the new quantity")
+
+    command("status", _status, "get the detail of a cluster")
+
+    sub = command("delete", _delete, "delete a cluster, or one of its backups")
+    sub.add_argument("--backup-id", help="delete this backup instead of the cluster")
+    return parser
+
+
+def main(argv: list = None) -> int:
+    """
+    Run a subcommand
+    :param argv: The command line arguments, sys.argv[1:] if None
+    :return: The exit code
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    args = build_parser().parse_args(argv)
+    if args.verbose:
+        from . import log
+
+        log.setup(stream=sys.stderr)
+    try:
+        if args.daemon:
+            # The daemon parses the same command line, the client only needs the stdlib http.client
+            from .daemon import DaemonClient
+
+            result = DaemonClient(args.daemon).run(argv)
+        else:
+            result = args.handler(Client(args.host.rstrip("/")), args)
+    except Exception as e:
+        print(f"tidbcloud {args.command} failed : {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(result, indent=2), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
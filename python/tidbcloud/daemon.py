@@ -0,0 +1,348 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to keep one long-running process warm for many short operations: the daemon holds the keep-alive
+connections, the digest challenge, the specifications catalog and the recent cluster details in memory, and runs
+the subcommands of tidbcloud.cli sent over a Unix domain socket or a localhost HTTP port. An operation then only
+costs its API calls, instead of the interpreter startup, the imports and the TLS handshake of a new process.
+
+    python -m tidbcloud.daemon --socket /tmp/tidbcloud.sock
+    python -m tidbcloud --daemon /tmp/tidbcloud.sock backup <project id> <cluster id>
+
+The daemon holds the API key: prefer the Unix socket, only readable by its owner, to the HTTP port, which any
+local user can reach.
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+DEFAULT_STATE_TTL = 5.0
+
+
+class _ArgumentError(Exception):
+    pass
+
+
+class _Parser(argparse.ArgumentParser):
+    """
+    Command line parser raising the errors instead of exiting the daemon
+    """
+
+    def error(self, message):
+        raise _ArgumentError(message)
+
+    def exit(self, status=0, message=None):
+        raise _ArgumentError(message or "the command line only asks for the help")
+
+
+class Daemon:
+    def __init__(self, host: str = None, state_ttl: float = DEFAULT_STATE_TTL):
+        """
+        Runs the subcommands of tidbcloud.cli on one warm client
+        :param host: The API host, TIDBCLOUD_HOST by default
+        :param state_ttl: Seconds a cluster detail is served from memory by `status`
+        """
+        from . import cli
+
+        self.client = cli.Client((host or cli.HOST).rstrip("/"))
+        self.parser = cli.build_parser(_Parser)
+        self.state_ttl = state_ttl
+        self.started = time.monotonic()
+        self.counters = {}
+        self._clusters = {}
+        self._lock = threading.Lock()
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def warm_up(self):
+        """
+        Open the connection, take the digest challenge and fetch the catalog before the first operation
+        """
+        try:
+            self.client.region_spec("DEDICATED")
+        except Exception as e:
+            from . import log
+
+            log.logger.warning("daemon warm up failed : %s", e)
+
+    def status(self, project_id: str, cluster_id: str) -> dict:
+        """
+        The cluster detail, from memory when it was fetched less than `state_ttl` seconds ago
+        """
+        key = (project_id, cluster_id)
+        with self._lock:
+            cached = self._clusters.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.state_ttl:
+            self.count("state_hits")
+            return cached[1]
+        cluster = self.client.get_cluster_by_id(project_id, cluster_id)
+        with self._lock:
+            self._clusters[key] = (time.monotonic(), cluster)
+        return cluster
+
+    def forget(self, project_id: str, cluster_id: str):
+        with self._lock:
+            self._clusters.pop((project_id, cluster_id), None)
+
+    def run(self, argv: list) -> dict:
+        """
+        Run a command line of tidbcloud.cli, its `--host`, `--daemon` and `-v` options are ignored
+        :param argv: The command line arguments
+        :return: The result of the subcommand
+        """
+        args = self.parser.parse_args(argv)
+        self.count(f"operations_{args.command}")
+        if args.command == "status":
+            return self.status(args.project_id, args.cluster_id)
+        try:
+            return args.handler(self.client, args)
+        finally:
+            # The operation changed the cluster, the next status fetches it again
+            if getattr(args, "cluster_id", None) is not None:
+                self.forget(args.project_id, args.cluster_id)
+
+    def health(self) -> dict:
+        from . import auth
+
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "uptime": time.monotonic() - self.started,
+            "host": self.client.host,
+            "counters": counters,
+            "clusters_in_memory": len(self._clusters),
+            "pool": self.client.transport.stats.as_dict(),
+            "challenges": auth.get_challenge_cache().as_dict(),
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "TiDBCloudDaemon/1.0"
+    # Set on the subclass created by DaemonServer
+    daemon = None
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, self.daemon.health())
+            return
+        parts = self.path.strip("/").split("/")
+        if len(parts) == 3 and parts[0] == "clusters":
+            self._call(lambda: self.daemon.status(parts[1], parts[2]))
+            return
+        self._reply(404, {"error": f"{self.path} not found"})
+
+    def do_POST(self):
+        if self.path != "/run":
+            self._reply(404, {"error": f"{self.path} not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            argv = json.loads(self.rfile.read(length) or b"{}")["argv"]
+        except (ValueError, KeyError, TypeError):
+            self._reply(400, {"error": 'the body should be {"argv": [...]}'})
+            return
+        self._call(lambda: self.daemon.run(argv))
+
+    def log_message(self, *args):
+        pass
+
+    def _call(self, operation):
+        start = time.perf_counter()
+        try:
+            result = operation()
+        except _ArgumentError as e:
+            self._reply(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self.daemon.count("errors")
+            self._reply(500, {"error": str(e)})
+            return
+        self._reply(200, result, {"X-Operation-Seconds": f"{time.perf_counter() - start:.6f}"})
+
+    def _reply(self, code: int, result, headers: dict = None):
+        body = json.dumps(result).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _TcpHandler(_Handler):
+    # Headers and body are written separately, do not let Nagle delay the body of keep-alive responses
+    disable_nagle_algorithm = True
+
+
+class _TcpServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class DaemonServer:
+    def __init__(self, daemon: Daemon, socket_path: str = None, port: int = 0):
+        """
+        Serve a daemon from a background thread, on a Unix socket, or on localhost when socket_path is None
+        :param daemon: The daemon
+        :param socket_path: The Unix socket path, only readable and writable by the current user
+        :param port: The localhost port, a free one if 0
+        """
+        self.daemon = daemon
+        self.socket_path = socket_path
+        if socket_path is not None:
+            if os.path.exists(socket_path):
+                # A socket left by a daemon that did not stop cleanly, connecting to it would be refused
+                os.unlink(socket_path)
+            handler = type("_DaemonHandler", (_Handler,), {"daemon": daemon})
+            umask = os.umask(0o177)
+            try:
+                self.server = _UnixServer(socket_path, handler)
+            finally:
+                os.umask(umask)
+        else:
+            handler = type("_DaemonHandler", (_TcpHandler,), {"daemon": daemon})
+            self.server = _TcpServer(("127.0.0.1", port), handler)
+        self._thread = None
+
+    @property
+    def address(self) -> str:
+        """
+        The address to pass to DaemonClient and to `python -m tidbcloud --daemon`
+        """
+        if self.socket_path is not None:
+            return self.socket_path
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "DaemonServer":
+        self._thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05},
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        self.server.server_close()
+        if self.socket_path is not None and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float = None):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class DaemonClient:
+    def __init__(self, address: str, timeout: float = None):
+        """
+        Thin client of a daemon, on the stdlib only so that it starts fast
+        :param address: The Unix socket path, or http://host:port
+        :param timeout: Seconds to wait for a reply, forever if None as operations may wait for a cluster
+        """
+        self.address = address
+        self.timeout = timeout
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self.address.startswith("http://"):
+            parts = urlsplit(self.address)
+            return http.client.HTTPConnection(parts.hostname, parts.port, timeout=self.timeout)
+        return _UnixConnection(self.address, timeout=self.timeout)
+
+    def request(self, method: str, path: str, payload: dict = None) -> dict:
+        """
+        Send a request to the daemon
+        :return: The result, the error of the daemon is raised
+        """
+        connection = self._connection()
+        try:
+            body = json.dumps(payload) if payload is not None else None
+            connection.request(method, path, body=body, headers={"Content-Type": "application/json"})
+            resp = connection.getresponse()
+            result = json.loads(resp.read() or b"null")
+        except OSError as e:
+            raise Exception(f"daemon not reachable at {self.address} : {e}")
+        finally:
+            connection.close()
+        if resp.status != 200:
+            raise Exception(result.get("error") if isinstance(result, dict) else f"daemon error {resp.status}")
+        return result
+
+    def run(self, argv: list) -> dict:
+        return self.request("POST", "/run", {"argv": list(argv)})
+
+    def status(self, project_id: str, cluster_id: str) -> dict:
+        return self.request("GET", f"/clusters/{project_id}/{cluster_id}")
+
+    def health(self) -> dict:
+        return self.request("GET", "/health")
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Run the tidbcloud operations from a warm process")
+    parser.add_argument("--socket", default=os.environ.get("TIDBCLOUD_DAEMON_SOCKET"),
+                        help="the Unix socket to listen on (env TIDBCLOUD_DAEMON_SOCKET)")
+    parser.add_argument("--port", type=int, default=None, help="the localhost port to listen on, instead of a socket")
+    parser.add_argument("--host", default=None, help="the API host (env TIDBCLOUD_HOST)")
+    parser.add_argument("--state-ttl", type=float, default=DEFAULT_STATE_TTL,
+                        help="seconds a cluster detail is served from memory by status")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log the requests and responses")
+    args = parser.parse_args(argv)
+    if (args.socket is None) == (args.port is None):
+        parser.error("listen on either --socket or --port")
+    from . import log
+
+    log.setup(stream=sys.stderr)
+    if not args.verbose:
+        log.logger.setLevel("WARNING")
+    daemon = Daemon(args.host, args.state_ttl)
+    daemon.warm_up()
+    server = DaemonServer(daemon, args.socket, args.port or 0)
+    print(f"tidbcloud daemon listening on {server.address}", flush=True)
+    print(f"export TIDBCLOUD_DAEMON={server.address}", flush=True)
+    # Stop as on Ctrl-C, so that the socket is removed
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
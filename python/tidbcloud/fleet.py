@@ -0,0 +1,144 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to create manual backups for a whole fleet of Dedicated Tier clusters concurrently,
+track every backup until it completes and summarize the throughput and the per-cluster latency.
+"""
+import asyncio
+import time
+
+from . import pagination
+from .aio import AsyncTiDBCloud
+from .waiter import AsyncWaiter, backup_status
+
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_PER_PROJECT_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 3600
+BACKUP_DONE_STATUSES = ("SUCCESS", "FAILED")
+
+
+class BackupResult:
+    def __init__(self, project_id: str, cluster_id: str):
+        """
+        The outcome of the backup of one cluster
+        :param project_id: The project id
+        :param cluster_id: The cluster id
+        """
+        self.project_id = project_id
+        self.cluster_id = cluster_id
+        self.backup_id = None
+        self.status = None
+        self.error = None
+        self.started = None
+        self.finished = None
+
+    @property
+    def latency(self) -> float:
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+class FleetReport:
+    def __init__(self, results: list, elapsed: float):
+        """
+        Summary of a fleet backup run
+        :param results: The backup results
+        :param elapsed: The wall clock time of the run in seconds
+        """
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def succeeded(self) -> list:
+        return [result for result in self.results if result.status == "SUCCESS"]
+
+    @property
+    def throughput(self) -> float:
+        """
+        Completed backups per second
+        """
+        return len(self.succeeded) / self.elapsed if self.elapsed else 0.0
+
+    def latency_percentile(self, percentile: float) -> float:
+        latencies = sorted(result.latency for result in self.succeeded)
+        if not latencies:
+            return 0.0
+        index = min(len(latencies) - 1, int(round(percentile / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def summary(self) -> str:
+        lines = [f"clusters : {len(self.results)}, succeeded : {len(self.succeeded)}, "
+                 f"elapsed : {self.elapsed:.1f}s, throughput : {self.throughput:.3f} backups/s, "
+                 f"latency p50 : {self.latency_percentile(50):.1f}s, p95 : {self.latency_percentile(95):.1f}s, "
+                 f"max : {self.latency_percentile(100):.1f}s"]
+        for result in self.results:
+            lines.append(f"project : {result.project_id}, cluster : {result.cluster_id}, "
+                         f"backup : {result.backup_id}, status : {result.status}, latency : {result.latency:.1f}s"
+                         + (f", error : {result.error}" if result.error else ""))
+        return "\n".join(lines)
+
+
+async def list_fleet(client: AsyncTiDBCloud, project_ids: list) -> list:
+    """
+    List all the Dedicated Tier clusters of the given projects
+    :param client: The async client
+    :param project_ids: The project ids
+    :return: [(project id, cluster id)]
+    """
+
+    async def list_project(project_id: str) -> list:
+        return [(project_id, cluster["id"]) async for cluster in pagination.aiter_clusters(client, project_id)
+                if cluster.get("cluster_type") == "DEDICATED"]
+
+    per_project = await asyncio.gather(*[list_project(project_id) for project_id in project_ids])
+    return [cluster for clusters in per_project for cluster in clusters]
+
+
+async def backup_fleet(client: AsyncTiDBCloud, clusters: list = None, project_ids: list = None,
+                       max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                       per_project_concurrency: int = DEFAULT_PER_PROJECT_CONCURRENCY,
+                       waiter: AsyncWaiter = None, timeout: float = DEFAULT_TIMEOUT) -> FleetReport:
+    """
+    Create a manual backup for every cluster and wait until all of them complete
+    A cluster holds its concurrency slots from the backup creation until the backup completes.
+    :param client: The async client
+    :param clusters: [(project id, cluster id)] to back up
+    :param project_ids: Back up all the Dedicated Tier clusters of these projects when `clusters` is None
+    :param max_concurrency: The maximum number of backups in progress
+    :param per_project_concurrency: The maximum number of backups in progress in one project
+    :param waiter: The waiter polling the backups, a new one with the default backoff if None
+    :param timeout: Seconds to wait for one backup
+    :return: The run report
+    """
+    if clusters is None:
+        if not project_ids:
+            raise Exception("clusters or project_ids should be set.")
+        clusters = await list_fleet(client, project_ids)
+    waiter = waiter or AsyncWaiter()
+    fleet_semaphore = asyncio.Semaphore(max_concurrency)
+    project_semaphores = {project_id: asyncio.Semaphore(per_project_concurrency) for project_id, _ in clusters}
+
+    async def backup_cluster(result: BackupResult):
+        # Wait for the project slot first, so a busy project does not hold fleet slots
+        async with project_semaphores[result.project_id], fleet_semaphore:
+            result.started = time.monotonic()
+            try:
+                backup = await client.create_manual_backup(result.project_id, result.cluster_id)
+                result.backup_id = backup["id"]
+                backup = await waiter.wait(("backup", result.project_id, result.cluster_id, result.backup_id),
+                                           lambda: client.get_backup_info(result.project_id, result.cluster_id,
+                                                                          result.backup_id),
+                                           lambda backup: backup_status(backup) in BACKUP_DONE_STATUSES,
+                                           timeout=timeout)
+                result.status = backup_status(backup)
+            except Exception as e:
+                result.status = "ERROR"
+                result.error = str(e)
+            result.finished = time.monotonic()
+
+    results = [BackupResult(project_id, cluster_id) for project_id, cluster_id in clusters]
+    start = time.monotonic()
+    await asyncio.gather(*[backup_cluster(result) for result in results])
+    return FleetReport(results, time.monotonic() - start)
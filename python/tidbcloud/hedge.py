@@ -0,0 +1,144 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to cut the tail latency of reads with hedged requests: when a GET has not answered after the usual
+latency of its endpoint (e.g. its p95), the same GET is sent a second time and whichever answers first is kept.
+Only idempotent GET requests are hedged, the delay follows the latency percentiles of tidbcloud.metrics, and the
+hedges are capped to a fraction of the requests of each endpoint so that a slow API does not get twice the load.
+Hedging is opt-in: pass a HedgePolicy to the clients, or set TIDBCLOUD_HEDGE_PERCENTILE.
+"""
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from .metrics import Metrics
+
+DEFAULT_PERCENTILE = 95.0
+DEFAULT_MIN_DELAY = 0.01
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_MAX_RATIO = 0.1
+
+
+def _start(fetch) -> Future:
+    """
+    Run fetch in a daemon thread, so that a losing request still in flight does not hold the process at exit
+    """
+    future = Future()
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(fetch())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def _retrieve(task):
+    # A losing task may fail after the race, its error is not raised to anyone
+    if not task.cancelled():
+        task.exception()
+
+
+class HedgePolicy:
+    def __init__(self, percentile: float = None, min_delay: float = DEFAULT_MIN_DELAY,
+                 min_samples: int = DEFAULT_MIN_SAMPLES, max_ratio: float = None):
+        """
+        When to send a second request for a slow GET
+        :param percentile: The latency percentile of the endpoint after which the hedge is sent
+                           (env TIDBCLOUD_HEDGE_PERCENTILE, 95 by default)
+        :param min_delay: The minimum seconds to wait before the hedge
+        :param min_samples: The latency samples of the endpoint needed before its requests are hedged
+        :param max_ratio: The maximum ratio of hedges to requests of an endpoint (env TIDBCLOUD_HEDGE_MAX_RATIO)
+        """
+        if percentile is None:
+            percentile = float(os.environ.get("TIDBCLOUD_HEDGE_PERCENTILE") or DEFAULT_PERCENTILE)
+        if max_ratio is None:
+            max_ratio = float(os.environ.get("TIDBCLOUD_HEDGE_MAX_RATIO", DEFAULT_MAX_RATIO))
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.max_ratio = max_ratio
+
+    @classmethod
+    def from_environment(cls):
+        """
+        :return: The policy when TIDBCLOUD_HEDGE_PERCENTILE is set, None otherwise
+        """
+        return cls() if os.environ.get("TIDBCLOUD_HEDGE_PERCENTILE") else None
+
+    def delay(self, method: str, url: str, metrics: Metrics) -> float:
+        """
+        :param method: The HTTP method
+        :param url: The request url
+        :param metrics: The metrics of the client sending the request
+        :return: Seconds to wait before the hedge, None to not hedge the request
+        """
+        if method.upper() != "GET":
+            return None
+        seconds = metrics.latency_percentile(method, url, self.percentile, self.min_samples)
+        if seconds is None or metrics.hedge_ratio(method, url) >= self.max_ratio:
+            return None
+        return max(self.min_delay, seconds)
+
+    def call(self, method: str, url: str, fetch, metrics: Metrics, discard=None):
+        """
+        Call fetch, and call it again from another thread if the first call is slower than the delay
+        :param method: The HTTP method
+        :param url: The request url
+        :param fetch: Function sending the request and returning the response
+        :param metrics: The metrics giving the delay and recording the hedges
+        :param discard: Function called with the response of the losing request, e.g. to close it
+        :return: The first response, the error of the first call if both failed
+        """
+        delay = self.delay(method, url, metrics)
+        if delay is None:
+            return fetch()
+        primary = _start(fetch)
+        if wait([primary], timeout=delay).done:
+            return primary.result()
+        hedged = _start(fetch)
+        done, _ = wait([primary, hedged], return_when=FIRST_COMPLETED)
+        winner, loser = (primary, hedged) if primary in done else (hedged, primary)
+        if winner.exception() is not None and loser.exception() is None:
+            winner, loser = loser, winner
+        if discard is not None:
+            loser.add_done_callback(lambda future: future.exception() is None and discard(future.result()))
+        metrics.record_hedge(method, url, won=winner is hedged)
+        return winner.result()
+
+    async def acall(self, method: str, url: str, fetch, metrics: Metrics):
+        """
+        Async counterpart of call, the losing request is cancelled
+        :param fetch: Coroutine function sending the request and returning the response
+        """
+        import asyncio
+
+        delay = self.delay(method, url, metrics)
+        if delay is None:
+            return await fetch()
+        primary = asyncio.ensure_future(fetch())
+        hedged = None
+        try:
+            done, _ = await asyncio.wait([primary], timeout=delay)
+            if done:
+                return primary.result()
+            hedged = asyncio.ensure_future(fetch())
+            done, _ = await asyncio.wait([primary, hedged], return_when=asyncio.FIRST_COMPLETED)
+            winner, loser = (primary, hedged) if primary in done else (hedged, primary)
+            if winner.exception() is not None:
+                # The other request may still succeed
+                await asyncio.wait([loser])
+                if loser.exception() is None:
+                    winner = loser
+            metrics.record_hedge(method, url, won=winner is hedged)
+            return winner.result()
+        finally:
+            for task in (primary, hedged):
+                if task is not None and not task.done():
+                    task.cancel()
+                if task is not None:
+                    task.add_done_callback(_retrieve)
@@ -0,0 +1,223 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to keep a local SQLite inventory of all the projects and clusters of an organization.
+The crawl lists the projects concurrently, and a refresh only rewrites the rows whose status or config changed,
+so dashboards and planning scripts read the fleet state locally instead of scanning the API.
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+
+from . import pagination
+from .models import ClusterDetail
+
+DEFAULT_PATH = "tidbcloud_inventory.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    org_id TEXT,
+    refreshed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS clusters (
+    id TEXT PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    name TEXT,
+    cluster_type TEXT,
+    cloud_provider TEXT,
+    region TEXT,
+    status TEXT,
+    tidb_node_size TEXT,
+    tidb_node_quantity INTEGER,
+    tikv_node_size TEXT,
+    tikv_node_quantity INTEGER,
+    tikv_storage_size_gib INTEGER,
+    tiflash_node_size TEXT,
+    tiflash_node_quantity INTEGER,
+    tiflash_storage_size_gib INTEGER,
+    digest TEXT NOT NULL,
+    detail TEXT NOT NULL,
+    refreshed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS clusters_project_id ON clusters (project_id);
+CREATE INDEX IF NOT EXISTS clusters_status ON clusters (status);
+CREATE INDEX IF NOT EXISTS clusters_cloud_provider_region ON clusters (cloud_provider, region);
+CREATE INDEX IF NOT EXISTS clusters_region ON clusters (region);
+CREATE INDEX IF NOT EXISTS clusters_tidb_node_size ON clusters (tidb_node_size);
+CREATE INDEX IF NOT EXISTS clusters_tikv_node_size ON clusters (tikv_node_size);
+CREATE INDEX IF NOT EXISTS clusters_tiflash_node_size ON clusters (tiflash_node_size);
+"""
+
+_CLUSTER_COLUMNS = ("id", "project_id", "name", "cluster_type", "cloud_provider", "region", "status",
+                    "tidb_node_size", "tidb_node_quantity", "tikv_node_size", "tikv_node_quantity",
+                    "tikv_storage_size_gib", "tiflash_node_size", "tiflash_node_quantity", "tiflash_storage_size_gib",
+                    "digest", "detail", "refreshed_at")
+_QUERY_COLUMNS = ("project_id", "cluster_type", "cloud_provider", "region", "status",
+                  "tidb_node_size", "tikv_node_size", "tiflash_node_size")
+
+
+class RefreshStats:
+    def __init__(self):
+        """
+        Counters of one inventory refresh
+        """
+        self.projects = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deleted = 0
+        self.elapsed = 0.0
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+
+def _digest(cluster: dict) -> str:
+    """
+    Fingerprint of the fields whose change triggers a row rewrite
+    """
+    state = json.dumps({"status": cluster.get("status"), "config": cluster.get("config")}, sort_keys=True)
+    return hashlib.sha1(state.encode("utf-8")).hexdigest()
+
+
+def _cluster_row(cluster: dict, digest: str, refreshed_at: float) -> tuple:
+    components = (cluster.get("config") or {}).get("components") or {}
+    tidb = components.get("tidb") or {}
+    tikv = components.get("tikv") or {}
+    tiflash = components.get("tiflash") or {}
+    return (cluster["id"], cluster.get("project_id"), cluster.get("name"), cluster.get("cluster_type"),
+            cluster.get("cloud_provider"), cluster.get("region"), (cluster.get("status") or {}).get("cluster_status"),
+            tidb.get("node_size"), tidb.get("node_quantity"),
+            tikv.get("node_size"), tikv.get("node_quantity"), tikv.get("storage_size_gib"),
+            tiflash.get("node_size"), tiflash.get("node_quantity"), tiflash.get("storage_size_gib"),
+            digest, json.dumps(cluster), refreshed_at)
+
+
+class Inventory:
+    def __init__(self, path: str = DEFAULT_PATH):
+        """
+        Local SQLite inventory of the projects and clusters
+        :param path: The database file, ":memory:" for a throwaway inventory
+        """
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    async def refresh(self, client, project_ids: list = None, max_concurrency: int = 16) -> RefreshStats:
+        """
+        Crawl the projects and their clusters with the async client and apply the changes to the inventory
+        Clusters that disappeared from a crawled project are deleted, and so are the projects that disappeared
+        with their clusters when all the accessible projects are crawled.
+        :param client: The async client (tidbcloud.aio.AsyncTiDBCloud)
+        :param project_ids: The projects to crawl, all the accessible projects if None
+        :param max_concurrency: The maximum number of projects listed at the same time
+        :return: The refresh counters
+        """
+        start = time.monotonic()
+        refreshed_at = time.time()
+        if project_ids is None:
+            projects = [project async for project in pagination.aiter_projects(client, prefetch=True)]
+        else:
+            projects = [{"id": project_id} for project_id in project_ids]
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def list_clusters(project_id: str) -> list:
+            async with semaphore:
+                return [cluster async for cluster in pagination.aiter_clusters(client, project_id, prefetch=True)]
+
+        clusters_per_project = await asyncio.gather(*[list_clusters(project["id"]) for project in projects])
+        stats = self._apply(projects, clusters_per_project, refreshed_at, complete=project_ids is None)
+        stats.elapsed = time.monotonic() - start
+        return stats
+
+    def _apply(self, projects: list, clusters_per_project: list, refreshed_at: float,
+               complete: bool = False) -> RefreshStats:
+        """
+        :param complete: Whether projects lists every accessible project, the rows of the others are then deleted
+        """
+        stats = RefreshStats()
+        stats.projects = len(projects)
+        project_ids = [project["id"] for project in projects]
+        known = {}
+        if complete:
+            for row in self.conn.execute("SELECT id, digest FROM clusters"):
+                known[row["id"]] = row["digest"]
+        else:
+            for project_id in project_ids:
+                for row in self.conn.execute("SELECT id, digest FROM clusters WHERE project_id = ?", (project_id,)):
+                    known[row["id"]] = row["digest"]
+        rows = []
+        for project, clusters in zip(projects, clusters_per_project):
+            for cluster in clusters:
+                if "project_id" not in cluster:
+                    # Copy instead of writing into the response, which other readers may share
+                    cluster = dict(cluster, project_id=project["id"])
+                digest = _digest(cluster)
+                previous = known.pop(cluster["id"], None)
+                if previous == digest:
+                    stats.unchanged += 1
+                    continue
+                if previous is None:
+                    stats.inserted += 1
+                else:
+                    stats.updated += 1
+                rows.append(_cluster_row(cluster, digest, refreshed_at))
+        stats.deleted = len(known)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO projects (id, name, org_id, refreshed_at) VALUES (?, ?, ?, ?)",
+                [(project["id"], project.get("name"), project.get("org_id"), refreshed_at) for project in projects
+                 if "name" in project])
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO clusters ({', '.join(_CLUSTER_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_CLUSTER_COLUMNS))})", rows)
+            self.conn.executemany("DELETE FROM clusters WHERE id = ?", [(cluster_id,) for cluster_id in known])
+            if complete:
+                # Every listed project was just written with refreshed_at
+                self.conn.execute("DELETE FROM projects WHERE refreshed_at < ?", (refreshed_at,))
+        return stats
+
+    def _details(self, filters: dict):
+        unknown = set(filters) - set(_QUERY_COLUMNS)
+        if unknown:
+            raise Exception(f"unknown inventory filters : {sorted(unknown)}")
+        where = " AND ".join(f"{column} = ?" for column in filters) or "1"
+        for row in self.conn.execute(f"SELECT detail FROM clusters WHERE {where} ORDER BY id", tuple(filters.values())):
+            yield json.loads(row["detail"])
+
+    def clusters(self, **filters) -> list:
+        """
+        Query the clusters, e.g. clusters(status="AVAILABLE", region="us-west-2")
+        :param filters: Equality filters on project_id, cluster_type, cloud_provider, region, status,
+                        tidb_node_size, tikv_node_size or tiflash_node_size
+        :return: The matching cluster details
+        """
+        return list(self._details(filters))
+
+    def cluster_models(self, **filters) -> list:
+        """
+        Query the clusters as models, to keep many of them in memory, see tidbcloud.models
+        :param filters: The same filters as clusters
+        :return: The matching clusters, as ClusterDetail
+        """
+        return [ClusterDetail.from_json(detail) for detail in self._details(filters)]
+
+    def count_by(self, column: str) -> dict:
+        """
+        Count the clusters by a column, e.g. count_by("status")
+        :param column: One of the query columns
+        :return: {value: count}
+        """
+        if column not in _QUERY_COLUMNS:
+            raise Exception(f"unknown inventory column : {column}")
+        return {row[0]: row[1] for row in
+                self.conn.execute(f"SELECT {column}, COUNT(*) FROM clusters GROUP BY {column}")}
@@ -0,0 +1,156 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to log API requests and responses cheaply with the stdlib `logging` module.
+Bodies are only decoded and formatted when a record is actually emitted, success logs are sampled and
+truncated, error bodies are kept in full, and `root_password` is redacted from every logged payload.
+The method, url, status_code and elapsed seconds are attached to the records as fields, e.g. `record.status_code`,
+for the formatters and handlers of the application.
+"""
+import contextvars
+import logging
+import os
+import random
+import re
+import sys
+
+DEFAULT_MAX_BODY = 1024
+DEFAULT_SAMPLE_RATE = 1.0
+
+logger = logging.getLogger("tidbcloud")
+
+_ROOT_PASSWORD = re.compile(r'("root_password"\s*:\s*)"(?:[^"\\]|\\.)*"')
+# The sampling decision of the request logged last in this thread or task, kept for its response
+_exchange_sampled = contextvars.ContextVar("tidbcloud_log_sampled", default=None)
+
+
+def redact(text: str) -> str:
+    return _ROOT_PASSWORD.sub(r'\1"******"', text)
+
+
+class _Body:
+    def __init__(self, body, max_size: int = None):
+        """
+        A request or response body formatted only when the log record is emitted
+        :param body: The body, as text, or a response whose text is decoded lazily
+        :param max_size: Truncate the body to this number of characters, keep it in full if None
+        """
+        self.body = body
+        self.max_size = max_size
+
+    def __str__(self) -> str:
+        text = self.body if isinstance(self.body, str) or self.body is None else self.body.text
+        if not text:
+            return ""
+        # Redact before truncating, a cut inside the password would leave it unmatched
+        text = redact(text)
+        if self.max_size is not None and len(text) > self.max_size:
+            text = f"{text[:self.max_size]}... ({len(text)} chars)"
+        return text
+
+
+class LogConfig:
+    def __init__(self, max_body: int = None, sample_rate: float = None):
+        """
+        How much of the successful traffic is logged
+        :param max_body: Truncate success bodies to this number of characters (env TIDBCLOUD_LOG_MAX_BODY)
+        :param sample_rate: The fraction of successful requests logged (env TIDBCLOUD_LOG_SAMPLE_RATE)
+        """
+        if max_body is None:
+            max_body = int(os.environ.get("TIDBCLOUD_LOG_MAX_BODY", DEFAULT_MAX_BODY))
+        if sample_rate is None:
+            sample_rate = float(os.environ.get("TIDBCLOUD_LOG_SAMPLE_RATE", DEFAULT_SAMPLE_RATE))
+        self.max_body = max_body
+        self.sample_rate = sample_rate
+
+    def sampled(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+
+_config = LogConfig()
+
+
+def configure(**kwargs) -> LogConfig:
+    """
+    Change the truncation and the sampling, e.g. configure(max_body=256, sample_rate=0.01)
+    :return: The new config
+    """
+    global _config
+    _config = LogConfig(**kwargs)
+    return _config
+
+
+def setup(level: int = logging.INFO, stream=None):
+    """
+    Print the tidbcloud logs to stdout, as the samples did with print
+    Does nothing when the application already configured a handler.
+    :param level: The log level
+    :param stream: The stream the logs are written to, stdout if None
+    """
+    if logger.handlers or logging.getLogger().handlers:
+        return
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+
+
+def _fields(resp) -> dict:
+    """
+    The fields of a response log record, None when the response does not tell
+    """
+    request = getattr(resp, "request", None)
+    try:
+        elapsed = resp.elapsed.total_seconds()
+    except (AttributeError, RuntimeError):
+        # httpx only knows the elapsed time once the response is closed
+        elapsed = None
+    return {"method": getattr(request, "method", None), "url": str(resp.url) if getattr(resp, "url", None) else None,
+            "status_code": resp.status_code, "elapsed": elapsed}
+
+
+def log_request(method: str, url: str, payload: str = None):
+    """
+    Log a request, the payload is truncated and redacted
+    The sampling decision is kept for the response logged next in the same thread or task.
+    :param method: The HTTP method
+    :param url: The request url
+    :param payload: The JSON payload
+    """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    sampled = _config.sampled()
+    _exchange_sampled.set(sampled)
+    if not sampled:
+        return
+    extra = {"method": method, "url": url}
+    if payload is None:
+        logger.info("Method: %s, Request: %s", method, url, extra=extra)
+    else:
+        logger.info("Method: %s, Request: %s, Payload: %s", method, url, _Body(payload, _config.max_body),
+                    extra=extra)
+
+
+def log_response(resp):
+    """
+    Log a successful response, the body is truncated and redacted
+    The response is logged when its request was, and sampled on its own when its request was not logged.
+    :param resp: The response
+    """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    sampled = _exchange_sampled.get()
+    _exchange_sampled.set(None)
+    if not (_config.sampled() if sampled is None else sampled):
+        return
+    logger.info("response : %s", _Body(resp, _config.max_body), extra=_fields(resp))
+
+
+def log_error(resp):
+    """
+    Log a failed response with its full body
+    :param resp: The response
+    """
+    _exchange_sampled.set(None)
+    logger.error("request invalid, code : %s, message : %s", resp.status_code, _Body(resp), extra=_fields(resp))
@@ -0,0 +1,336 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to find which API calls dominate the runtime of an automation.
+Every request sent by the shared transport and by the async client is recorded per endpoint: latency histogram
+and percentiles, errors by status code, bytes sent and received, and the connect, TLS and time-to-first-byte
+phases. Hooks receive each request event, and the metrics are exported in the Prometheus text format.
+The hedged requests of tidbcloud.hedge and the circuit states of tidbcloud.breaker are exported with them.
+"""
+import atexit
+import bisect
+import collections
+import json
+import math
+import os
+import re
+import threading
+
+from . import log
+
+# Prometheus default buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_RESERVOIR = 1024
+# Values of the circuit state gauge
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+_ID_SEGMENT = re.compile(r"/(project|cluster|backup|restore)s/\d+")
+
+
+def endpoint(url: str) -> str:
+    """
+    Normalize a request url into an endpoint label
+    e.g. https://api.tidbcloud.com/api/v1beta/projects/1/clusters?page=2 -> /api/v1beta/projects/{project_id}/clusters
+    :param url: The request url
+    :return: The path, with the ids replaced by placeholders and without the query
+    """
+    path = re.sub(r"^[a-z]+://[^/]+", "", url).split("?", 1)[0]
+    return _ID_SEGMENT.sub(lambda m: f"/{m[1]}s/{{{m[1]}_id}}", path)
+
+
+class RequestEvent:
+    def __init__(self, method: str, url: str, status_code: int = None, seconds: float = 0.0, bytes_out: int = 0,
+                 bytes_in: int = 0, phases: dict = None, error: BaseException = None):
+        """
+        One HTTP exchange, as passed to the hooks
+        :param method: The HTTP method
+        :param url: The request url
+        :param status_code: The response status code, None if no response was received
+        :param seconds: The time from sending the request to receiving the whole response
+        :param bytes_out: The size of the request body
+        :param bytes_in: The size of the response body
+        :param phases: Seconds spent per phase, among connect, tls and ttfb, for the phases that happened
+        :param error: The exception raised instead of a response
+        """
+        self.method = method.upper()
+        self.url = url
+        self.endpoint = endpoint(url)
+        self.status_code = status_code
+        self.seconds = seconds
+        self.bytes_out = bytes_out
+        self.bytes_in = bytes_in
+        self.phases = phases or {}
+        self.error = error
+
+    @property
+    def status(self) -> str:
+        if self.error is not None:
+            return type(self.error).__name__
+        return str(self.status_code)
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None or self.status_code >= 400
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS, reservoir: int = DEFAULT_RESERVOIR):
+        """
+        Cumulative buckets for the export, and the latest samples for the percentiles
+        :param buckets: The bucket upper bounds, in seconds
+        :param reservoir: The number of latest samples the percentiles are computed on
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.samples = collections.deque(maxlen=reservoir)
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.samples.append(value)
+
+    def percentile(self, p: float) -> float:
+        """
+        :param p: The percentile, between 0 and 100
+        :return: The nearest-rank percentile of the latest samples, 0.0 without samples
+        """
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered), max(1, math.ceil(p / 100 * len(ordered)))) - 1]
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{v}"' for k, v in labels.items())
+
+
+def _bound(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(value)
+
+
+class Metrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS, reservoir: int = DEFAULT_RESERVOIR):
+        """
+        Request metrics, keyed by method and endpoint
+        :param buckets: The latency bucket upper bounds, in seconds
+        :param reservoir: The number of latest samples the percentiles are computed on
+        """
+        self.buckets = buckets
+        self.reservoir = reservoir
+        self._lock = threading.Lock()
+        self._hooks = []
+        self.latency = {}
+        self.errors = collections.Counter()
+        self.bytes_out = collections.Counter()
+        self.bytes_in = collections.Counter()
+        self.phases = {}
+        self.hedges = collections.Counter()
+        self.hedge_wins = collections.Counter()
+        self.circuits = {}
+        self.rejections = collections.Counter()
+
+    def add_hook(self, hook):
+        """
+        Call hook(event) with the RequestEvent of every request, after it is recorded
+        Hooks run on the request path, they should be fast and must not raise.
+        """
+        with self._lock:
+            self._hooks = self._hooks + [hook]
+
+    def remove_hook(self, hook):
+        with self._lock:
+            self._hooks = [h for h in self._hooks if h is not hook]
+
+    def _histogram(self, histograms: dict, key) -> Histogram:
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(self.buckets, self.reservoir)
+        return histogram
+
+    def record(self, event: RequestEvent):
+        """
+        Record one request and pass it to the hooks
+        :param event: The request event
+        """
+        key = (event.method, event.endpoint)
+        with self._lock:
+            self._histogram(self.latency, key).observe(event.seconds)
+            if event.failed:
+                self.errors[key + (event.status,)] += 1
+            self.bytes_out[key] += event.bytes_out
+            self.bytes_in[key] += event.bytes_in
+            for phase, seconds in event.phases.items():
+                self._histogram(self.phases, phase).observe(seconds)
+            hooks = self._hooks
+        for hook in hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                log.logger.warning("metrics hook %r failed! exception: %s", hook, e)
+
+    def record_hedge(self, method: str, url: str, won: bool):
+        """
+        Record a hedged request, see tidbcloud.hedge
+        :param won: Whether the hedge answered before the first request
+        """
+        key = (method.upper(), endpoint(url))
+        with self._lock:
+            self.hedges[key] += 1
+            self.hedge_wins[key] += int(won)
+
+    def record_circuit(self, method: str, url: str, state: str, rejected: bool = False):
+        """
+        Record the circuit state of an endpoint, see tidbcloud.breaker
+        :param state: The state, one of CIRCUIT_STATES
+        :param rejected: Whether a request was rejected without being sent
+        """
+        key = (method.upper(), endpoint(url))
+        with self._lock:
+            self.circuits[key] = state
+            self.rejections[key] += int(rejected)
+
+    def latency_percentile(self, method: str, url: str, p: float, min_samples: int = 1) -> float:
+        """
+        :return: The p-th latency percentile of the endpoint, None with fewer than min_samples samples
+        """
+        with self._lock:
+            histogram = self.latency.get((method.upper(), endpoint(url)))
+            if histogram is None or len(histogram.samples) < max(1, min_samples):
+                return None
+            return histogram.percentile(p)
+
+    def hedge_ratio(self, method: str, url: str) -> float:
+        """
+        :return: The hedged requests of the endpoint per request sent
+        """
+        key = (method.upper(), endpoint(url))
+        with self._lock:
+            histogram = self.latency.get(key)
+            return self.hedges[key] / histogram.count if histogram is not None and histogram.count else 0.0
+
+    def summary(self) -> dict:
+        """
+        :return: Per "METHOD endpoint": count, total_seconds, p50, p95, p99, errors by status, bytes_out and bytes_in,
+                 hedges, hedge_wins, and the circuit state with the rejected requests,
+                 and the p50, p95 and p99 of each connection phase under "phases"
+        """
+        with self._lock:
+            endpoints = {}
+            for (method, path), histogram in sorted(self.latency.items(), key=lambda item: -item[1].sum):
+                key = (method, path)
+                endpoints[f"{method} {path}"] = {
+                    "count": histogram.count,
+                    "total_seconds": histogram.sum,
+                    "p50": histogram.percentile(50),
+                    "p95": histogram.percentile(95),
+                    "p99": histogram.percentile(99),
+                    "errors": {status: n for (m, p, status), n in self.errors.items() if (m, p) == key},
+                    "bytes_out": self.bytes_out[key],
+                    "bytes_in": self.bytes_in[key],
+                    "hedges": self.hedges[key],
+                    "hedge_wins": self.hedge_wins[key],
+                    "circuit": self.circuits.get(key, "closed"),
+                    "rejected": self.rejections[key],
+                }
+            phases = {phase: {"count": h.count, "p50": h.percentile(50), "p95": h.percentile(95),
+                              "p99": h.percentile(99)} for phase, h in self.phases.items()}
+            return {"endpoints": endpoints, "phases": phases}
+
+    def to_prometheus(self) -> str:
+        """
+        :return: The metrics in the Prometheus text exposition format
+        """
+        lines = []
+        with self._lock:
+            lines.append("# HELP tidbcloud_request_duration_seconds TiDB Cloud API request latency.")
+            lines.append("# TYPE tidbcloud_request_duration_seconds histogram")
+            for (method, path), histogram in sorted(self.latency.items()):
+                labels = _labels(method=method, endpoint=path)
+                for bound, count in histogram.cumulative():
+                    lines.append(f'tidbcloud_request_duration_seconds_bucket{{{labels},le="{_bound(bound)}"}} {count}')
+                lines.append(f"tidbcloud_request_duration_seconds_sum{{{labels}}} {histogram.sum!r}")
+                lines.append(f"tidbcloud_request_duration_seconds_count{{{labels}}} {histogram.count}")
+            lines.append("# HELP tidbcloud_request_errors_total TiDB Cloud API failed requests by status.")
+            lines.append("# TYPE tidbcloud_request_errors_total counter")
+            for (method, path, status), count in sorted(self.errors.items()):
+                lines.append(f"tidbcloud_request_errors_total{{{_labels(method=method, endpoint=path, status=status)}}}"
+                             f" {count}")
+            for name, counter, help_text in (("tidbcloud_request_bytes_total", self.bytes_out, "Request body bytes."),
+                                             ("tidbcloud_response_bytes_total", self.bytes_in,
+                                              "Response body bytes.")):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for (method, path), count in sorted(counter.items()):
+                    lines.append(f"{name}{{{_labels(method=method, endpoint=path)}}} {count}")
+            for name, counter, help_text in (("tidbcloud_hedged_requests_total", self.hedges,
+                                              "GET requests sent a second time after the hedge delay."),
+                                             ("tidbcloud_hedge_wins_total", self.hedge_wins,
+                                              "Hedged requests answered before the first request."),
+                                             ("tidbcloud_circuit_rejections_total", self.rejections,
+                                              "Requests rejected by an open circuit without being sent.")):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for (method, path), count in sorted(counter.items()):
+                    lines.append(f"{name}{{{_labels(method=method, endpoint=path)}}} {count}")
+            lines.append("# HELP tidbcloud_circuit_state Circuit breaker state: 0 closed, 1 half open, 2 open.")
+            lines.append("# TYPE tidbcloud_circuit_state gauge")
+            for (method, path), state in sorted(self.circuits.items()):
+                lines.append(f"tidbcloud_circuit_state{{{_labels(method=method, endpoint=path)}}} "
+                             f"{CIRCUIT_STATES[state]}")
+            lines.append("# HELP tidbcloud_connection_phase_seconds Connect, TLS and time-to-first-byte durations.")
+            lines.append("# TYPE tidbcloud_connection_phase_seconds histogram")
+            for phase, histogram in sorted(self.phases.items()):
+                labels = _labels(phase=phase)
+                for bound, count in histogram.cumulative():
+                    lines.append(f'tidbcloud_connection_phase_seconds_bucket{{{labels},le="{_bound(bound)}"}} {count}')
+                lines.append(f"tidbcloud_connection_phase_seconds_sum{{{labels}}} {histogram.sum!r}")
+                lines.append(f"tidbcloud_connection_phase_seconds_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """
+        Write the metrics to a file, as JSON if the path ends with .json, in the Prometheus text format otherwise
+        (e.g. for the node_exporter textfile collector). The file is replaced atomically.
+        :param path: The file path
+        """
+        text = json.dumps(self.summary(), indent=2) if path.endswith(".json") else self.to_prometheus()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+_shared_metrics = None
+_shared_lock = threading.Lock()
+
+
+def _write_at_exit(metrics: Metrics, path: str):
+    try:
+        metrics.write(path)
+    except OSError as e:
+        log.logger.warning("metrics not saved! exception: %s", e)
+
+
+def get_metrics() -> Metrics:
+    """
+    Get the metrics shared by every client in the process
+    When TIDBCLOUD_METRICS_FILE is set, they are written to that file when the process exits.
+    :return: The shared metrics
+    """
+    global _shared_metrics
+    with _shared_lock:
+        if _shared_metrics is None:
+            _shared_metrics = Metrics()
+            if os.environ.get("TIDBCLOUD_METRICS_FILE"):
+                atexit.register(_write_at_exit, _shared_metrics, os.environ["TIDBCLOUD_METRICS_FILE"])
+        return _shared_metrics
@@ -0,0 +1,627 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to run the samples and the shared clients offline, against a local stand-in of the TiDB Cloud API.
+The server implements the endpoints used by the samples behind digest auth: projects, provider regions,
+clusters, backups and restores. Clusters go from CREATING, MODIFYING or RESTORING to AVAILABLE and backups from
+PENDING to SUCCESS after a configurable time, and latency, 5xx errors and 429 throttling can be injected,
+so that the clients can be measured locally and repeatably.
+
+    python -m tidbcloud.mockserver --port 8080 --latency 0.05 --throttle-rate 0.1
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+REALM = "tidb.cloud"
+DEFAULT_PUBLIC_KEY = "public"
+DEFAULT_PRIVATE_KEY = "private"
+TIDB_VERSION = "v6.1.0"
+
+PROVIDER_REGIONS = [
+    ("AWS", "us-west-2"),
+    ("AWS", "eu-central-1"),
+    ("GCP", "us-west1"),
+]
+DEDICATED_SPECIFICATIONS = {
+    "tidb": [
+        {"node_size": "4C16G", "node_quantity_range": {"min": 1, "step": 1}},
+        {"node_size": "8C16G", "node_quantity_range": {"min": 1, "step": 1}},
+        {"node_size": "16C32G", "node_quantity_range": {"min": 1, "step": 1}},
+    ],
+    "tikv": [
+        {"node_size": "4C16G", "storage_size_gib_range": {"min": 200, "max": 2048},
+         "node_quantity_range": {"min": 3, "step": 3}},
+        {"node_size": "8C32G", "storage_size_gib_range": {"min": 500, "max": 4096},
+         "node_quantity_range": {"min": 3, "step": 3}},
+    ],
+    "tiflash": [
+        {"node_size": "8C64G", "storage_size_gib_range": {"min": 500, "max": 2048},
+         "node_quantity_range": {"min": 0, "step": 1}},
+        {"node_size": "16C128G", "storage_size_gib_range": {"min": 500, "max": 2048},
+         "node_quantity_range": {"min": 0, "step": 1}},
+    ],
+}
+DEFAULT_COMPONENTS = {
+    "tidb": {"node_size": "8C16G", "node_quantity": 2},
+    "tikv": {"node_size": "8C32G", "storage_size_gib": 500, "node_quantity": 3},
+    "tiflash": None,
+}
+DEVELOPER_COMPONENTS = {
+    "tidb": {"node_size": "Shared0", "node_quantity": 1},
+    "tikv": {"node_size": "Shared0", "storage_size_gib": 1, "node_quantity": 1},
+    "tiflash": {"node_size": "Shared0", "storage_size_gib": 1, "node_quantity": 1},
+}
+
+
+class MockConfig:
+    def __init__(self, public_key: str = DEFAULT_PUBLIC_KEY, private_key: str = DEFAULT_PRIVATE_KEY,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, throttle_rate: float = 0.0,
+                 retry_after: float = 1, create_seconds: float = 1.0, modify_seconds: float = 1.0,
+                 backup_seconds: float = 1.0, restore_seconds: float = 1.0, seed: int = None):
+        """
+        Behaviour of the mock server
+        :param public_key: The accepted public key
+        :param private_key: The accepted private key
+        :param latency: Seconds added to every authenticated response
+        :param jitter: Up to this many seconds added at random to the latency
+        :param error_rate: The fraction of authenticated requests answered with 500
+        :param throttle_rate: The fraction of authenticated requests answered with 429
+        :param retry_after: The Retry-After header of the 429 responses, in seconds
+        :param create_seconds: Seconds a new cluster stays CREATING
+        :param modify_seconds: Seconds a modified cluster stays MODIFYING
+        :param backup_seconds: Seconds a new backup stays PENDING
+        :param restore_seconds: Seconds a restored cluster stays RESTORING
+        :param seed: Seed of the fault injection, for repeatable runs
+        """
+        self.public_key = public_key
+        self.private_key = private_key
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.create_seconds = create_seconds
+        self.modify_seconds = modify_seconds
+        self.backup_seconds = backup_seconds
+        self.restore_seconds = restore_seconds
+        self.random = random.Random(seed)
+
+
+class ApiError(Exception):
+    def __init__(self, status_code: int, message: str):
+        """
+        Error answered with the TiDB Cloud error body
+        :param status_code: The HTTP status code
+        :param message: The error message
+        """
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def _int(value, field: str) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"invalid {field}: {value}")
+
+
+def _components(components: dict, current: dict = None) -> dict:
+    """
+    Merge requested components into the current ones, with numbers as the API returns them
+    """
+    merged = {name: dict(spec) if spec else None for name, spec in (current or {}).items()}
+    for name, spec in (components or {}).items():
+        if name not in ("tidb", "tikv", "tiflash"):
+            raise ApiError(400, f"unknown component: {name}")
+        if spec is None:
+            continue
+        component = merged.get(name) or {}
+        for field, value in spec.items():
+            component[field] = _int(value, f"{name}.{field}") if field in ("node_quantity", "storage_size_gib") \
+                else value
+        merged[name] = component
+    for name in ("tidb", "tikv"):
+        if not merged.get(name) or "node_size" not in merged[name] or "node_quantity" not in merged[name]:
+            raise ApiError(400, f"{name} node_size and node_quantity are required")
+    merged.setdefault("tiflash", None)
+    return merged
+
+
+def _page(items: list, query: dict) -> dict:
+    page = _int(query.get("page", ["1"])[0], "page")
+    page_size = _int(query.get("page_size", ["10"])[0], "page_size")
+    if page < 1 or page_size < 1:
+        raise ApiError(400, "page and page_size should be positive")
+    return {"items": items[(page - 1) * page_size:page * page_size], "total": len(items)}
+
+
+class MockState:
+    def __init__(self, config: MockConfig):
+        """
+        In-memory projects, clusters, backups and restores
+        Status transitions are applied lazily, when a resource is read.
+        :param config: The server config
+        """
+        self.config = config
+        self.projects = {}
+        self.clusters = {}
+        self.backups = {}
+        self.restores = {}
+        self._next_id = 1372813089454000000
+        self._lock = threading.RLock()
+        self.catalog = {"items": [
+            {"cluster_type": cluster_type, "cloud_provider": provider, "region": region,
+             **(DEDICATED_SPECIFICATIONS if cluster_type == "DEDICATED" else {"tidb": [], "tikv": [], "tiflash": []})}
+            for provider, region in PROVIDER_REGIONS for cluster_type in ("DEDICATED", "DEVELOPER")
+        ]}
+        self.catalog_etag = '"' + hashlib.md5(json.dumps(self.catalog).encode("utf-8")).hexdigest() + '"'
+
+    def new_id(self) -> str:
+        with self._lock:
+            self._next_id += 1
+            return str(self._next_id)
+
+    def seed(self, projects: int = 1, clusters: int = 1, backups: int = 1) -> list:
+        """
+        Add AVAILABLE Dedicated Tier clusters with successful backups
+        :param projects: The number of projects to add
+        :param clusters: The number of clusters per project
+        :param backups: The number of backups per cluster
+        :return: [(project id, cluster id)] of the new clusters
+        """
+        seeded = []
+        with self._lock:
+            for p in range(projects):
+                project = self.add_project(f"mock-project-{len(self.projects) + 1}")
+                for c in range(clusters):
+                    cluster = self.add_cluster(project["id"], {
+                        "name": f"mock-cluster-{c + 1}", "cluster_type": "DEDICATED", "cloud_provider": "AWS",
+                        "region": "us-west-2", "config": {"port": 4000, "components": DEFAULT_COMPONENTS}})
+                    cluster["_ready_at"] = 0
+                    for b in range(backups):
+                        backup = self.add_backup(cluster, {"name": f"tidbcloud-backup-{b + 1}"})
+                        backup["_ready_at"] = 0
+                    seeded.append((project["id"], cluster["id"]))
+        return seeded
+
+    def add_project(self, name: str) -> dict:
+        project_id = self.new_id()
+        project = {"id": project_id, "org_id": "1", "name": name, "cluster_count": 0, "user_count": 1,
+                   "create_timestamp": str(int(time.time()))}
+        self.projects[project_id] = project
+        return project
+
+    def project(self, project_id: str) -> dict:
+        if project_id not in self.projects:
+            raise ApiError(404, f"project {project_id} not found")
+        return self.projects[project_id]
+
+    def add_cluster(self, project_id: str, payload: dict, status: str = "CREATING",
+                    seconds: float = None) -> dict:
+        project = self.project(project_id)
+        for field in ("name", "cluster_type", "cloud_provider", "region"):
+            if not payload.get(field):
+                raise ApiError(400, f"{field} is required")
+        if payload["cluster_type"] not in ("DEDICATED", "DEVELOPER"):
+            raise ApiError(400, f"invalid cluster_type: {payload['cluster_type']}")
+        config = payload.get("config") or {}
+        if payload["cluster_type"] == "DEVELOPER":
+            components = {name: dict(spec) for name, spec in DEVELOPER_COMPONENTS.items()}
+        else:
+            components = _components(config.get("components"))
+        cluster_id = self.new_id()
+        port = _int(config.get("port", 4000), "port")
+        cluster = {
+            "id": cluster_id,
+            "project_id": project_id,
+            "name": payload["name"],
+            "port": port,
+            "cluster_type": payload["cluster_type"],
+            "cloud_provider": payload["cloud_provider"],
+            "region": payload["region"],
+            "create_timestamp": str(int(time.time())),
+            "config": {"port": port, "components": components},
+            "status": {
+                "tidb_version": TIDB_VERSION,
+                "cluster_status": status,
+                "connection_strings": {"default_user": "root",
+                                       "standard": {"host": f"tidb.{cluster_id}.mock.tidbcloud.test", "port": port}},
+            },
+            "_ready_at": time.monotonic() + (self.config.create_seconds if seconds is None else seconds),
+        }
+        self.clusters[cluster_id] = cluster
+        project["cluster_count"] += 1
+        return cluster
+
+    def cluster(self, project_id: str, cluster_id: str) -> dict:
+        self.project(project_id)
+        cluster = self.clusters.get(cluster_id)
+        if cluster is None or cluster["project_id"] != project_id:
+            raise ApiError(404, f"cluster {cluster_id} not found")
+        if cluster["status"]["cluster_status"] != "AVAILABLE" and time.monotonic() >= cluster["_ready_at"]:
+            cluster["status"]["cluster_status"] = "AVAILABLE"
+        return cluster
+
+    def modify_cluster(self, project_id: str, cluster_id: str, payload: dict):
+        cluster = self.cluster(project_id, cluster_id)
+        if cluster["cluster_type"] != "DEDICATED":
+            raise ApiError(400, "only Dedicated Tier clusters can be modified")
+        if cluster["status"]["cluster_status"] != "AVAILABLE":
+            raise ApiError(400, f"cluster {cluster_id} is {cluster['status']['cluster_status']}")
+        components = ((payload or {}).get("config") or {}).get("components")
+        if not components:
+            raise ApiError(400, "config.components is required")
+        cluster["config"]["components"] = _components(components, cluster["config"]["components"])
+        cluster["status"]["cluster_status"] = "MODIFYING"
+        cluster["_ready_at"] = time.monotonic() + self.config.modify_seconds
+
+    def delete_cluster(self, project_id: str, cluster_id: str):
+        self.cluster(project_id, cluster_id)
+        del self.clusters[cluster_id]
+        self.projects[project_id]["cluster_count"] -= 1
+        for backup_id in [backup_id for backup_id, backup in self.backups.items()
+                          if backup["_cluster_id"] == cluster_id]:
+            del self.backups[backup_id]
+
+    def add_backup(self, cluster: dict, payload: dict) -> dict:
+        if cluster["cluster_type"] != "DEDICATED":
+            raise ApiError(400, "only Dedicated Tier clusters can be backed up")
+        if not payload.get("name"):
+            raise ApiError(400, "name is required")
+        backup_id = self.new_id()
+        backup = {"id": backup_id, "name": payload["name"], "description": payload.get("description", ""),
+                  "type": "MANUAL", "create_timestamp": str(int(time.time())), "size": "0", "status": "PENDING",
+                  "_cluster_id": cluster["id"], "_ready_at": time.monotonic() + self.config.backup_seconds}
+        self.backups[backup_id] = backup
+        return backup
+
+    def backup(self, project_id: str, cluster_id: str, backup_id: str) -> dict:
+        self.cluster(project_id, cluster_id)
+        backup = self.backups.get(backup_id)
+        if backup is None or backup["_cluster_id"] != cluster_id:
+            raise ApiError(404, f"backup {backup_id} not found")
+        return self._advance_backup(backup)
+
+    def _advance_backup(self, backup: dict) -> dict:
+        if backup["status"] == "PENDING" and time.monotonic() >= backup["_ready_at"]:
+            backup["status"] = "SUCCESS"
+            backup["size"] = str(1024 * 1024 * 1024)
+        return backup
+
+    def cluster_backups(self, project_id: str, cluster_id: str) -> list:
+        self.cluster(project_id, cluster_id)
+        return [self._advance_backup(backup) for backup in self.backups.values()
+                if backup["_cluster_id"] == cluster_id]
+
+    def add_restore(self, project_id: str, payload: dict) -> dict:
+        self.project(project_id)
+        backup = self.backups.get(str(payload.get("backup_id")))
+        if backup is None or self.clusters[backup["_cluster_id"]]["project_id"] != project_id:
+            raise ApiError(404, f"backup {payload.get('backup_id')} not found")
+        if self._advance_backup(backup)["status"] != "SUCCESS":
+            raise ApiError(400, f"backup {backup['id']} is {backup['status']}")
+        source = self.clusters[backup["_cluster_id"]]
+        cluster = self.add_cluster(project_id, {"cluster_type": "DEDICATED", "cloud_provider": source["cloud_provider"],
+                                                "region": source["region"], **payload},
+                                   status="RESTORING", seconds=self.config.restore_seconds)
+        restore_id = self.new_id()
+        self.restores[restore_id] = {"id": restore_id, "project_id": project_id,
+                                     "create_timestamp": str(int(time.time())), "backup_id": backup["id"],
+                                     "cluster_id": cluster["id"]}
+        return {"id": restore_id, "cluster_id": cluster["id"]}
+
+    def restore(self, restore: dict) -> dict:
+        cluster = self.clusters.get(restore["cluster_id"])
+        cluster_status = self.cluster(restore["project_id"], cluster["id"])["status"]["cluster_status"] \
+            if cluster else "DELETED"
+        return {**restore, "status": "PENDING" if cluster_status == "RESTORING" else "SUCCESS",
+                "cluster": {"id": restore["cluster_id"], "name": cluster["name"] if cluster else "",
+                            "status": cluster_status}}
+
+    def project_restores(self, project_id: str) -> list:
+        self.project(project_id)
+        return [self.restore(restore) for restore in self.restores.values() if restore["project_id"] == project_id]
+
+    def get_restore(self, project_id: str, restore_id: str) -> dict:
+        restore = self.restores.get(restore_id)
+        if restore is None or restore["project_id"] != project_id:
+            raise ApiError(404, f"restore {restore_id} not found")
+        return self.restore(restore)
+
+
+def _public(resource: dict) -> dict:
+    return {key: value for key, value in resource.items() if not key.startswith("_")}
+
+
+def _md5(value: str) -> str:
+    return hashlib.md5(value.encode("utf-8")).hexdigest()
+
+
+_API = "/api/v1beta"
+_ID = r"(\d+)"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "TiDBCloudMock/1.0"
+    # Headers and body are written separately, do not let Nagle delay the body of keep-alive responses
+    disable_nagle_algorithm = True
+    # Set on the subclass created by MockServer
+    mock = None
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def do_PATCH(self):
+        self._handle()
+
+    def do_DELETE(self):
+        self._handle()
+
+    def log_message(self, *args):
+        pass
+
+    def _handle(self):
+        mock = self.mock
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        mock.count("requests")
+        if not self._authenticated():
+            mock.count("challenges")
+            self._reply(401, b"", {"WWW-Authenticate": f'Digest realm="{REALM}", qop="auth", '
+                                                       f'nonce="{mock.nonce}", opaque="{mock.opaque}"'})
+            return
+        config = mock.config
+        if config.latency or config.jitter:
+            time.sleep(config.latency + config.random.uniform(0, config.jitter))
+        if config.throttle_rate and config.random.random() < config.throttle_rate:
+            mock.count("throttled")
+            self._error(ApiError(429, "too many requests"), {"Retry-After": str(config.retry_after)})
+            return
+        if config.error_rate and config.random.random() < config.error_rate:
+            mock.count("errors")
+            self._error(ApiError(500, "internal error"))
+            return
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            self._error(ApiError(400, "invalid JSON body"))
+            return
+        try:
+            with mock.state._lock:
+                code, result, headers = mock.route(self.command, urlsplit(self.path), payload, self.headers)
+        except ApiError as e:
+            self._error(e)
+            return
+        self._reply(code, b"" if result is None else json.dumps(result).encode("utf-8"), headers)
+
+    def _authenticated(self) -> bool:
+        header = self.headers.get("Authorization", "")
+        if not header.lower().startswith("digest "):
+            return False
+        fields = dict((key, value.strip('"')) for key, value in
+                      re.findall(r'(\w+)=("[^"]*"|[^,\s]*)', header[len("digest "):]))
+        config = self.mock.config
+        if fields.get("username") != config.public_key or fields.get("nonce") != self.mock.nonce:
+            return False
+        ha1 = _md5(f"{config.public_key}:{REALM}:{config.private_key}")
+        ha2 = _md5(f"{self.command}:{fields.get('uri')}")
+        if fields.get("qop") == "auth":
+            expected = _md5(f"{ha1}:{self.mock.nonce}:{fields.get('nc')}:{fields.get('cnonce')}:auth:{ha2}")
+        else:
+            expected = _md5(f"{ha1}:{self.mock.nonce}:{ha2}")
+        return fields.get("response") == expected
+
+    def _error(self, error: ApiError, headers: dict = None):
+        mock = self.mock
+        mock.count(f"status_{error.status_code}")
+        body = json.dumps({"code": error.status_code, "message": error.message, "details": []}).encode("utf-8")
+        self._reply(error.status_code, body, headers)
+
+    def _reply(self, code: int, body: bytes, headers: dict = None):
+        self.send_response(code)
+        if body:
+            self.send_header("Content-Type", "application/json")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Accept the connection bursts of hundreds of concurrent clients without dropping SYNs
+    request_queue_size = 1024
+
+
+class MockServer:
+    def __init__(self, config: MockConfig = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        Local stand-in of the TiDB Cloud API, served from a background thread
+        Use it as a context manager, and pass `server.url` as the host of the clients.
+        :param config: The server behaviour, the defaults if None
+        :param host: The address to listen on
+        :param port: The port to listen on, a free one if 0
+        """
+        self.config = config or MockConfig()
+        self.state = MockState(self.config)
+        self.nonce = secrets.token_hex(16)
+        self.opaque = secrets.token_hex(8)
+        self.counters = {}
+        self._counters_lock = threading.Lock()
+        self._routes = [
+            ("GET", rf"{_API}/projects", self._list_projects),
+            ("GET", rf"{_API}/clusters/provider/regions", self._provider_regions),
+            ("GET", rf"{_API}/projects/{_ID}/clusters", self._list_clusters),
+            ("POST", rf"{_API}/projects/{_ID}/clusters", self._create_cluster),
+            ("GET", rf"{_API}/projects/{_ID}/clusters/{_ID}", self._get_cluster),
+            ("PATCH", rf"{_API}/projects/{_ID}/clusters/{_ID}", self._modify_cluster),
+            ("DELETE", rf"{_API}/projects/{_ID}/clusters/{_ID}", self._delete_cluster),
+            ("GET", rf"{_API}/projects/{_ID}/clusters/{_ID}/backups", self._list_backups),
+            ("POST", rf"{_API}/projects/{_ID}/clusters/{_ID}/backups", self._create_backup),
+            ("GET", rf"{_API}/projects/{_ID}/clusters/{_ID}/backups/{_ID}", self._get_backup),
+            ("DELETE", rf"{_API}/projects/{_ID}/clusters/{_ID}/backups/{_ID}", self._delete_backup),
+            ("GET", rf"{_API}/projects/{_ID}/restores", self._list_restores),
+            ("POST", rf"{_API}/projects/{_ID}/restores", self._create_restore),
+            ("GET", rf"{_API}/projects/{_ID}/restores/{_ID}", self._get_restore),
+        ]
+        handler = type("_MockHandler", (_Handler,), {"mock": self})
+        self.httpd = _Server((host, port), handler)
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05},
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def count(self, name: str):
+        with self._counters_lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def route(self, method: str, url, payload: dict, headers) -> tuple:
+        """
+        Dispatch an authenticated request
+        :return: (status code, JSON body, extra headers)
+        """
+        query = parse_qs(url.query)
+        path = url.path.rstrip("/")
+        path_matched = False
+        for route_method, pattern, handler in self._routes:
+            match = re.fullmatch(pattern, path)
+            if match is None:
+                continue
+            path_matched = True
+            if route_method == method:
+                return handler(*match.groups(), query=query, payload=payload, headers=headers)
+        if path_matched:
+            raise ApiError(405, f"method {method} not allowed on {path}")
+        raise ApiError(404, f"{path} not found")
+
+    def _list_projects(self, query, **kwargs):
+        return 200, _page(list(self.state.projects.values()), query), None
+
+    def _provider_regions(self, headers, **kwargs):
+        if headers.get("If-None-Match") == self.state.catalog_etag:
+            return 304, None, {"ETag": self.state.catalog_etag}
+        return 200, self.state.catalog, {"ETag": self.state.catalog_etag}
+
+    def _list_clusters(self, project_id, query, **kwargs):
+        self.state.project(project_id)
+        clusters = [_public(self.state.cluster(project_id, cluster_id)) for cluster_id, cluster
+                    in self.state.clusters.items() if cluster["project_id"] == project_id]
+        return 200, _page(clusters, query), None
+
+    def _create_cluster(self, project_id, payload, **kwargs):
+        return 200, {"id": self.state.add_cluster(project_id, payload)["id"]}, None
+
+    def _get_cluster(self, project_id, cluster_id, **kwargs):
+        return 200, _public(self.state.cluster(project_id, cluster_id)), None
+
+    def _modify_cluster(self, project_id, cluster_id, payload, **kwargs):
+        self.state.modify_cluster(project_id, cluster_id, payload)
+        return 200, {}, None
+
+    def _delete_cluster(self, project_id, cluster_id, **kwargs):
+        self.state.delete_cluster(project_id, cluster_id)
+        return 200, {}, None
+
+    def _list_backups(self, project_id, cluster_id, query, **kwargs):
+        backups = [_public(backup) for backup in self.state.cluster_backups(project_id, cluster_id)]
+        return 200, _page(backups, query), None
+
+    def _create_backup(self, project_id, cluster_id, payload, **kwargs):
+        backup = self.state.add_backup(self.state.cluster(project_id, cluster_id), payload)
+        return 200, {"id": backup["id"]}, None
+
+    def _get_backup(self, project_id, cluster_id, backup_id, **kwargs):
+        return 200, _public(self.state.backup(project_id, cluster_id, backup_id)), None
+
+    def _delete_backup(self, project_id, cluster_id, backup_id, **kwargs):
+        self.state.backup(project_id, cluster_id, backup_id)
+        del self.state.backups[backup_id]
+        return 200, {}, None
+
+    def _list_restores(self, project_id, query, **kwargs):
+        return 200, _page(self.state.project_restores(project_id), query), None
+
+    def _create_restore(self, project_id, payload, **kwargs):
+        return 200, self.state.add_restore(project_id, payload), None
+
+    def _get_restore(self, project_id, restore_id, **kwargs):
+        return 200, self.state.get_restore(project_id, restore_id), None
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Local stand-in of the TiDB Cloud API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--public-key", default=DEFAULT_PUBLIC_KEY)
+    parser.add_argument("--private-key", default=DEFAULT_PRIVATE_KEY)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random seconds added to the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After of the 429 responses")
+    parser.add_argument("--create-seconds", type=float, default=1.0)
+    parser.add_argument("--modify-seconds", type=float, default=1.0)
+    parser.add_argument("--backup-seconds", type=float, default=1.0)
+    parser.add_argument("--restore-seconds", type=float, default=1.0)
+    parser.add_argument("--projects", type=int, default=1, help="projects to seed")
+    parser.add_argument("--clusters", type=int, default=1, help="Dedicated Tier clusters to seed per project")
+    parser.add_argument("--backups", type=int, default=1, help="successful backups to seed per cluster")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the fault injection")
+    args = parser.parse_args(argv)
+    config = MockConfig(args.public_key, args.private_key, args.latency, args.jitter, args.error_rate,
+                        args.throttle_rate, args.retry_after, args.create_seconds, args.modify_seconds,
+                        args.backup_seconds, args.restore_seconds, args.seed)
+    server = MockServer(config, args.host, args.port)
+    seeded = server.state.seed(args.projects, args.clusters, args.backups)
+    print(f"TiDB Cloud mock API listening on {server.url}", flush=True)
+    print(f"export TIDBCLOUD_HOST={server.url} TIDBCLOUD_PUBLIC_KEY={config.public_key} "
+          f"TIDBCLOUD_PRIVATE_KEY={config.private_key}", flush=True)
+    if seeded:
+        print(f"export DEDICATED_PROJECT_ID={seeded[0][0]} DEDICATED_CLUSTER_ID={seeded[0][1]} "
+              f"DEDICATED_PROJECT_IDS={','.join(sorted({project_id for project_id, _ in seeded}))}", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to hold many clusters and backups in memory cheaply: the API responses are decoded into slotted
+objects with typed fields instead of being kept as nested dicts, e.g. for an inventory of a whole organization,
+and the request payloads are encoded from the same objects instead of being rebuilt as dict literals.
+The repeated strings, such as node sizes, regions and statuses, are interned so that every object shares them.
+"""
+import sys
+
+
+def _str(value) -> str:
+    return sys.intern(str(value)) if value is not None else None
+
+
+def _int(value) -> int:
+    # The API returns some numbers as strings, e.g. the backup size
+    return int(value) if value is not None else None
+
+
+class _Model:
+    """
+    Compared and printed by their fields, like dataclasses
+    """
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return type(other) is type(self) and all(getattr(self, name) == getattr(other, name)
+                                                 for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class ComponentConfig(_Model):
+    __slots__ = ("node_size", "node_quantity", "storage_size_gib")
+
+    def __init__(self, node_size: str, node_quantity: int, storage_size_gib: int = None):
+        """
+        The nodes of a TiDB, TiKV or TiFlash component
+        :param node_size: The node size, e.g. 8C16G
+        :param node_quantity: The number of nodes
+        :param storage_size_gib: The storage size of each node, None for TiDB
+        """
+        self.node_size = node_size
+        self.node_quantity = node_quantity
+        self.storage_size_gib = storage_size_gib
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ComponentConfig":
+        """
+        :param data: e.g. {"node_size": "8C32G", "storage_size_gib": 500, "node_quantity": 3}, numbers may be strings
+        :return: The component, None if data is None
+        """
+        if data is None:
+            return None
+        return cls(_str(data.get("node_size")), _int(data.get("node_quantity")), _int(data.get("storage_size_gib")))
+
+    def to_json(self) -> dict:
+        """
+        :return: The component as sent to the API, with the numbers as JSON numbers
+        """
+        data = {"node_size": self.node_size, "node_quantity": self.node_quantity}
+        if self.storage_size_gib is not None:
+            data["storage_size_gib"] = self.storage_size_gib
+        return data
+
+    def with_quantity(self, node_quantity: int) -> "ComponentConfig":
+        return ComponentConfig(self.node_size, node_quantity, self.storage_size_gib)
+
+
+class ClusterDetail(_Model):
+    __slots__ = ("id", "project_id", "name", "cluster_type", "cloud_provider", "region", "port", "create_timestamp",
+                 "cluster_status", "tidb_version", "tidb", "tikv", "tiflash")
+
+    def __init__(self, id: str, project_id: str = None, name: str = None, cluster_type: str = None,
+                 cloud_provider: str = None, region: str = None, port: int = None, create_timestamp: str = None,
+                 cluster_status: str = None, tidb_version: str = None, tidb: ComponentConfig = None,
+                 tikv: ComponentConfig = None, tiflash: ComponentConfig = None):
+        """
+        The fields of a cluster detail used by the samples, the connection strings are left out
+        """
+        self.id = id
+        self.project_id = project_id
+        self.name = name
+        self.cluster_type = cluster_type
+        self.cloud_provider = cloud_provider
+        self.region = region
+        self.port = port
+        self.create_timestamp = create_timestamp
+        self.cluster_status = cluster_status
+        self.tidb_version = tidb_version
+        self.tidb = tidb
+        self.tikv = tikv
+        self.tiflash = tiflash
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ClusterDetail":
+        """
+        :param data: The cluster detail returned by the API
+        :return: The cluster
+        """
+        config = data.get("config") or {}
+        components = config.get("components") or {}
+        status = data.get("status") or {}
+        return cls(data["id"], data.get("project_id"), data.get("name"), _str(data.get("cluster_type")),
+                   _str(data.get("cloud_provider")), _str(data.get("region")),
+                   _int(config.get("port", data.get("port"))), data.get("create_timestamp"),
+                   _str(status.get("cluster_status")), _str(status.get("tidb_version")),
+                   ComponentConfig.from_json(components.get("tidb")),
+                   ComponentConfig.from_json(components.get("tikv")),
+                   ComponentConfig.from_json(components.get("tiflash")))
+
+    def to_json(self) -> dict:
+        """
+        :return: The cluster detail, in the shape returned by the API
+        """
+        return {
+            "id": self.id,
+            "project_id": self.project_id,
+            "name": self.name,
+            "port": self.port,
+            "cluster_type": self.cluster_type,
+            "cloud_provider": self.cloud_provider,
+            "region": self.region,
+            "create_timestamp": self.create_timestamp,
+            "config": {"port": self.port, "components": {"tidb": self.tidb and self.tidb.to_json(),
+                                                         "tikv": self.tikv and self.tikv.to_json(),
+                                                         "tiflash": self.tiflash and self.tiflash.to_json()}},
+            "status": {"tidb_version": self.tidb_version, "cluster_status": self.cluster_status},
+        }
+
+    def components(self) -> dict:
+        """
+        :return: {component: ComponentConfig}, None for a component the cluster does not have
+        """
+        return {"tidb": self.tidb, "tikv": self.tikv, "tiflash": self.tiflash}
+
+
+class Backup(_Model):
+    __slots__ = ("id", "name", "description", "type", "status", "size", "create_timestamp")
+
+    def __init__(self, id: str, name: str = None, description: str = None, type: str = None, status: str = None,
+                 size: int = None, create_timestamp: str = None):
+        """
+        A backup of a cluster
+        :param size: The backup size in bytes
+        """
+        self.id = id
+        self.name = name
+        self.description = description
+        self.type = type
+        self.status = status
+        self.size = size
+        self.create_timestamp = create_timestamp
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Backup":
+        """
+        :param data: The backup returned by the API
+        :return: The backup
+        """
+        return cls(data["id"], data.get("name"), data.get("description"), _str(data.get("type")),
+                   _str(data.get("status")), _int(data.get("size")), data.get("create_timestamp"))
+
+    def to_json(self) -> dict:
+        """
+        :return: The backup, in the shape returned by the API
+        """
+        return {"id": self.id, "name": self.name, "description": self.description, "type": self.type,
+                "create_timestamp": self.create_timestamp, "size": None if self.size is None else str(self.size),
+                "status": self.status}
+
+
+class RestoreTask(_Model):
+    __slots__ = ("backup_id", "name", "root_password", "port", "tidb", "tikv", "tiflash", "ip_access_list")
+
+    def __init__(self, backup_id: str, name: str, root_password: str, tidb: ComponentConfig,
+                 tikv: ComponentConfig, tiflash: ComponentConfig = None, port: int = 4000,
+                 ip_access_list: list = ()):
+        """
+        A restore of a backup into a new cluster
+        :param backup_id: The backup id
+        :param name: The name of the new cluster
+        :param root_password: The root password of the new cluster
+        :param tidb: The TiDB nodes of the new cluster
+        :param tikv: The TiKV nodes of the new cluster
+        :param tiflash: The TiFlash nodes of the new cluster, None for no TiFlash
+        :param port: The port of the new cluster
+        :param ip_access_list: The allowed CIDRs, e.g. [{"cidr": "0.0.0.0/0", "description": "..."}]
+        """
+        self.backup_id = backup_id
+        self.name = name
+        self.root_password = root_password
+        self.tidb = tidb
+        self.tikv = tikv
+        self.tiflash = tiflash
+        self.port = port
+        self.ip_access_list = ip_access_list
+
+    @classmethod
+    def from_json(cls, data: dict) -> "RestoreTask":
+        """
+        :param data: The restore payload
+        :return: The restore task
+        """
+        config = data["config"]
+        components = config["components"]
+        return cls(data["backup_id"], data["name"], config.get("root_password"),
+                   ComponentConfig.from_json(components["tidb"]), ComponentConfig.from_json(components["tikv"]),
+                   ComponentConfig.from_json(components.get("tiflash")), _int(config.get("port", 4000)),
+                   config.get("ip_access_list", ()))
+
+    def to_json(self) -> dict:
+        """
+        :return: The restore payload
+        """
+        components = {"tidb": self.tidb.to_json(), "tikv": self.tikv.to_json()}
+        if self.tiflash is not None:
+            components["tiflash"] = self.tiflash.to_json()
+        return {
+            "backup_id": self.backup_id,
+            "name": self.name,
+            "config": {
+                "root_password": self.root_password,
+                "port": self.port,
+                "components": components,
+                "ip_access_list": list(self.ip_access_list),
+            },
+        }
+
@@ -0,0 +1,140 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to walk paginated lists (projects, clusters of a project, backups of a cluster) lazily.
+Only the current page, and the next one when prefetching, is held in memory,
+so memory stays flat whatever the size of the organization, and callers can stop early.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PAGE_SIZE = 100
+
+
+def _is_last_page(resp: dict, page: int, page_size: int) -> bool:
+    items = resp.get("items") or []
+    if not items:
+        return True
+    if "total" in resp:
+        return page * page_size >= int(resp["total"])
+    return len(items) < page_size
+
+
+def iter_items(fetch_page, page_size: int = DEFAULT_PAGE_SIZE, prefetch: bool = False):
+    """
+    Yield the items of every page, fetching pages on demand
+    :param fetch_page: Function (page, page_size) returning one page, e.g. {"items": [...], "total": 42}
+    :param page_size: The page size
+    :param prefetch: Whether to fetch the next page in the background while the current one is consumed
+    :return: Generator of items
+    """
+    if not prefetch:
+        page = 1
+        while True:
+            resp = fetch_page(page, page_size)
+            yield from resp.get("items") or []
+            if _is_last_page(resp, page, page_size):
+                return
+            page += 1
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    page = 1
+    future = executor.submit(fetch_page, page, page_size)
+    try:
+        while True:
+            resp = future.result()
+            last = _is_last_page(resp, page, page_size)
+            if not last:
+                future = executor.submit(fetch_page, page + 1, page_size)
+            yield from resp.get("items") or []
+            if last:
+                return
+            page += 1
+    finally:
+        # When the caller stops early, the page fetched ahead is dropped without waiting for it
+        future.cancel()
+        executor.shutdown(wait=False)
+
+
+def iter_projects(client, page_size: int = DEFAULT_PAGE_SIZE, prefetch: bool = False):
+    """
+    Yield all the accessible projects
+    :param client: A client with get_all_projects(page, page_size)
+    :return: Generator of projects
+    """
+    return iter_items(lambda page, size: client.get_all_projects(page=page, page_size=size),
+                      page_size=page_size, prefetch=prefetch)
+
+
+def iter_clusters(client, project_id: str, page_size: int = DEFAULT_PAGE_SIZE, prefetch: bool = False):
+    """
+    Yield all the clusters of a project
+    :param client: A client with get_clusters_of_project(project_id, page, page_size)
+    :param project_id: The project id
+    :return: Generator of clusters
+    """
+    return iter_items(lambda page, size: client.get_clusters_of_project(project_id, page=page, page_size=size),
+                      page_size=page_size, prefetch=prefetch)
+
+
+def iter_backups(client, project_id: str, cluster_id: str, page_size: int = DEFAULT_PAGE_SIZE,
+                 prefetch: bool = False):
+    """
+    Yield all the backups of a cluster
+    :param client: A client with get_backups_of_cluster(project_id, cluster_id, page, page_size)
+    :param project_id: The project id
+    :param cluster_id: The cluster id
+    :return: Generator of backups
+    """
+    return iter_items(lambda page, size: client.get_backups_of_cluster(project_id, cluster_id, page=page,
+                                                                       page_size=size),
+                      page_size=page_size, prefetch=prefetch)
+
+
+async def aiter_items(fetch_page, page_size: int = DEFAULT_PAGE_SIZE, prefetch: bool = False):
+    """
+    Async counterpart of iter_items
+    :param fetch_page: Coroutine function (page, page_size) returning one page
+    :param page_size: The page size
+    :param prefetch: Whether to fetch the next page while the current one is consumed
+    :return: Async generator of items
+    """
+    import asyncio
+
+    page = 1
+    next_page = asyncio.ensure_future(fetch_page(page, page_size))
+    try:
+        while True:
+            resp = await next_page
+            last = _is_last_page(resp, page, page_size)
+            if not last:
+                next_page = fetch_page(page + 1, page_size)
+                if prefetch:
+                    next_page = asyncio.ensure_future(next_page)
+            for item in resp.get("items") or []:
+                yield item
+            if last:
+                return
+            page += 1
+    finally:
+        if isinstance(next_page, asyncio.Future):
+            next_page.cancel()
+        else:
+            next_page.close()
+
+
+def aiter_projects(client, page_size: int = DEFAULT_PAGE_SIZE, prefetch: bool = False):
+    return aiter_items(lambda page, size: client.get_all_projects(page=page, page_size=size),
+                       page_size=page_size, prefetch=prefetch)
+
+
+def aiter_clusters(client, project_id: str, page_size: int = DEFAULT_PAGE_SIZE, prefetch: bool = False):
+    return aiter_items(lambda page, size: client.get_clusters_of_project(project_id, page=page, page_size=size),
+                       page_size=page_size, prefetch=prefetch)
+
+
+def aiter_backups(client, project_id: str, cluster_id: str, page_size: int = DEFAULT_PAGE_SIZE,
+                  prefetch: bool = False):
+    return aiter_items(lambda page, size: client.get_backups_of_cluster(project_id, cluster_id, page=page,
+                                                                        page_size=size),
+                       page_size=page_size, prefetch=prefetch)
@@ -0,0 +1,167 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Request payloads shared by the sample clients, encoded from the typed models of tidbcloud.models.
+The node quantities and storage sizes are sent as JSON numbers.
+"""
+import datetime
+import time
+
+from . import catalog
+from .models import ClusterDetail, ComponentConfig, RestoreTask
+
+DEFAULT_ROOT_PASSWORD = "input_your_password"
+
+_IP_ACCESS_LIST = [
+    {
+        "cidr": "0.0.0.0/0",
+        "description": "Allow Access from Anywhere."
+    }
+]
+
+
+def backup_payload() -> dict:
+    """
+    Payload of a manual backup named after the current date
+    :return: The backup payload
+    """
+    cur_date = datetime.datetime.now().strftime("%Y-%m-%d")
+    return {"name": f"tidbcloud-backup-{cur_date}", "description": f"tidbcloud-backup-{cur_date}"}
+
+
+def _cluster_components(dedicated_config) -> tuple:
+    """
+    The TiDB, TiKV and TiFlash nodes of a cluster detail, as a dict or a ClusterDetail
+    """
+    if isinstance(dedicated_config, ClusterDetail):
+        tidb, tikv, tiflash = dedicated_config.tidb, dedicated_config.tikv, dedicated_config.tiflash
+    else:
+        components = dedicated_config["config"]["components"]
+        tidb = ComponentConfig.from_json(components.get("tidb"))
+        tikv = ComponentConfig.from_json(components.get("tikv"))
+        tiflash = ComponentConfig.from_json(components.get("tiflash"))
+    if tidb is None or tikv is None:
+        raise KeyError("tidb" if tidb is None else "tikv")
+    return tidb, tikv, tiflash
+
+
+def restore_payload(back_up_id: str, dedicated_config, root_password: str) -> dict:
+    """
+    Payload of a restore task with the same shape as the source cluster
+    :param back_up_id: The backup id
+    :param dedicated_config: The source cluster detail, as a dict or a ClusterDetail
+    :param root_password: The root password of the restored cluster
+    :return: The restore payload
+    """
+    try:
+        tidb, tikv, tiflash = _cluster_components(dedicated_config)
+    except KeyError:
+        print("cloud provider or region or available specifications not found!")
+        raise
+    name = f"tidbcloud-restore-{datetime.date.today().isoformat()}"
+    return RestoreTask(str(back_up_id), name, root_password, tidb, tikv, tiflash,
+                       ip_access_list=_IP_ACCESS_LIST).to_json()
+
+
+def dedicated_cluster_payload(dedicated_specifications: dict, name: str = None,
+                              root_password: str = DEFAULT_ROOT_PASSWORD) -> dict:
+    """
+    Payload of the smallest dedicated cluster of a region, with the first node sizes and the minimum quantities
+    :param dedicated_specifications: The dedicated item of the provider regions specifications
+    :param name: The cluster name, named after the current time if None
+    :param root_password: The root password
+    :return: The create payload
+    """
+    try:
+        tidb = dedicated_specifications["tidb"][0]
+        tikv = dedicated_specifications["tikv"][0]
+        components = {
+            "tidb": ComponentConfig(tidb["node_size"], int(tidb["node_quantity_range"]["min"])).to_json(),
+            "tikv": ComponentConfig(tikv["node_size"], int(tikv["node_quantity_range"]["min"]),
+                                    int(tikv["storage_size_gib_range"]["min"])).to_json(),
+        }
+        cloud_provider = dedicated_specifications["cloud_provider"]
+        region = dedicated_specifications["region"]
+    except (KeyError, IndexError) as e:
+        print(f"cloud provider or region or available specifications not found! exception: {e}")
+        raise
+    return {
+        "name": name or f"tidbcloud-sample-{int(time.time())}",
+        "cluster_type": "DEDICATED",
+        "cloud_provider": cloud_provider,
+        "region": region,
+        "config":
+            {
+                "root_password": root_password,
+                "port": 4000,
+                "components": components,
+                "ip_access_list": _IP_ACCESS_LIST
+            }
+    }
+
+
+def developer_cluster_payload(region: str, name: str = None, root_password: str = DEFAULT_ROOT_PASSWORD,
+                              cloud_provider: str = "AWS") -> dict:
+    """
+    Payload of a developer cluster
+    :param region: Available region for developer cluster
+    :param name: The cluster name, named after the current time if None
+    :param root_password: The root password
+    :param cloud_provider: The cloud provider of the developer cluster
+    :return: The create payload
+    """
+    return {
+        "name": name or f"tidbcloud-sample-{int(time.time())}",
+        "cluster_type": "DEVELOPER",
+        "cloud_provider": cloud_provider,
+        "region": f"{region}",
+        "config":
+            {
+                "root_password": root_password,
+                "ip_access_list": _IP_ACCESS_LIST
+            }
+    }
+
+
+def add_tiflash_payload(dedicated_config, dedicated_specifications: dict) -> dict:
+    """
+    Payload adding one TiFlash node to a cluster
+    :param dedicated_config: The cluster detail, as a dict or a ClusterDetail
+    :param dedicated_specifications: The dedicated item of the provider regions specifications
+    :return: The modify payload
+    """
+    try:
+        tidb, tikv, tiflash = _cluster_components(dedicated_config)
+        if tiflash is not None:
+            tiflash = tiflash.with_quantity(tiflash.node_quantity + 1)
+        else:
+            spec = dedicated_specifications["tiflash"][0]
+            tiflash = ComponentConfig(spec["node_size"], int(spec["node_quantity_range"]["step"]),
+                                      int(spec["storage_size_gib_range"]["min"]))
+        return {
+            "config":
+                {
+                    "components":
+                        {
+                            "tidb": {"node_quantity": tidb.node_quantity},
+                            "tikv": {"node_quantity": tikv.node_quantity},
+                            "tiflash": tiflash.to_json()
+                        }
+                }
+        }
+    except (KeyError, IndexError) as e:
+        print(f"cloud provider or region or available specifications not found! exception: {e}")
+        raise
+
+
+def dedicated_specifications(provider_regions_specifications: dict, cloud_provider: str = None,
+                             region: str = None) -> dict:
+    """
+    Get the dedicated item of the provider regions specifications
+    :param provider_regions_specifications: Result of cloud providers, regions and available specifications
+    :param cloud_provider: The wanted cloud provider, any if None
+    :param region: The wanted region, any of the cloud provider if None
+    :return: Available dedicated config
+    """
+    return catalog.get_catalog(provider_regions_specifications).require("DEDICATED", cloud_provider, region).item
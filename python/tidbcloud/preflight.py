@@ -0,0 +1,113 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to reject invalid create, restore and modify payloads locally, against the cached specifications
+catalog, instead of paying a round trip to get a 400 error: unavailable node sizes, node quantities that are
+not a multiple of the step, storage sizes out of range, and TiFlash on a cluster whose TiDB or TiKV has 2 or 4 vCPUs.
+"""
+import re
+
+from .catalog import COMPONENTS, RegionSpec
+
+# TiFlash is not supported when the vCPUs of TiDB or TiKV component is 2 or 4
+TIFLASH_UNSUPPORTED_VCPUS = (2, 4)
+_VCPUS = re.compile(r"(\d+)C")
+
+
+class PreflightError(Exception):
+    def __init__(self, problems: list):
+        """
+        The payload breaks the catalog rules
+        :param problems: One message per broken rule
+        """
+        self.problems = problems
+        super().__init__(f"preflight check failed : {'; '.join(problems)}")
+
+
+def vcpus(node_size: str) -> int:
+    """
+    :param node_size: e.g. 8C16G
+    :return: The number of vCPUs, None if the node size has no vCPU prefix
+    """
+    match = _VCPUS.match(node_size or "")
+    return int(match.group(1)) if match else None
+
+
+def component_problems(component: str, spec: dict, region_spec: RegionSpec) -> list:
+    """
+    Check one component against the specifications of its region
+    :param component: tidb, tikv or tiflash
+    :param spec: {node_size, node_quantity, storage_size_gib}, quantities may be strings as in the sample payloads
+    :param region_spec: The specifications of the cluster region
+    :return: The broken rules, empty if the component is valid
+    """
+    where = f"{region_spec.cloud_provider} {region_spec.region}"
+    component_spec = region_spec.component(component, spec.get("node_size"))
+    if component_spec is None:
+        return [f"{component} node_size {spec.get('node_size')} not available in {where}"]
+    problems = []
+    if spec.get("node_quantity") is not None:
+        quantity = int(spec["node_quantity"])
+        if not component_spec.is_valid_quantity(quantity):
+            problems.append(f"{component} node_quantity {quantity} should be at least {component_spec.min_quantity} "
+                            f"and a multiple of {component_spec.step}")
+    if spec.get("storage_size_gib") is not None:
+        storage_size_gib = int(spec["storage_size_gib"])
+        if not component_spec.is_valid_storage(storage_size_gib):
+            problems.append(f"{component} storage_size_gib {storage_size_gib} should be between "
+                            f"{component_spec.min_storage_gib} and {component_spec.max_storage_gib}")
+    return problems
+
+
+def _tiflash_problems(components: dict) -> list:
+    tiflash = components.get("tiflash")
+    if tiflash is None or int(tiflash.get("node_quantity") or 0) == 0:
+        return []
+    return [f"TiFlash is not supported when {component} has {vcpus(components[component]['node_size'])} vCPUs"
+            for component in ("tidb", "tikv")
+            if components.get(component) and vcpus(components[component].get("node_size"))
+            in TIFLASH_UNSUPPORTED_VCPUS]
+
+
+def _raise(problems: list):
+    if problems:
+        print(f"preflight check failed! problems : {problems}")
+        raise PreflightError(problems)
+
+
+def check_cluster(payload: dict, region_spec: RegionSpec):
+    """
+    Check the payload of a cluster creation or of a restore task, which describe the whole cluster
+    :param payload: The create or restore payload
+    :param region_spec: The specifications of the cluster region
+    """
+    components = payload["config"]["components"]
+    problems = [f"{component} is required" for component in ("tidb", "tikv") if not components.get(component)]
+    for component in COMPONENTS:
+        if components.get(component):
+            problems.extend(component_problems(component, components[component], region_spec))
+    problems.extend(_tiflash_problems(components))
+    _raise(problems)
+
+
+def check_modify(payload: dict, dedicated_config: dict, region_spec: RegionSpec):
+    """
+    Check the payload of a cluster modification, merged into the current cluster detail
+    Only the components the payload changes are checked, so that a cluster on a retired node size can still be
+    modified.
+    :param payload: The modify payload
+    :param dedicated_config: The cluster detail
+    :param region_spec: The specifications of the cluster region
+    """
+    current = dedicated_config["config"]["components"]
+    merged = dict(current)
+    problems = []
+    for component, spec in payload["config"]["components"].items():
+        merged[component] = {**(current.get(component) or {}), **spec}
+        if current.get(component) is None or any(str(current[component].get(field)) != str(value)
+                                                 for field, value in spec.items()):
+            problems.extend(component_problems(component, merged[component], region_spec))
+    if "tiflash" in payload["config"]["components"]:
+        problems.extend(_tiflash_problems(merged))
+    _raise(problems)
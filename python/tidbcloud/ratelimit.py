@@ -0,0 +1,202 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to stay within the API rate limit from many clients in one process.
+Reads and writes draw from separate token buckets shared by every client, and requests rejected with
+429 or a 5xx status are retried with exponential backoff, honouring the `Retry-After` header.
+"""
+import email.utils
+import os
+import threading
+import time
+
+from .waiter import Backoff
+
+DEFAULT_MAX_RETRIES = 5
+READ_METHODS = ("GET", "HEAD")
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PATCH", "DELETE")
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        """
+        Token bucket handing out reservations, so that waiting callers are served in order
+        :param rate: Tokens added per second
+        :param burst: The bucket capacity
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take one token, possibly ahead of time
+        :return: Seconds to wait before the token is available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+
+def retry_after(headers) -> float:
+    """
+    Parse the Retry-After header, in seconds or as an HTTP date
+    :param headers: The response headers
+    :return: Seconds to wait, None if the header is missing or invalid
+    """
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _rate(value, env: str):
+    if value is None and os.environ.get(env):
+        value = float(os.environ[env])
+    return value
+
+
+class RateLimiter:
+    def __init__(self, read_rate: float = None, write_rate: float = None, read_burst: int = None,
+                 write_burst: int = None, max_retries: int = DEFAULT_MAX_RETRIES, backoff: Backoff = None):
+        """
+        Read and write budgets, and the retry policy of rejected requests
+        A budget is unlimited when its rate is None.
+        :param read_rate: Reads per second (env TIDBCLOUD_READ_RATE)
+        :param write_rate: Writes per second (env TIDBCLOUD_WRITE_RATE)
+        :param read_burst: Reads sent without waiting after an idle period, the read rate by default
+        :param write_burst: Writes sent without waiting after an idle period, the write rate by default
+        :param max_retries: The maximum number of retries of one request
+        :param backoff: The backoff between two retries when the server sends no Retry-After
+        """
+        read_rate = _rate(read_rate, "TIDBCLOUD_READ_RATE")
+        write_rate = _rate(write_rate, "TIDBCLOUD_WRITE_RATE")
+        self.read_bucket = TokenBucket(read_rate, read_burst or max(1, int(read_rate))) if read_rate else None
+        self.write_bucket = TokenBucket(write_rate, write_burst or max(1, int(write_rate))) if write_rate else None
+        self.max_retries = max_retries
+        self.backoff = backoff or Backoff(initial=0.5, maximum=30)
+        self._lock = threading.Lock()
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.throttled_requests = 0
+        self.throttled_seconds = 0.0
+        self.retries = 0
+        self.retry_wait_seconds = 0.0
+
+    def _reserve(self, method: str) -> float:
+        bucket = self.read_bucket if method.upper() in READ_METHODS else self.write_bucket
+        delay = bucket.reserve() if bucket is not None else 0.0
+        if delay > 0:
+            with self._lock:
+                self.queue_depth += 1
+                self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+                self.throttled_requests += 1
+                self.throttled_seconds += delay
+        return delay
+
+    def _dequeue(self):
+        with self._lock:
+            self.queue_depth -= 1
+
+    def acquire(self, method: str):
+        """
+        Block until the budget of the method allows one more request
+        """
+        delay = self._reserve(method)
+        if delay > 0:
+            try:
+                time.sleep(delay)
+            finally:
+                self._dequeue()
+
+    async def aacquire(self, method: str):
+        """
+        Async counterpart of acquire
+        """
+        # Only the async clients pay for importing asyncio, not the sync samples and the CLI
+        import asyncio
+
+        delay = self._reserve(method)
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._dequeue()
+
+    def retry_delay(self, method: str, status_code: int, headers, attempt: int) -> float:
+        """
+        Decide whether a response should be retried
+        Non-idempotent requests (POST) are only retried on 429, as the server did not process them.
+        :param method: The request method
+        :param status_code: The response status code
+        :param headers: The response headers
+        :param attempt: The number of retries already done
+        :return: Seconds to wait before the retry, None to give up
+        """
+        if status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+            return None
+        if status_code != 429 and method.upper() not in IDEMPOTENT_METHODS:
+            return None
+        delays = self.backoff.delays()
+        for _ in range(attempt):
+            next(delays)
+        delay = next(delays)
+        server_delay = retry_after(headers)
+        if server_delay is not None:
+            delay = max(delay, server_delay)
+        with self._lock:
+            self.retries += 1
+            self.retry_wait_seconds += delay
+        return delay
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "throttled_requests": self.throttled_requests,
+                "throttled_seconds": self.throttled_seconds,
+                "retries": self.retries,
+                "retry_wait_seconds": self.retry_wait_seconds,
+            }
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Get the rate limiter shared by every client in the process
+    :return: The shared rate limiter
+    """
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+        return _shared_limiter
+
+
+def configure(**kwargs) -> RateLimiter:
+    """
+    Replace the shared rate limiter, e.g. configure(read_rate=5, write_rate=1)
+    :return: The new shared rate limiter
+    """
+    global _shared_limiter
+    with _shared_lock:
+        _shared_limiter = RateLimiter(**kwargs)
+        return _shared_limiter
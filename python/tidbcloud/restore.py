@@ -0,0 +1,175 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to restore the latest successful backup of a cluster to a new cluster in one call.
+The backups are listed page by page while the source cluster detail is fetched concurrently, the restore task is
+submitted, and the new cluster is polled until it is `AVAILABLE`, reporting every status change on the way.
+Many clusters can be restored in parallel, e.g. for a disaster recovery drill.
+"""
+import asyncio
+import time
+
+from . import log, pagination
+from .aio import AsyncTiDBCloud
+from .waiter import CLUSTER_AVAILABLE, AsyncWaiter, cluster_status, latest_backup
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 3600
+
+
+async def find_latest_backup(client: AsyncTiDBCloud, project_id: str, cluster_id: str,
+                             page_size: int = pagination.DEFAULT_PAGE_SIZE) -> dict:
+    """
+    Find the newest successful backup of a cluster, walking the backup pages
+    :param client: The async client
+    :param project_id: The project id
+    :param cluster_id: The cluster id
+    :param page_size: The page size
+    :return: The backup, None if the cluster has no successful backup
+    """
+    latest = None
+    async for backup in pagination.aiter_backups(client, project_id, cluster_id, page_size=page_size, prefetch=True):
+        latest = latest_backup([backup] if latest is None else [latest, backup])
+    return latest
+
+
+class RestoreResult:
+    def __init__(self, project_id: str, cluster_id: str):
+        """
+        The progress and the outcome of the restore of one cluster
+        :param project_id: The project id
+        :param cluster_id: The source cluster id
+        """
+        self.project_id = project_id
+        self.cluster_id = cluster_id
+        self.backup_id = None
+        self.restore_id = None
+        self.new_cluster_id = None
+        self.status = None
+        self.error = None
+        self.started = None
+        self.finished = None
+
+    @property
+    def latency(self) -> float:
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+class RestoreReport:
+    def __init__(self, results: list, elapsed: float):
+        """
+        Summary of a restore drill
+        :param results: The restore results
+        :param elapsed: The wall clock time of the drill in seconds
+        """
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def succeeded(self) -> list:
+        return [result for result in self.results if result.status == CLUSTER_AVAILABLE]
+
+    def summary(self) -> str:
+        recovery_time = max((result.latency for result in self.succeeded), default=0.0)
+        lines = [f"clusters : {len(self.results)}, restored : {len(self.succeeded)}, "
+                 f"elapsed : {self.elapsed:.1f}s, max recovery time : {recovery_time:.1f}s"]
+        for result in self.results:
+            lines.append(f"project : {result.project_id}, cluster : {result.cluster_id}, "
+                         f"backup : {result.backup_id}, new cluster : {result.new_cluster_id}, "
+                         f"status : {result.status}, latency : {result.latency:.1f}s"
+                         + (f", error : {result.error}" if result.error else ""))
+        return "\n".join(lines)
+
+
+class _NoLimit:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+_NO_LIMIT = _NoLimit()
+
+
+async def restore_latest(client: AsyncTiDBCloud, project_id: str, cluster_id: str, root_password: str,
+                         waiter: AsyncWaiter = None, timeout: float = DEFAULT_TIMEOUT, on_progress=None,
+                         semaphore: asyncio.Semaphore = None) -> RestoreResult:
+    """
+    Restore the newest successful backup of a cluster to a new cluster and wait until it is AVAILABLE
+    Errors are reported in the result instead of being raised.
+    :param client: The async client
+    :param project_id: The project id
+    :param cluster_id: The source cluster id
+    :param root_password: The root password of the new cluster
+    :param waiter: The waiter polling the new cluster, a new one with the default backoff if None
+    :param timeout: Seconds to wait for the new cluster
+    :param on_progress: Function called with the result every time its status changes
+    :param semaphore: Bounds the number of restores being looked up and submitted at the same time
+    :return: The restore result
+    """
+    result = RestoreResult(project_id, cluster_id)
+    waiter = waiter or AsyncWaiter()
+
+    def progress(status: str):
+        if status == result.status:
+            return
+        result.status = status
+        log.logger.info("restore of cluster %s, new cluster : %s, status : %s", cluster_id, result.new_cluster_id,
+                        status)
+        if on_progress is not None:
+            on_progress(result)
+
+    async def fetch_new_cluster() -> dict:
+        cluster = await client.get_cluster_by_id(project_id, result.new_cluster_id)
+        progress(cluster_status(cluster))
+        return cluster
+
+    result.started = time.monotonic()
+    try:
+        async with semaphore or _NO_LIMIT:
+            progress("FINDING_BACKUP")
+            backup, source = await asyncio.gather(find_latest_backup(client, project_id, cluster_id),
+                                                  client.get_cluster_by_id(project_id, cluster_id))
+            if backup is None:
+                raise Exception(f"no successful backup found for cluster {cluster_id}.")
+            result.backup_id = backup["id"]
+            restore = await client.create_restore_task(project_id, result.backup_id, source, root_password)
+            result.restore_id = restore.get("id")
+            result.new_cluster_id = restore["cluster_id"]
+            progress("SUBMITTED")
+        await waiter.wait(("cluster", project_id, result.new_cluster_id, CLUSTER_AVAILABLE), fetch_new_cluster,
+                          lambda cluster: cluster_status(cluster) == CLUSTER_AVAILABLE, timeout=timeout)
+    except Exception as e:
+        result.error = str(e)
+        progress("ERROR")
+    finally:
+        result.finished = time.monotonic()
+    return result
+
+
+async def restore_drill(client: AsyncTiDBCloud, clusters: list, root_password: str,
+                        max_concurrency: int = DEFAULT_MAX_CONCURRENCY, waiter: AsyncWaiter = None,
+                        timeout: float = DEFAULT_TIMEOUT, on_progress=None) -> RestoreReport:
+    """
+    Restore the latest backup of every cluster in parallel and wait until all the new clusters are AVAILABLE
+    :param client: The async client
+    :param clusters: [(project id, cluster id)] to restore
+    :param root_password: The root password of the new clusters
+    :param max_concurrency: The maximum number of restores being looked up and submitted at the same time,
+                            the new clusters are all waited on in parallel
+    :param waiter: The waiter polling the new clusters, a new one with the default backoff if None
+    :param timeout: Seconds to wait for one new cluster
+    :param on_progress: Function called with a result every time its status changes
+    :return: The drill report
+    """
+    waiter = waiter or AsyncWaiter()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    start = time.monotonic()
+    results = await asyncio.gather(*[restore_latest(client, project_id, cluster_id, root_password, waiter, timeout,
+                                                    on_progress, semaphore)
+                                     for project_id, cluster_id in clusters])
+    return RestoreReport(list(results), time.monotonic() - start)
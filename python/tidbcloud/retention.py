@@ -0,0 +1,214 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to clean up the manual backups of many clusters with a retention policy
+(keep the last N, keep one per day or per week, delete after a maximum age).
+The backups of every cluster are listed concurrently, each cluster is planned as soon as its listing completes,
+and the expired backups are deleted concurrently within the rate limit. A dry run only reports the plan.
+"""
+import asyncio
+import datetime
+import time
+
+from . import pagination
+from .aio import AsyncTiDBCloud
+from .fleet import list_fleet
+from .waiter import BACKUP_FAILED, BACKUP_SUCCESS, backup_status
+
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_NAME_PREFIX = "tidbcloud-backup-"
+
+
+def backup_time(backup: dict) -> datetime.datetime:
+    """
+    The creation time of a backup, from `create_timestamp`, or from the date in its name
+    :param backup: The backup
+    :return: The UTC creation time, None if unknown
+    """
+    try:
+        return datetime.datetime.fromtimestamp(int(backup["create_timestamp"]), datetime.timezone.utc)
+    except (KeyError, TypeError, ValueError):
+        pass
+    try:
+        date = datetime.datetime.strptime((backup.get("name") or "")[-10:], "%Y-%m-%d")
+        return date.replace(tzinfo=datetime.timezone.utc)
+    except ValueError:
+        return None
+
+
+class RetentionPolicy:
+    def __init__(self, keep_last: int = None, keep_daily: int = None, keep_weekly: int = None,
+                 max_age_days: float = None, name_prefix: str = DEFAULT_NAME_PREFIX):
+        """
+        Which manual backups to keep, a backup is kept when any rule keeps it
+        Without any rule, every backup is kept. Running backups are always kept.
+        :param keep_last: Keep the N newest successful backups
+        :param keep_daily: Keep the newest successful backup of each of the N last days having one
+        :param keep_weekly: Keep the newest successful backup of each of the N last ISO weeks having one
+        :param max_age_days: Keep the backups younger than this, delete the older ones not kept by another rule
+        :param name_prefix: Only manage the backups whose name starts with this prefix, all manual backups if None
+        """
+        self.keep_last = keep_last
+        self.keep_daily = keep_daily
+        self.keep_weekly = keep_weekly
+        self.max_age_days = max_age_days
+        self.name_prefix = name_prefix
+
+    @property
+    def empty(self) -> bool:
+        return all(rule is None for rule in (self.keep_last, self.keep_daily, self.keep_weekly, self.max_age_days))
+
+    def managed(self, backup: dict) -> bool:
+        if backup.get("type") not in (None, "MANUAL"):
+            return False
+        return self.name_prefix is None or (backup.get("name") or "").startswith(self.name_prefix)
+
+    def plan(self, backups, now: datetime.datetime = None) -> tuple:
+        """
+        Split the backups of one cluster into the ones to keep and the ones to delete
+        :param backups: Iterable of backups of the cluster
+        :param now: The current time, used by max_age_days
+        :return: (kept backups, expired backups)
+        """
+        managed = [backup for backup in backups if self.managed(backup)]
+        if self.empty:
+            return managed, []
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        kept_ids = set()
+        # Newest first, backups without a known time are never deleted
+        dated = sorted(((backup_time(backup), backup) for backup in managed if backup_time(backup) is not None),
+                       key=lambda item: item[0], reverse=True)
+        kept_ids.update(backup["id"] for backup in managed if backup_time(backup) is None)
+        kept_ids.update(backup["id"] for _, backup in dated
+                        if backup_status(backup) not in (BACKUP_SUCCESS, BACKUP_FAILED))
+        succeeded = [(created, backup) for created, backup in dated if backup_status(backup) == BACKUP_SUCCESS]
+        if self.keep_last:
+            kept_ids.update(backup["id"] for _, backup in succeeded[:self.keep_last])
+        for count, period in ((self.keep_daily, lambda created: created.date()),
+                              (self.keep_weekly, lambda created: created.isocalendar()[:2])):
+            if not count:
+                continue
+            periods = set()
+            for created, backup in succeeded:
+                if period(created) not in periods:
+                    periods.add(period(created))
+                    kept_ids.add(backup["id"])
+                    if len(periods) == count:
+                        break
+        if self.max_age_days is not None:
+            oldest = now - datetime.timedelta(days=self.max_age_days)
+            kept_ids.update(backup["id"] for created, backup in dated if created >= oldest)
+        return ([backup for backup in managed if backup["id"] in kept_ids],
+                [backup for _, backup in dated if backup["id"] not in kept_ids])
+
+
+class Deletion:
+    def __init__(self, project_id: str, cluster_id: str, backup: dict):
+        """
+        One expired backup
+        :param project_id: The project id
+        :param cluster_id: The cluster id
+        :param backup: The backup
+        """
+        self.project_id = project_id
+        self.cluster_id = cluster_id
+        self.backup = backup
+        self.status = "PLANNED"
+        self.error = None
+
+
+class RetentionReport:
+    def __init__(self, deletions: list, kept: int, errors: dict, elapsed: float, dry_run: bool):
+        """
+        Summary of a retention run
+        :param deletions: The expired backups, with their deletion status
+        :param kept: The number of backups kept
+        :param errors: {(project id, cluster id): message} of the clusters whose backups could not be listed
+        :param elapsed: The wall clock time of the run in seconds
+        :param dry_run: Whether the backups were only planned for deletion
+        """
+        self.deletions = deletions
+        self.kept = kept
+        self.errors = errors
+        self.elapsed = elapsed
+        self.dry_run = dry_run
+
+    @property
+    def deleted(self) -> list:
+        return [deletion for deletion in self.deletions if deletion.status == "DELETED"]
+
+    @property
+    def failed(self) -> list:
+        return [deletion for deletion in self.deletions if deletion.status == "ERROR"]
+
+    @property
+    def throughput(self) -> float:
+        """
+        Deleted backups per second
+        """
+        return len(self.deleted) / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        lines = [f"{'dry run, ' if self.dry_run else ''}kept : {self.kept}, expired : {len(self.deletions)}, "
+                 f"deleted : {len(self.deleted)}, failed : {len(self.failed)}, elapsed : {self.elapsed:.1f}s, "
+                 f"throughput : {self.throughput:.1f} deletions/s"]
+        for deletion in self.deletions:
+            lines.append(f"project : {deletion.project_id}, cluster : {deletion.cluster_id}, "
+                         f"backup : {deletion.backup['id']} ({deletion.backup.get('name')}), "
+                         f"status : {deletion.status}" + (f", error : {deletion.error}" if deletion.error else ""))
+        for (project_id, cluster_id), error in self.errors.items():
+            lines.append(f"project : {project_id}, cluster : {cluster_id}, listing failed : {error}")
+        return "\n".join(lines)
+
+
+async def collect_garbage(client: AsyncTiDBCloud, policy: RetentionPolicy, clusters: list = None,
+                          project_ids: list = None, dry_run: bool = True,
+                          max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> RetentionReport:
+    """
+    Apply a retention policy to the manual backups of many clusters
+    :param client: The async client, its rate limiter paces the listings and the deletions
+    :param policy: The retention policy
+    :param clusters: [(project id, cluster id)] to clean up
+    :param project_ids: Clean up all the Dedicated Tier clusters of these projects when `clusters` is None
+    :param dry_run: Only plan the deletions
+    :param max_concurrency: The maximum number of listing and deletion requests in flight
+    :return: The run report
+    """
+    if clusters is None:
+        if not project_ids:
+            raise Exception("clusters or project_ids should be set.")
+        clusters = await list_fleet(client, project_ids)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    deletions = []
+    errors = {}
+    kept = 0
+
+    async def delete(deletion: Deletion):
+        async with semaphore:
+            try:
+                await client.delete_backup(deletion.project_id, deletion.cluster_id, deletion.backup["id"])
+                deletion.status = "DELETED"
+            except Exception as e:
+                deletion.status = "ERROR"
+                deletion.error = str(e)
+
+    async def clean_cluster(project_id: str, cluster_id: str):
+        nonlocal kept
+        try:
+            async with semaphore:
+                backups = [backup async for backup in pagination.aiter_backups(client, project_id, cluster_id)]
+        except Exception as e:
+            errors[(project_id, cluster_id)] = str(e)
+            return
+        cluster_kept, expired = policy.plan(backups, now)
+        kept += len(cluster_kept)
+        cluster_deletions = [Deletion(project_id, cluster_id, backup) for backup in expired]
+        deletions.extend(cluster_deletions)
+        if not dry_run:
+            await asyncio.gather(*[delete(deletion) for deletion in cluster_deletions])
+
+    start = time.monotonic()
+    await asyncio.gather(*[clean_cluster(project_id, cluster_id) for project_id, cluster_id in clusters])
+    return RetentionReport(deletions, kept, errors, time.monotonic() - start, dry_run)
@@ -0,0 +1,132 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to scale out the TiFlash nodes of many Dedicated Tier clusters at once.
+Each cluster gets the next valid TiFlash node quantity from the catalog, the modifications are sent
+concurrently within a limit, and every cluster is then waited on in parallel until it is `AVAILABLE` again.
+"""
+import asyncio
+import time
+
+from . import catalog
+from .aio import AsyncTiDBCloud
+from .fleet import list_fleet
+from .shape import plan_tiflash, tiflash_quantity
+from .waiter import CLUSTER_AVAILABLE, AsyncWaiter, cluster_status
+
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_TIMEOUT = 3600
+
+
+class ScaleResult:
+    def __init__(self, project_id: str, cluster_id: str):
+        """
+        The outcome of the scale-out of one cluster
+        :param project_id: The project id
+        :param cluster_id: The cluster id
+        """
+        self.project_id = project_id
+        self.cluster_id = cluster_id
+        self.from_quantity = None
+        self.to_quantity = None
+        self.status = None
+        self.error = None
+        self.started = None
+        self.finished = None
+
+    @property
+    def latency(self) -> float:
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+class ScaleReport:
+    def __init__(self, results: list, elapsed: float):
+        """
+        Summary of a bulk scale-out run
+        :param results: The scale results
+        :param elapsed: The wall clock time of the run in seconds
+        """
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def succeeded(self) -> list:
+        return [result for result in self.results if result.status == CLUSTER_AVAILABLE]
+
+    @property
+    def unchanged(self) -> list:
+        return [result for result in self.results if result.status == "UNCHANGED"]
+
+    @property
+    def failed(self) -> list:
+        return [result for result in self.results if result.status not in (CLUSTER_AVAILABLE, "UNCHANGED")]
+
+    def summary(self) -> str:
+        lines = [f"clusters : {len(self.results)}, scaled : {len(self.succeeded)}, "
+                 f"unchanged : {len(self.unchanged)}, failed : {len(self.failed)}, elapsed : {self.elapsed:.1f}s"]
+        for result in self.results:
+            lines.append(f"project : {result.project_id}, cluster : {result.cluster_id}, "
+                         f"tiflash : {result.from_quantity} -> {result.to_quantity}, status : {result.status}, "
+                         f"latency : {result.latency:.1f}s" + (f", error : {result.error}" if result.error else ""))
+        return "\n".join(lines)
+
+
+async def scale_out_tiflash(client: AsyncTiDBCloud, clusters: list = None, project_ids: list = None,
+                            target: int = None, delta: int = None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                            waiter: AsyncWaiter = None, timeout: float = DEFAULT_TIMEOUT) -> ScaleReport:
+    """
+    Scale out the TiFlash nodes of every cluster to a target quantity, or by a delta, and wait until all of them
+    are AVAILABLE with the new quantity
+    :param client: The async client
+    :param clusters: [(project id, cluster id)] to scale out
+    :param project_ids: Scale out all the Dedicated Tier clusters of these projects when `clusters` is None
+    :param target: The wanted TiFlash node quantity
+    :param delta: The number of TiFlash nodes to add, exclusive with target
+    :param max_concurrency: The maximum number of clusters being modified at the same time
+    :param waiter: The waiter polling the clusters, a new one with the default backoff if None
+    :param timeout: Seconds to wait for one cluster
+    :return: The run report
+    """
+    if (target is None) == (delta is None):
+        raise Exception("one of target or delta should be set.")
+    if clusters is None:
+        if not project_ids:
+            raise Exception("clusters or project_ids should be set.")
+        clusters = await list_fleet(client, project_ids)
+    waiter = waiter or AsyncWaiter()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    spec_catalog = catalog.get_catalog(await client.get_provider_regions_specifications())
+
+    async def scale_cluster(result: ScaleResult):
+        result.started = time.monotonic()
+        try:
+            async with semaphore:
+                cluster = await client.get_cluster_by_id(result.project_id, result.cluster_id)
+                region_spec = spec_catalog.require("DEDICATED", cluster.get("cloud_provider"), cluster.get("region"))
+                node_size, storage_size_gib, result.from_quantity, result.to_quantity = plan_tiflash(
+                    cluster, region_spec, target, delta)
+                if result.to_quantity == result.from_quantity:
+                    result.status = "UNCHANGED"
+                    return
+                await client.scale_tiflash(result.project_id, result.cluster_id, cluster, node_size,
+                                           storage_size_gib, result.to_quantity)
+            # The cluster may still report AVAILABLE right after the modification, so wait for the new quantity too
+            cluster = await waiter.wait(("tiflash", result.project_id, result.cluster_id, result.to_quantity),
+                                        lambda: client.get_cluster_by_id(result.project_id, result.cluster_id),
+                                        lambda cluster: cluster_status(cluster) == CLUSTER_AVAILABLE and
+                                        tiflash_quantity(cluster) == result.to_quantity,
+                                        timeout=timeout)
+            result.status = cluster_status(cluster)
+        except Exception as e:
+            result.status = "ERROR"
+            result.error = str(e)
+        finally:
+            result.finished = time.monotonic()
+
+    results = [ScaleResult(project_id, cluster_id) for project_id, cluster_id in clusters]
+    start = time.monotonic()
+    await asyncio.gather(*[scale_cluster(result) for result in results])
+    return ScaleReport(results, time.monotonic() - start)
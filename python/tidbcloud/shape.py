@@ -0,0 +1,104 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to scale a cluster declaratively: the desired TiDB, TiKV and TiFlash shape is compared with
+the cluster detail, and only the fields that differ are sent, or nothing at all when the cluster already
+has that shape. A reconcile loop running every few minutes then costs no write call while nothing changes.
+"""
+from .catalog import COMPONENTS, RegionSpec
+
+FIELDS = ("node_size", "node_quantity", "storage_size_gib")
+_INT_FIELDS = ("node_quantity", "storage_size_gib")
+
+
+def _normalize(component: dict) -> dict:
+    normalized = {}
+    for field, value in component.items():
+        if field not in FIELDS:
+            raise Exception(f"unknown component field : {field}, should be one of {FIELDS}.")
+        if value is not None:
+            normalized[field] = int(value) if field in _INT_FIELDS else str(value)
+    return normalized
+
+
+def current_shape(dedicated_config: dict) -> dict:
+    """
+    The shape of a cluster
+    :param dedicated_config: The cluster detail
+    :return: {component: {node_size, node_quantity, storage_size_gib}}, None for a component the cluster does not have
+    """
+    components = dedicated_config.get("config", {}).get("components", {})
+    return {component: _normalize({field: value for field, value in components[component].items()
+                                   if field in FIELDS}) if components.get(component) is not None else None
+            for component in COMPONENTS}
+
+
+def diff_shape(dedicated_config: dict, desired_shape: dict) -> dict:
+    """
+    The smallest components change turning the cluster into the desired shape
+    Fields left out of the desired shape are kept as they are. A component the cluster does not have yet,
+    e.g. TiFlash, is sent with all its desired fields.
+    :param dedicated_config: The cluster detail
+    :param desired_shape: e.g. {"tidb": {"node_quantity": 3}, "tiflash": {"node_size": "8C64G", "node_quantity": 2,
+                          "storage_size_gib": 500}}
+    :return: The changed fields by component, empty if the cluster already has the desired shape
+    """
+    current = current_shape(dedicated_config)
+    changes = {}
+    for component, desired in desired_shape.items():
+        if component not in COMPONENTS:
+            raise Exception(f"unknown component : {component}, should be one of {COMPONENTS}.")
+        desired = _normalize(desired or {})
+        if current[component] is None:
+            if desired.get("node_quantity", 0) > 0:
+                changes[component] = desired
+            continue
+        changed = {field: value for field, value in desired.items() if current[component].get(field) != value}
+        if changed:
+            changes[component] = changed
+    return changes
+
+
+def patch_payload(changes: dict) -> dict:
+    """
+    :param changes: The changed fields by component, from diff_shape
+    :return: The modify payload
+    """
+    return {"config": {"components": changes}}
+
+
+def tiflash_quantity(cluster: dict) -> int:
+    tiflash = cluster.get("config", {}).get("components", {}).get("tiflash")
+    return int(tiflash["node_quantity"]) if tiflash is not None else 0
+
+
+def plan_tiflash(dedicated_config: dict, region_spec: RegionSpec, target: int = None,
+                 delta: int = None) -> tuple:
+    """
+    Compute the TiFlash nodes of a cluster after the scale-out
+    A cluster without TiFlash gets the first TiFlash node size of its region with the minimum storage.
+    The quantity is rounded up to the `node_quantity_range.step` of the node size, and is never decreased.
+    :param dedicated_config: The cluster detail
+    :param region_spec: The specifications of the cluster region
+    :param target: The wanted TiFlash node quantity
+    :param delta: The number of TiFlash nodes to add, when target is None
+    :return: (node size, storage size gib, current quantity, new quantity)
+    """
+    tiflash = dedicated_config["config"]["components"].get("tiflash")
+    if tiflash is not None:
+        node_size = tiflash["node_size"]
+        storage_size_gib = tiflash["storage_size_gib"]
+        spec = region_spec.component("tiflash", node_size)
+    else:
+        spec = region_spec.default("tiflash")
+        node_size = spec.node_size if spec is not None else None
+        storage_size_gib = spec.min_storage_gib if spec is not None else None
+    if spec is None:
+        print(f"TiFlash {node_size or ''} not available in {region_spec.cloud_provider} {region_spec.region}!")
+        raise Exception("TiFlash specification not found!")
+    current = tiflash_quantity(dedicated_config)
+    if target is not None:
+        delta = target - current
+    quantity = spec.next_quantity(current, delta) if delta > 0 else current
+    return node_size, storage_size_gib, current, quantity
@@ -0,0 +1,153 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to merge identical concurrent reads into one API call: while a GET is in flight, the same GET from
+other threads or coroutines waits for it and shares its result instead of sending its own request. An optional
+freshness window also serves the result to the identical reads of the next seconds, to absorb bursts.
+Every write forgets the shared results, so that a read sent after a write sees it.
+"""
+import os
+import threading
+import time
+
+DEFAULT_TTL = 0.0
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class Group:
+    def __init__(self, ttl: float = None):
+        """
+        Identical calls in flight, by key
+        The results are shared between the callers: treat them as read-only.
+        :param ttl: Seconds a result is still served after its call finished, only while in flight if 0
+                    (env TIDBCLOUD_SINGLEFLIGHT_TTL)
+        """
+        if ttl is None:
+            ttl = float(os.environ.get("TIDBCLOUD_SINGLEFLIGHT_TTL", DEFAULT_TTL))
+        self.ttl = ttl
+        self.calls = 0
+        self.shared = 0
+        self.fresh = 0
+        self._calls = {}
+        self._tasks = {}
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        """
+        The fresh result of the key, or None, with the lock held
+        """
+        result = self._results.get(key)
+        if result is None:
+            return None
+        if time.monotonic() >= result[0]:
+            del self._results[key]
+            return None
+        self.fresh += 1
+        return result
+
+    def _store(self, key, in_flight: dict, call, value):
+        """
+        Keep the result for the freshness window, unless the call was forgotten meanwhile, with the lock held
+        """
+        if in_flight.get(key) is not call:
+            return
+        del in_flight[key]
+        if self.ttl > 0:
+            self._results[key] = (time.monotonic() + self.ttl, value)
+
+    def do(self, key, fetch):
+        """
+        Call `fetch`, or wait for the identical call in flight in another thread and share its result
+        :param key: The identity of the call, e.g. the method and the url
+        :param fetch: Function returning the result
+        :return: The result, the error of `fetch` is raised to every caller sharing it
+        """
+        with self._lock:
+            fresh = self._lookup(key)
+            if fresh is not None:
+                return fresh[1]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+        try:
+            call.value = fetch()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            raise
+        else:
+            with self._lock:
+                self._store(key, self._calls, call, call.value)
+        finally:
+            call.done.set()
+        return call.value
+
+    async def ado(self, key, fetch):
+        """
+        Async counterpart of do, for coroutines of one event loop
+        The call runs in its own task, so that cancelling one of the callers does not cancel it for the others.
+        :param key: The identity of the call
+        :param fetch: Coroutine function returning the result
+        :return: The result
+        """
+        import asyncio
+
+        with self._lock:
+            fresh = self._lookup(key)
+            if fresh is not None:
+                return fresh[1]
+            task = self._tasks.get(key)
+            if task is None:
+                task = self._tasks[key] = asyncio.ensure_future(fetch())
+                task.add_done_callback(lambda done: self._finished(key, done))
+                self.calls += 1
+            else:
+                self.shared += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        with self._lock:
+            if task.cancelled() or task.exception() is not None:
+                # exception() also marks the error as retrieved when every caller was cancelled
+                if self._tasks.get(key) is task:
+                    del self._tasks[key]
+                return
+            self._store(key, self._tasks, task, task.result())
+
+    def forget(self):
+        """
+        Drop the fresh results, and let the next calls start new requests instead of joining the ones in flight
+        """
+        with self._lock:
+            self._results.clear()
+            self._calls.clear()
+            self._tasks.clear()
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            total = self.calls + self.shared + self.fresh
+            return {
+                "calls": self.calls,
+                "shared": self.shared,
+                "fresh": self.fresh,
+                "saved_ratio": (self.shared + self.fresh) / total if total else 0.0,
+            }
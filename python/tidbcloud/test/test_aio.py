@@ -0,0 +1,169 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import asyncio
+import json
+import time
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from tidbcloud.aio import ApiError, AsyncTiDBCloud  # noqa: E402
+from tidbcloud.hedge import HedgePolicy  # noqa: E402
+from tidbcloud.metrics import Metrics  # noqa: E402
+
+CLUSTER = {
+    "id": "1",
+    "project_id": "2",
+    "status": {"cluster_status": "AVAILABLE"},
+    "config": {
+        "components": {
+            "tidb": {"node_size": "8C16G", "node_quantity": 1},
+            "tikv": {"node_size": "8C32G", "storage_size_gib": 500, "node_quantity": 3},
+            "tiflash": None,
+        }
+    },
+}
+SPECIFICATIONS = {
+    "items": [
+        {
+            "cluster_type": "DEDICATED",
+            "tidb": [{"node_size": "8C16G", "node_quantity_range": {"min": 1, "step": 1}}],
+            "tikv": [{"node_size": "8C32G", "storage_size_gib_range": {"min": 500, "max": 4096},
+                      "node_quantity_range": {"min": 3, "step": 3}}],
+            "tiflash": [{"node_size": "8C64G", "storage_size_gib_range": {"min": 500, "max": 2048},
+                         "node_quantity_range": {"min": 0, "step": 1}}],
+        }
+    ]
+}
+
+
+class TestAsyncTiDBCloud:
+    def setup_method(self):
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Paths whose next request hangs
+        self.stalled = set()
+
+    async def _handler(self, request):
+        self.requests.append(request)
+        if request.url.path in self.stalled:
+            self.stalled.discard(request.url.path)
+            await asyncio.sleep(5)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if request.url.path == "/api/v1beta/clusters/provider/regions":
+            return httpx.Response(200, json=SPECIFICATIONS)
+        if request.method == "GET":
+            return httpx.Response(200, json=CLUSTER)
+        if request.url.path.endswith("/backups"):
+            return httpx.Response(200, json={"id": "3"})
+        if request.url.path.endswith("/restores"):
+            return httpx.Response(200, json={"id": "4", "cluster_id": "5"})
+        return httpx.Response(200, json={})
+
+    def _client(self, **kwargs) -> AsyncTiDBCloud:
+        return AsyncTiDBCloud("public", "private", host="http://tidbcloud.test",
+                              http_transport=httpx.MockTransport(self._handler), **kwargs)
+
+    def test_bounded_concurrency(self):
+        print("test : bounded concurrency.")
+
+        async def run():
+            async with self._client(max_concurrency=4) as client:
+                # Distinct clusters, identical reads would share one request
+                return await asyncio.gather(*[client.get_cluster_by_id("2", str(i)) for i in range(20)])
+
+        results = asyncio.run(run())
+
+        # assert content
+        assert len(results) == 20
+        assert all(result["id"] == "1" for result in results)
+        assert self.max_in_flight == 4
+
+    def test_identical_reads(self):
+        print("test : identical concurrent reads share one request.")
+
+        async def run():
+            async with self._client() as client:
+                clusters = await asyncio.gather(*[client.get_cluster_by_id("2", "1") for _ in range(20)])
+                await client.request("PATCH", "/api/v1beta/projects/2/clusters/1", {"config": {"components": {}}})
+                cluster = await client.get_cluster_by_id("2", "1")
+                return clusters, cluster, client.singleflight.as_dict()
+
+        clusters, cluster, stats = asyncio.run(run())
+
+        # assert content
+        assert all(result is clusters[0] for result in clusters)
+        # the read after the write is sent again
+        assert cluster is not clusters[0]
+        assert [request.method for request in self.requests] == ["GET", "PATCH", "GET"]
+        assert stats["calls"] == 2 and stats["shared"] == 19
+
+    def test_hedged_reads(self):
+        print("test : a slow read is sent again and the first response is kept.")
+        recorder = Metrics()
+
+        async def run():
+            async with self._client(metrics=recorder, hedge=HedgePolicy(min_delay=0.001)) as client:
+                for i in range(20):
+                    await client.get_cluster_by_id("2", str(i))
+                self.stalled.add("/api/v1beta/projects/2/clusters/99")
+                start = time.monotonic()
+                cluster = await client.get_cluster_by_id("2", "99")
+                return cluster, time.monotonic() - start
+
+        cluster, seconds = asyncio.run(run())
+        summary = recorder.summary()["endpoints"]["GET /api/v1beta/projects/{project_id}/clusters/{cluster_id}"]
+
+        # assert content
+        assert cluster["id"] == "1"
+        assert seconds < 1
+        assert len(self.requests) == 22
+        assert (summary["hedges"], summary["hedge_wins"]) == (1, 1)
+
+    def test_backup_restore_and_scale(self):
+        print("test : backup, restore and scale.")
+
+        async def run():
+            async with self._client() as client:
+                backup = await client.create_manual_backup("2", "1")
+                restore = await client.create_restore_task("2", backup["id"], CLUSTER, "secret")
+                modify = await client.modify_cluster("2", "1", CLUSTER)
+                return backup, restore, modify
+
+        backup, restore, modify = asyncio.run(run())
+
+        # assert content
+        assert backup["id"] == "3"
+        assert restore["cluster_id"] == "5"
+        assert modify == {}
+        restore_payload = json.loads(next(request.content for request in self.requests
+                                          if request.url.path.endswith("/restores")))
+        assert restore_payload["backup_id"] == "3"
+        assert restore_payload["config"]["root_password"] == "secret"
+        assert "tiflash" not in restore_payload["config"]["components"]
+        patch_payload = json.loads(self.requests[-1].content)
+        assert patch_payload["config"]["components"]["tiflash"]["node_quantity"] == 1
+
+    def test_error(self):
+        print("test : error response.")
+
+        async def run():
+            async with AsyncTiDBCloud("public", "private", host="http://tidbcloud.test",
+                                      http_transport=httpx.MockTransport(
+                                          lambda request: httpx.Response(404, text="not found"))) as client:
+                await client.delete_backup("2", "1", "3")
+
+        with pytest.raises(ApiError, match="code : 404") as error:
+            asyncio.run(run())
+        assert error.value.status_code == 404
+
+
+if __name__ == "__main__":
+    pytest.main()
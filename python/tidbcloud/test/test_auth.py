@@ -0,0 +1,138 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import hashlib
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from requests.utils import parse_dict_header
+
+from tidbcloud import auth, transport
+
+PUBLIC_KEY = "public"
+PRIVATE_KEY = "private"
+REALM = "tidb.cloud"
+
+
+def _md5(value: str) -> str:
+    return hashlib.md5(value.encode("utf-8")).hexdigest()
+
+
+class _DigestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    nonce = "nonce-1"
+    stale = False
+    # Whether a request signed with an old nonce is told the nonce is stale, False as after a restart
+    stale_on_new_nonce = True
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        header = self.headers.get("Authorization", "")
+        fields = parse_dict_header(re.sub(r"^Digest ", "", header))
+        if fields.get("nonce") != self.nonce:
+            self._challenge(stale=bool(fields) and self.stale_on_new_nonce)
+            return
+        ha1 = _md5(f"{PUBLIC_KEY}:{REALM}:{PRIVATE_KEY}")
+        ha2 = _md5(f"GET:{fields['uri']}")
+        expected = _md5(f"{ha1}:{self.nonce}:{fields['nc']}:{fields['cnonce']}:auth:{ha2}")
+        if fields.get("response") != expected:
+            self._challenge(stale=False)
+            return
+        self._reply(200, b"{}")
+
+    def _challenge(self, stale: bool):
+        self.send_response(401)
+        self.send_header("WWW-Authenticate",
+                         f'Digest realm="{REALM}", qop="auth", nonce="{self.nonce}", opaque="opaque", '
+                         f'stale={"true" if stale else "false"}')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _reply(self, code: int, body: bytes):
+        self.send_response(code)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPreemptiveDigestAuth:
+    @pytest.fixture()
+    def server_url(self):
+        _DigestHandler.nonce = "nonce-1"
+        _DigestHandler.stale_on_new_nonce = True
+        _DigestHandler.requests = 0
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _DigestHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+        server.shutdown()
+        server.server_close()
+
+    def test_challenge_avoided(self, server_url):
+        print("test : send authorization preemptively.")
+        cache = auth.ChallengeCache()
+        shared = transport.Transport()
+        for _ in range(3):
+            digest_auth = auth.PreemptiveDigestAuth(PUBLIC_KEY, PRIVATE_KEY, cache=cache)
+            resp = shared.get(url=f"{server_url}/api/v1beta/projects", auth=digest_auth)
+            assert resp.status_code == 200
+
+        # assert content
+        assert cache.as_dict() == {"challenges": 1, "challenges_avoided": 2, "stale_challenges": 0}
+        assert _DigestHandler.requests == 4
+
+    def test_stale_nonce(self, server_url):
+        print("test : re-challenge on stale nonce.")
+        cache = auth.ChallengeCache()
+        digest_auth = auth.PreemptiveDigestAuth(PUBLIC_KEY, PRIVATE_KEY, cache=cache)
+        shared = transport.Transport()
+        assert shared.get(url=f"{server_url}/api/v1beta/projects", auth=digest_auth).status_code == 200
+        _DigestHandler.nonce = "nonce-2"
+        assert shared.get(url=f"{server_url}/api/v1beta/projects", auth=digest_auth).status_code == 200
+        assert shared.get(url=f"{server_url}/api/v1beta/projects", auth=digest_auth).status_code == 200
+
+        # assert content
+        assert cache.as_dict() == {"challenges": 1, "challenges_avoided": 1, "stale_challenges": 1}
+
+    def test_new_challenge(self, server_url):
+        print("test : re-challenge on a new challenge without stale, e.g. after a server restart.")
+        cache = auth.ChallengeCache()
+        digest_auth = auth.PreemptiveDigestAuth(PUBLIC_KEY, PRIVATE_KEY, cache=cache)
+        shared = transport.Transport()
+        assert shared.get(url=f"{server_url}/api/v1beta/projects", auth=digest_auth).status_code == 200
+        _DigestHandler.nonce = "nonce-2"
+        _DigestHandler.stale_on_new_nonce = False
+        _DigestHandler.requests = 0
+        resp = shared.get(url=f"{server_url}/api/v1beta/projects", auth=digest_auth)
+
+        # assert content
+        assert resp.status_code == 200
+        assert _DigestHandler.requests == 2
+        assert cache.as_dict() == {"challenges": 2, "challenges_avoided": 0, "stale_challenges": 0}
+        assert shared.get(url=f"{server_url}/api/v1beta/projects", auth=digest_auth).status_code == 200
+        assert _DigestHandler.requests == 3
+
+    def test_wrong_credentials(self, server_url):
+        print("test : wrong credentials.")
+        cache = auth.ChallengeCache()
+        shared = transport.Transport()
+        digest_auth = auth.PreemptiveDigestAuth(PUBLIC_KEY, "wrong", cache=cache)
+        resp = shared.get(url=f"{server_url}/api/v1beta/projects", auth=digest_auth)
+
+        # assert content
+        assert resp.status_code == 401
+        assert cache.reserve(server_url[len("http://"):]) is not None
+        resp = shared.get(url=f"{server_url}/api/v1beta/projects", auth=digest_auth)
+        assert resp.status_code == 401
+        assert cache.reserve(server_url[len("http://"):]) is None
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,101 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import time
+
+import pytest
+
+from tidbcloud import auth, ratelimit, transport
+from tidbcloud.breaker import CircuitBreaker, CircuitOpenError
+from tidbcloud.metrics import Metrics
+from tidbcloud.mockserver import MockConfig, MockServer
+
+URL = "http://tidbcloud.test/api/v1beta/projects/1/clusters/2"
+
+
+class TestCircuitBreaker:
+    def test_open_and_probe(self):
+        print("test : the circuit opens on failures and closes after a successful probe.")
+        recorder = Metrics()
+        breaker = CircuitBreaker(min_requests=4, cooldown=0.05)
+        for failed in (False, True, True, True):
+            breaker.check("GET", URL, recorder)
+            breaker.record("GET", URL, failed, recorder)
+        still_closed = breaker.states()
+        breaker.record("GET", URL, True, recorder)
+        with pytest.raises(CircuitOpenError, match="circuit open for GET"):
+            breaker.check("GET", f"{URL[:-1]}3", recorder)
+        time.sleep(0.05)
+        # the first caller after the cooldown is the probe, the others are still rejected
+        breaker.check("GET", URL, recorder)
+        with pytest.raises(CircuitOpenError):
+            breaker.check("GET", URL, recorder)
+        breaker.record("GET", URL, False, recorder)
+        breaker.check("GET", URL, recorder)
+
+        # assert content
+        assert still_closed == {"GET http://tidbcloud.test/api/v1beta/projects/{project_id}/clusters/{cluster_id}":
+                                "closed"}
+        assert breaker.states() == {
+            "GET http://tidbcloud.test/api/v1beta/projects/{project_id}/clusters/{cluster_id}": "closed"}
+        assert breaker.rejected == 2
+        exported = recorder.to_prometheus()
+        assert ('tidbcloud_circuit_state{method="GET",endpoint="/api/v1beta/projects/{project_id}/clusters/'
+                '{cluster_id}"} 0') in exported
+        assert ('tidbcloud_circuit_rejections_total{method="GET",endpoint="/api/v1beta/projects/{project_id}/'
+                'clusters/{cluster_id}"} 2') in exported
+
+    def test_failed_probe(self):
+        print("test : a failed probe opens the circuit again, a cancelled one lets another probe through.")
+        breaker = CircuitBreaker(min_requests=1, cooldown=0.05)
+        breaker.record("GET", URL, True)
+        time.sleep(0.05)
+        breaker.check("GET", URL)
+        breaker.record("GET", URL, None)
+        breaker.check("GET", URL)
+        breaker.record("GET", URL, True)
+
+        # assert content
+        with pytest.raises(CircuitOpenError) as raised:
+            breaker.check("GET", URL)
+        assert 0 < raised.value.retry_in <= 0.05
+        # other methods, endpoints and hosts have their own circuit
+        breaker.check("PATCH", URL)
+        breaker.check("GET", "http://tidbcloud.test/api/v1beta/projects")
+        breaker.check("GET", URL.replace("tidbcloud.test", "other.test"))
+        # never opens when disabled
+        disabled = CircuitBreaker(min_requests=0)
+        disabled.record("GET", URL, True)
+        disabled.check("GET", URL)
+
+    def test_transport(self):
+        print("test : the transport fails fast on a degraded endpoint.")
+        recorder = Metrics()
+        with MockServer(MockConfig(error_rate=1.0)) as server:
+            shared = transport.Transport(limiter=ratelimit.RateLimiter(max_retries=0), metrics=recorder,
+                                         breaker=CircuitBreaker(min_requests=3, cooldown=60))
+            digest_auth = auth.PreemptiveDigestAuth(server.config.public_key, server.config.private_key,
+                                                    cache=auth.ChallengeCache())
+            url = f"{server.url}/api/v1beta/projects"
+            failed = [shared.get(url, auth=digest_auth).status_code for _ in range(3)]
+            sent = server.counters["requests"]
+            with pytest.raises(CircuitOpenError):
+                shared.get(url, auth=digest_auth)
+            rejected_sent = server.counters["requests"] - sent
+            server.config.error_rate = 0
+            other = shared.get(f"{server.url}/api/v1beta/clusters/provider/regions", auth=digest_auth)
+            shared.close()
+        endpoints = recorder.summary()["endpoints"]
+
+        # assert content
+        assert failed == [500, 500, 500]
+        assert rejected_sent == 0
+        assert other.status_code == 200
+        assert endpoints["GET /api/v1beta/projects"]["circuit"] == "open"
+        assert endpoints["GET /api/v1beta/projects"]["rejected"] == 1
+        assert endpoints["GET /api/v1beta/clusters/provider/regions"]["circuit"] == "closed"
+
+
+if __name__ == "__main__":
+    pytest.main()
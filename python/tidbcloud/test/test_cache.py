@@ -0,0 +1,104 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tidbcloud import cache, transport
+
+CATALOG = {"items": [{"cluster_type": "DEDICATED", "cloud_provider": "AWS", "region": "us-west-2"}]}
+ETAG = '"catalog-1"'
+
+
+class _CatalogHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def do_GET(self):
+        type(self).requests.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps(CATALOG).encode("utf-8")
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCatalogCache:
+    @pytest.fixture()
+    def url(self):
+        _CatalogHandler.requests = []
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _CatalogHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{server.server_address[1]}/api/v1beta/clusters/provider/regions"
+        server.shutdown()
+        server.server_close()
+
+    def test_fresh_entry(self, url, tmp_path):
+        print("test : fresh entry from memory and disk.")
+        shared = transport.Transport()
+        path = str(tmp_path / "provider_regions.json")
+        assert cache.CatalogCache(path=path).fetch(shared, url, None) == CATALOG
+        catalog_cache = cache.CatalogCache(path=path)
+        assert catalog_cache.fetch(shared, url, None) == CATALOG
+        assert catalog_cache.fetch(shared, url, None) == CATALOG
+
+        # assert content
+        assert len(_CatalogHandler.requests) == 1
+        assert catalog_cache.hits == 2
+
+    def test_revalidate_expired_entry(self, url):
+        print("test : revalidate expired entry.")
+        shared = transport.Transport()
+        catalog_cache = cache.CatalogCache(path="", ttl=0)
+        assert catalog_cache.fetch(shared, url, None) == CATALOG
+        assert catalog_cache.fetch(shared, url, None) == CATALOG
+
+        # assert content
+        assert len(_CatalogHandler.requests) == 2
+        assert _CatalogHandler.requests[1]["If-None-Match"] == ETAG
+        assert catalog_cache.revalidations == 1
+
+    def test_entry_dropped_before_not_modified(self, url, monkeypatch):
+        print("test : refetch an entry dropped while it was revalidated.")
+        shared = transport.Transport()
+        catalog_cache = cache.CatalogCache(path="", ttl=0)
+        # The entry was there when the conditional request was sent, and is gone when the 304 arrives
+        monkeypatch.setattr(catalog_cache, "conditional_headers", lambda request_url: {"If-None-Match": ETAG})
+
+        # assert content
+        assert catalog_cache.fetch(shared, url, None) == CATALOG
+        assert len(_CatalogHandler.requests) == 2
+        assert "If-None-Match" not in _CatalogHandler.requests[1]
+        assert catalog_cache.revalidations == 0
+        assert catalog_cache.misses == 1
+
+    def test_invalidate(self, url):
+        print("test : invalidate.")
+        shared = transport.Transport()
+        catalog_cache = cache.CatalogCache(path="")
+        catalog_cache.fetch(shared, url, None)
+        catalog_cache.invalidate()
+        catalog_cache.fetch(shared, url, None)
+
+        # assert content
+        assert len(_CatalogHandler.requests) == 2
+        assert "If-None-Match" not in _CatalogHandler.requests[1]
+        assert catalog_cache.misses == 2
+
+
+if __name__ == "__main__":
+    pytest.main()
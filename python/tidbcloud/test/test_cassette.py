@@ -0,0 +1,94 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import json
+
+import pytest
+
+from tidbcloud import auth, cassette, ratelimit, transport
+from tidbcloud.mockserver import MockServer
+
+
+class TestCassette:
+    def setup_method(self):
+        self.transport = transport.Transport(limiter=ratelimit.RateLimiter(max_retries=0))
+
+    def teardown_method(self):
+        self.transport.close()
+
+    def _calls(self, host: str, project_id: str) -> list:
+        digest_auth = auth.PreemptiveDigestAuth("public", "private", cache=auth.ChallengeCache())
+        projects = self.transport.get(f"{host}/api/v1beta/projects?page_size=10&page=1", auth=digest_auth)
+        cluster = self.transport.post(f"{host}/api/v1beta/projects/{project_id}/clusters", auth=digest_auth, json={
+            "name": "replay", "cluster_type": "DEDICATED", "cloud_provider": "AWS", "region": "us-west-2",
+            "config": {"root_password": "secret", "port": 4000, "components": {
+                "tidb": {"node_size": "8C16G", "node_quantity": 1},
+                "tikv": {"node_size": "8C32G", "storage_size_gib": 500, "node_quantity": 3}}}})
+        first = self.transport.get(f"{host}/api/v1beta/projects/{project_id}/clusters/{cluster.json()['id']}",
+                                   auth=digest_auth)
+        second = self.transport.get(f"{host}/api/v1beta/projects/{project_id}/clusters/{cluster.json()['id']}",
+                                    auth=digest_auth)
+        return [resp.json() for resp in (projects, cluster, first, second)]
+
+    def test_record_and_replay(self, tmp_path):
+        print("test : record and replay.")
+        path = str(tmp_path / "cassettes" / "exchanges.json")
+        with MockServer() as server:
+            server.config.create_seconds = 0.01
+            project_id = server.state.seed(backups=0)[0][0]
+            recording = cassette.Cassette(path, mode="record")
+            with recording.use(self.transport.session):
+                recorded = self._calls(server.url, project_id)
+            recorded_requests = server.counters["requests"]
+        replaying = cassette.Cassette(path, mode="auto")
+        with replaying.use(self.transport.session):
+            # The host of the recording does not matter, the server is gone anyway
+            replayed = self._calls("https://api.tidbcloud.com", project_id)
+        with open(path) as f:
+            text = f.read()
+
+        # assert content
+        assert replaying.mode == "replay"
+        assert replayed == recorded
+        # one digest challenge was answered while recording, and left out of the recording
+        assert recorded_requests == 5
+        assert [interaction["request"]["key"].split(" ")[0] for interaction in json.loads(text)["interactions"]] == \
+               ["GET", "POST", "GET", "GET"]
+        assert "page=1&page_size=10" in text
+        assert "secret" not in text and "Digest" not in text
+
+    def test_replay_missing_exchange(self, tmp_path):
+        print("test : replay an exchange that was not recorded.")
+        path = tmp_path / "exchanges.json"
+        path.write_text(json.dumps({"env": {}, "interactions": []}))
+
+        # assert content
+        with cassette.Cassette(str(path)).use(self.transport.session):
+            with pytest.raises(Exception, match="no recorded response left for GET /api/v1beta/projects"):
+                self.transport.get("https://api.tidbcloud.com/api/v1beta/projects")
+        assert cassette.Cassette(str(tmp_path / "missing.json")).mode == "live"
+        with pytest.raises(Exception, match="unknown cassette mode"):
+            cassette.Cassette(str(path), mode="rewind")
+
+    def test_replay_different_body(self, tmp_path):
+        print("test : replay a request sending another body than the recorded one.")
+        url = "https://api.tidbcloud.com/api/v1beta/projects/1/clusters/2/backups"
+        recorded = {"request": {"key": "POST /api/v1beta/projects/1/clusters/2/backups",
+                                "body": '{"name": "tidbcloud-backup-2022-08-01", "quantity": 3}'},
+                    "response": {"status_code": 200, "headers": {}, "body": {"id": "3"}}}
+        path = tmp_path / "exchanges.json"
+        path.write_text(json.dumps({"env": {}, "interactions": [recorded, recorded]}))
+
+        # assert content
+        with cassette.Cassette(str(path)).use(self.transport.session):
+            # the names generated from the clock may differ
+            resp = self.transport.post(url, json={"name": "tidbcloud-backup-2026-10-18", "quantity": 3})
+            assert resp.json() == {"id": "3"}
+            with pytest.raises(Exception, match="request body of POST /api/v1beta/projects/1/clusters/2/backups "
+                                                "differs from the recording"):
+                self.transport.post(url, json={"name": "tidbcloud-backup-2026-10-18", "quantity": "3"})
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,70 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import pytest
+
+from tidbcloud import catalog
+
+PROVIDER_REGIONS = {
+    "items": [
+        {"cluster_type": "DEVELOPER", "cloud_provider": "AWS", "region": "us-west-2"},
+        {
+            "cluster_type": "DEDICATED", "cloud_provider": "AWS", "region": "us-west-2",
+            "tidb": [{"node_size": "8C16G", "node_quantity_range": {"min": 1, "step": 1}}],
+            "tikv": [{"node_size": "8C32G", "node_quantity_range": {"min": 3, "step": 3},
+                      "storage_size_gib_range": {"min": 500, "max": 4096}}],
+            "tiflash": [{"node_size": "8C64G", "node_quantity_range": {"min": 0, "step": 1},
+                         "storage_size_gib_range": {"min": 500, "max": 2048}}],
+        },
+        {
+            "cluster_type": "DEDICATED", "cloud_provider": "GCP", "region": "us-central1",
+            "tidb": [{"node_size": "4C16G", "node_quantity_range": {"min": 1, "step": 1}}],
+            "tikv": [{"node_size": "4C16G", "node_quantity_range": {"min": 3, "step": 3},
+                      "storage_size_gib_range": {"min": 200, "max": 2048}}],
+        },
+    ]
+}
+
+
+class TestSpecCatalog:
+    def setup_method(self):
+        self.catalog = catalog.get_catalog(PROVIDER_REGIONS)
+
+    def test_find(self):
+        print("test : find region specifications.")
+
+        # assert content
+        assert self.catalog.find("DEDICATED").cloud_provider == "AWS"
+        assert self.catalog.find("DEDICATED", "GCP").region == "us-central1"
+        assert self.catalog.find("DEDICATED", region="us-central1").cloud_provider == "GCP"
+        assert self.catalog.find("DEDICATED", "GCP", "us-west-2") is None
+        assert self.catalog.require("DEVELOPER", "AWS").region == "us-west-2"
+        with pytest.raises(Exception, match="DEVELOPER config not found"):
+            self.catalog.require("DEVELOPER", "GCP")
+
+    def test_component(self):
+        print("test : component specifications.")
+        region = self.catalog.require("DEDICATED", "AWS", "us-west-2")
+        tikv = region.component("tikv", "8C32G")
+
+        # assert content
+        assert region.default("tiflash").node_size == "8C64G"
+        assert self.catalog.require("DEDICATED", "GCP").default("tiflash") is None
+        assert tikv.is_valid_quantity(6)
+        assert not tikv.is_valid_quantity(4)
+        assert tikv.next_quantity(3) == 6
+        assert region.default("tiflash").next_quantity(0) == 1
+        assert tikv.is_valid_storage(500)
+        assert not tikv.is_valid_storage(8192)
+
+    def test_index_reused(self):
+        print("test : index built once per response.")
+
+        # assert content
+        assert catalog.get_catalog(PROVIDER_REGIONS) is self.catalog
+        assert catalog.get_catalog(dict(PROVIDER_REGIONS)) is not self.catalog
+
+
+if __name__ == "__main__":
+    pytest.main()
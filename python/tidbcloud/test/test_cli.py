@@ -0,0 +1,106 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tidbcloud import cli
+from tidbcloud.mockserver import MockConfig, MockServer
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _imported(*args) -> set:
+    """
+    The modules imported by a `python -m tidbcloud` run, from `-X importtime`
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-m", "tidbcloud", *args], cwd=PYTHON_DIR,
+                            capture_output=True, text=True, env={**os.environ, "TIDBCLOUD_CACHE_FILE": ""})
+    return {line.rsplit("|", 1)[-1].strip() for line in result.stderr.splitlines() if line.startswith("import time:")}
+
+
+class TestCli:
+    def setup_method(self):
+        self.server = MockServer(MockConfig(create_seconds=0, modify_seconds=0, backup_seconds=0,
+                                            restore_seconds=0, seed=1)).start()
+        self.project_id, self.cluster_id = self.server.state.seed(backups=2)[0]
+
+    def teardown_method(self):
+        self.server.stop()
+
+    @pytest.fixture(autouse=True)
+    def api_key(self, monkeypatch):
+        monkeypatch.setenv("TIDBCLOUD_PUBLIC_KEY", self.server.config.public_key)
+        monkeypatch.setenv("TIDBCLOUD_PRIVATE_KEY", self.server.config.private_key)
+
+    def _run(self, capsys, *args) -> tuple:
+        capsys.readouterr()
+        code = cli.main(["--host", self.server.url, *args])
+        out, err = capsys.readouterr()
+        return code, json.loads(out) if code == 0 else err
+
+    def test_backup_and_delete(self, capsys):
+        print("test : backup and delete.")
+        code, backup = self._run(capsys, "backup", self.project_id, self.cluster_id, "--name", "nightly", "--wait")
+        delete_code, _ = self._run(capsys, "delete", self.project_id, self.cluster_id, "--backup-id", backup["id"])
+
+        # assert content
+        assert code == 0 and delete_code == 0
+        assert backup["name"] == "nightly" and backup["status"] == "SUCCESS"
+        assert backup["id"] not in self.server.state.backups
+
+    def test_restore_latest_backup(self, capsys):
+        print("test : restore the latest backup.")
+        code, cluster = self._run(capsys, "restore", self.project_id, self.cluster_id, "--wait")
+
+        # assert content
+        assert code == 0
+        assert cluster["status"]["cluster_status"] == "AVAILABLE"
+        assert cluster["id"] != self.cluster_id
+
+    def test_create_cluster(self, capsys):
+        print("test : create clusters.")
+        code, cluster = self._run(capsys, "create-cluster", self.project_id, "--name", "cron", "--wait")
+        developer_code, developer = self._run(capsys, "create-cluster", self.project_id, "--developer")
+
+        # assert content
+        assert code == 0 and developer_code == 0
+        assert cluster["name"] == "cron" and cluster["status"]["cluster_status"] == "AVAILABLE"
+        assert self.server.state.clusters[developer["id"]]["cluster_type"] == "DEVELOPER"
+
+    def test_scale_tiflash(self, capsys):
+        print("test : scale out the TiFlash nodes.")
+        code, scaled = self._run(capsys, "scale-tiflash", self.project_id, self.cluster_id, "--target", "2", "--wait")
+        unchanged_code, _ = self._run(capsys, "scale-tiflash", self.project_id, self.cluster_id, "--target", "1")
+
+        # assert content
+        assert code == 0 and unchanged_code == 0
+        assert scaled["config"]["components"]["tiflash"]["node_quantity"] == 2
+
+    def test_error(self, capsys):
+        print("test : a failed request exits with 1.")
+        code, err = self._run(capsys, "delete", self.project_id, "missing")
+
+        # assert content
+        assert code == 1
+        assert "tidbcloud delete failed" in err and "404" in err
+
+    def test_lazy_imports(self):
+        print("test : only the modules of the subcommand are imported.")
+        help_modules = _imported("--help")
+        backup_modules = _imported("--host", "http://127.0.0.1:9", "backup", self.project_id, self.cluster_id)
+
+        # assert content
+        assert "tidbcloud.cli" in help_modules
+        assert not {"requests", "tidbcloud.transport", "asyncio", "httpx"} & help_modules
+        assert "requests" in backup_modules and "tidbcloud.payloads" in backup_modules
+        assert not {"asyncio", "httpx", "tidbcloud.shape", "tidbcloud.pagination"} & backup_modules
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,92 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import json
+import os
+import stat
+
+import pytest
+
+from tidbcloud import cli, shape
+from tidbcloud.daemon import Daemon, DaemonClient, DaemonServer
+from tidbcloud.mockserver import MockConfig, MockServer
+
+
+class TestDaemon:
+    def setup_method(self):
+        self.server = MockServer(MockConfig(create_seconds=0, modify_seconds=0, backup_seconds=0,
+                                            restore_seconds=0, seed=1)).start()
+        self.project_id, self.cluster_id = self.server.state.seed()[0]
+
+    def teardown_method(self):
+        self.server.stop()
+
+    @pytest.fixture()
+    def daemon(self, monkeypatch):
+        monkeypatch.setenv("TIDBCLOUD_PUBLIC_KEY", self.server.config.public_key)
+        monkeypatch.setenv("TIDBCLOUD_PRIVATE_KEY", self.server.config.private_key)
+        daemon = Daemon(self.server.url, state_ttl=60)
+        daemon.warm_up()
+        return daemon
+
+    def test_unix_socket(self, daemon, tmp_path):
+        print("test : run operations over a Unix socket.")
+        socket_path = str(tmp_path / "tidbcloud.sock")
+        warm = daemon.health()
+        with DaemonServer(daemon, socket_path) as daemon_server:
+            client = DaemonClient(daemon_server.address)
+            mode = stat.S_IMODE(os.stat(socket_path).st_mode)
+            backup = client.run(["backup", self.project_id, self.cluster_id, "--wait"])
+            first = client.status(self.project_id, self.cluster_id)
+            requests_before = self.server.counters["requests"]
+            second = client.run(["status", self.project_id, self.cluster_id])
+            requests_after = self.server.counters["requests"]
+            client.run(["scale-tiflash", self.project_id, self.cluster_id])
+            scaled = client.status(self.project_id, self.cluster_id)
+            health = client.health()
+
+        # assert content
+        assert mode == 0o600
+        assert not os.path.exists(socket_path)
+        assert backup["status"] == "SUCCESS"
+        assert second == first and requests_after == requests_before
+        # the scale-out forgot the cluster detail kept in memory
+        assert shape.tiflash_quantity(scaled) == shape.tiflash_quantity(first) + 1
+        assert health["counters"]["state_hits"] == 1
+        assert health["counters"]["operations_backup"] == 1
+        # the connection and the digest challenge of the warm up are reused by every operation
+        assert health["pool"]["misses"] == warm["pool"]["misses"]
+        assert health["challenges"]["challenges"] == warm["challenges"]["challenges"]
+
+    def test_errors(self, daemon):
+        print("test : errors of the operations and of the command line.")
+
+        # assert content
+        with DaemonServer(daemon) as daemon_server:
+            client = DaemonClient(daemon_server.address)
+            assert daemon_server.address.startswith("http://127.0.0.1:")
+            with pytest.raises(Exception, match="404"):
+                client.run(["delete", self.project_id, "999"])
+            with pytest.raises(Exception, match="invalid choice: 'rewind'"):
+                client.run(["rewind", self.project_id])
+            with pytest.raises(Exception, match="not found"):
+                client.request("GET", "/clusters")
+        with pytest.raises(Exception, match="daemon not reachable"):
+            DaemonClient(daemon_server.address).health()
+
+    def test_cli(self, daemon, tmp_path, capsys):
+        print("test : send a subcommand of the command line to the daemon.")
+        socket_path = str(tmp_path / "tidbcloud.sock")
+        with DaemonServer(daemon, socket_path):
+            capsys.readouterr()
+            code = cli.main(["--daemon", socket_path, "status", self.project_id, self.cluster_id])
+            out, _ = capsys.readouterr()
+
+        # assert content
+        assert code == 0
+        assert json.loads(out)["id"] == self.cluster_id
+
+
+if __name__ == "__main__":
+    pytest.main()
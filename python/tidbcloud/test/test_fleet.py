@@ -0,0 +1,75 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import asyncio
+import re
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from tidbcloud import fleet  # noqa: E402
+from tidbcloud.aio import AsyncTiDBCloud  # noqa: E402
+from tidbcloud.breaker import CircuitBreaker  # noqa: E402
+from tidbcloud.ratelimit import RateLimiter  # noqa: E402
+from tidbcloud.waiter import AsyncWaiter, Backoff  # noqa: E402
+
+
+class TestBackupFleet:
+    def setup_method(self):
+        self.polls = {}
+        self.in_progress = {}
+        self.max_in_progress = {}
+
+    def _handler(self, request):
+        path = request.url.path
+        match = re.fullmatch(r"/api/v1beta/projects/(\w+)/clusters", path)
+        if match:
+            project_id = match.group(1)
+            items = [{"id": f"{project_id}-{i}", "cluster_type": "DEDICATED"} for i in range(3)]
+            items.append({"id": f"{project_id}-dev", "cluster_type": "DEVELOPER"})
+            return httpx.Response(200, json={"items": items, "total": len(items)})
+        match = re.fullmatch(r"/api/v1beta/projects/(\w+)/clusters/([\w-]+)/backups(/[\w-]+)?", path)
+        project_id, cluster_id, backup_id = match.groups()
+        if backup_id is None:
+            self.in_progress[project_id] = self.in_progress.get(project_id, 0) + 1
+            self.max_in_progress[project_id] = max(self.max_in_progress.get(project_id, 0),
+                                                   self.in_progress[project_id])
+            return httpx.Response(200, json={"id": f"backup-{cluster_id}"})
+        self.polls[cluster_id] = self.polls.get(cluster_id, 0) + 1
+        if cluster_id.endswith("2") and project_id == "p1":
+            return httpx.Response(500, text="internal error")
+        if self.polls[cluster_id] < 3:
+            return httpx.Response(200, json={"id": backup_id[1:], "status": "RUNNING"})
+        self.in_progress[project_id] -= 1
+        return httpx.Response(200, json={"id": backup_id[1:], "status": "SUCCESS"})
+
+    def test_backup_fleet(self):
+        print("test : backup a fleet of clusters.")
+
+        async def run():
+            async with AsyncTiDBCloud("public", "private", host="http://tidbcloud.test",
+                                      http_transport=httpx.MockTransport(self._handler),
+                                      limiter=RateLimiter(backoff=Backoff(initial=0.001, maximum=0.001)),
+                                      breaker=CircuitBreaker(min_requests=0)) as client:
+                # The failed polls are retried until the timeout
+                return await fleet.backup_fleet(client, project_ids=["p1", "p2"], per_project_concurrency=2,
+                                                waiter=AsyncWaiter(Backoff(initial=0.001, maximum=0.01)),
+                                                timeout=0.5)
+
+        report = asyncio.run(run())
+
+        # assert content
+        assert len(report.results) == 6
+        assert len(report.succeeded) == 5
+        failed = [result for result in report.results if result.status == "ERROR"]
+        assert [result.cluster_id for result in failed] == ["p1-2"]
+        assert "timed out after 0.5s" in failed[0].error and "code : 500" in failed[0].error
+        assert all(count <= 2 for count in self.max_in_progress.values())
+        assert report.throughput > 0
+        assert "succeeded : 5" in report.summary()
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,136 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from tidbcloud.hedge import HedgePolicy
+from tidbcloud.metrics import Metrics, RequestEvent
+
+URL = "http://tidbcloud.test/api/v1beta/projects/2/clusters/1"
+
+
+def _recorder(samples: int = 20, seconds: float = 0.01) -> Metrics:
+    recorder = Metrics()
+    for _ in range(samples):
+        recorder.record(RequestEvent("GET", URL, 200, seconds))
+    return recorder
+
+
+class TestHedge:
+    def test_delay(self):
+        print("test : the hedge delay follows the latency percentile of the endpoint.")
+        policy = HedgePolicy(percentile=95, min_delay=0.001, max_ratio=0.1)
+        recorder = _recorder()
+        recorder.record(RequestEvent("GET", URL, 200, 1.0))
+
+        # assert content
+        assert policy.delay("GET", URL, _recorder(samples=19)) is None
+        assert policy.delay("PATCH", URL, recorder) is None
+        assert policy.delay("GET", URL, recorder) == 0.01
+        assert HedgePolicy(percentile=99, min_delay=0.001).delay("GET", URL, recorder) == 1.0
+        assert HedgePolicy(min_delay=0.5).delay("GET", URL, recorder) == 0.5
+        # the hedges are capped to a ratio of the requests of the endpoint
+        for won in (True, False, False):
+            recorder.record_hedge("GET", URL, won=won)
+        assert policy.delay("GET", URL, recorder) is None
+
+    def test_environment(self, monkeypatch):
+        print("test : hedging is opt-in.")
+        monkeypatch.delenv("TIDBCLOUD_HEDGE_PERCENTILE", raising=False)
+        disabled = HedgePolicy.from_environment()
+        monkeypatch.setenv("TIDBCLOUD_HEDGE_PERCENTILE", "90")
+
+        # assert content
+        assert disabled is None
+        assert HedgePolicy.from_environment().percentile == 90
+
+    def test_call(self):
+        print("test : a slow call is hedged and the first response is kept.")
+        recorder = _recorder()
+        calls = []
+        discarded = []
+        released = threading.Event()
+
+        def fetch():
+            calls.append(len(calls))
+            if len(calls) == 1:
+                released.wait(5)
+                return "slow"
+            return "fast"
+
+        policy = HedgePolicy(min_delay=0.001)
+        result = policy.call("GET", URL, fetch, recorder, discard=discarded.append)
+        released.set()
+        while not discarded:
+            time.sleep(0.001)
+        fast = policy.call("GET", URL, lambda: "first", recorder)
+        summary = recorder.summary()["endpoints"]["GET /api/v1beta/projects/{project_id}/clusters/{cluster_id}"]
+
+        # assert content
+        assert result == "fast"
+        assert discarded == ["slow"]
+        assert fast == "first"
+        assert (summary["hedges"], summary["hedge_wins"]) == (1, 1)
+        assert ('tidbcloud_hedged_requests_total{method="GET",endpoint="/api/v1beta/projects/{project_id}/clusters/'
+                '{cluster_id}"} 1') in recorder.to_prometheus()
+
+    def test_call_errors(self):
+        print("test : the error of a hedged call is only raised when both calls failed.")
+        recorder = _recorder()
+        calls = []
+
+        def fetch():
+            calls.append(len(calls))
+            if len(calls) == 1:
+                time.sleep(0.05)
+                return "slow"
+            raise Exception("boom")
+
+        # assert content
+        assert HedgePolicy(min_delay=0.001, max_ratio=1).call("GET", URL, fetch, recorder) == "slow"
+        with pytest.raises(Exception, match="boom"):
+            HedgePolicy(min_delay=0.001, max_ratio=1).call("GET", URL, fetch, recorder)
+        assert recorder.summary()["endpoints"]["GET /api/v1beta/projects/{project_id}/clusters/{cluster_id}"][
+            "hedge_wins"] == 0
+
+    def test_acall(self):
+        print("test : the losing coroutine of a hedged call is cancelled.")
+        recorder = _recorder()
+        cancelled = []
+
+        async def run():
+            calls = []
+
+            async def fetch():
+                calls.append(len(calls))
+                if len(calls) == 1:
+                    try:
+                        await asyncio.sleep(5)
+                    except asyncio.CancelledError:
+                        cancelled.append(True)
+                        raise
+                    return "slow"
+                return "fast"
+
+            start = time.monotonic()
+            result = await HedgePolicy(min_delay=0.001).acall("GET", URL, fetch, recorder)
+            await asyncio.sleep(0)
+            return result, time.monotonic() - start
+
+        result, seconds = asyncio.run(run())
+
+        # assert content
+        assert result == "fast"
+        assert seconds < 1
+        assert cancelled == [True]
+        assert recorder.summary()["endpoints"]["GET /api/v1beta/projects/{project_id}/clusters/{cluster_id}"][
+            "hedge_wins"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,100 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import asyncio
+
+import pytest
+
+from tidbcloud.inventory import Inventory
+
+
+def _cluster(cluster_id: str, project_id: str, status: str = "AVAILABLE", region: str = "us-west-2") -> dict:
+    return {
+        "id": cluster_id,
+        "project_id": project_id,
+        "name": f"cluster-{cluster_id}",
+        "cluster_type": "DEDICATED",
+        "cloud_provider": "AWS",
+        "region": region,
+        "status": {"cluster_status": status},
+        "config": {"components": {"tidb": {"node_size": "8C16G", "node_quantity": 1},
+                                  "tikv": {"node_size": "8C32G", "node_quantity": 3, "storage_size_gib": 500},
+                                  "tiflash": None}},
+    }
+
+
+class _Client:
+    def __init__(self, clusters: dict):
+        self.clusters = clusters
+
+    async def get_all_projects(self, page: int = 1, page_size: int = 10) -> dict:
+        return {"items": [{"id": project_id, "name": f"project-{project_id}", "org_id": "1"}
+                          for project_id in sorted(self.clusters)], "total": len(self.clusters)}
+
+    async def get_clusters_of_project(self, project_id: str, page: int = 1, page_size: int = 10) -> dict:
+        clusters = self.clusters[project_id]
+        return {"items": clusters[(page - 1) * page_size:page * page_size], "total": len(clusters)}
+
+
+class TestInventory:
+    def setup_method(self):
+        self.inventory = Inventory(":memory:")
+
+    def teardown_method(self):
+        self.inventory.close()
+
+    def test_refresh(self):
+        print("test : incremental refresh.")
+        client = _Client({"p1": [_cluster(str(i), "p1") for i in range(150)],
+                          "p2": [_cluster("200", "p2", region="eu-central-1")]})
+        stats = asyncio.run(self.inventory.refresh(client))
+
+        # assert content
+        assert (stats.projects, stats.inserted, stats.updated, stats.unchanged) == (2, 151, 0, 0)
+        assert len(self.inventory.clusters(project_id="p1")) == 150
+        assert self.inventory.count_by("region") == {"us-west-2": 150, "eu-central-1": 1}
+
+        client.clusters["p1"][0] = _cluster("0", "p1", status="MODIFYING")
+        del client.clusters["p1"][-1]
+        stats = asyncio.run(self.inventory.refresh(client))
+
+        # assert content
+        assert (stats.inserted, stats.updated, stats.unchanged, stats.deleted) == (0, 1, 149, 1)
+        assert [cluster["id"] for cluster in self.inventory.clusters(status="MODIFYING")] == ["0"]
+        assert self.inventory.count_by("status") == {"AVAILABLE": 149, "MODIFYING": 1}
+        models = self.inventory.cluster_models(region="eu-central-1")
+        assert [(model.id, model.cluster_status, model.tikv.node_quantity, model.tiflash) for model in models] == \
+            [("200", "AVAILABLE", 3, None)]
+
+    def test_removed_project(self):
+        print("test : delete the clusters of a removed project.")
+        listed = {"id": "300"}
+        client = _Client({"p1": [_cluster("1", "p1")], "p2": [_cluster("2", "p2")], "p3": [listed]})
+        asyncio.run(self.inventory.refresh(client))
+
+        # assert content
+        assert listed == {"id": "300"}
+        assert [cluster["project_id"] for cluster in self.inventory.clusters(project_id="p3")] == ["p3"]
+
+        del client.clusters["p2"]
+        stats = asyncio.run(self.inventory.refresh(client, project_ids=["p1"]))
+
+        # assert content, a partial crawl keeps the other projects
+        assert (stats.deleted, self.inventory.count_by("project_id")) == (0, {"p1": 1, "p2": 1, "p3": 1})
+
+        stats = asyncio.run(self.inventory.refresh(client))
+
+        # assert content
+        assert (stats.deleted, self.inventory.count_by("project_id")) == (1, {"p1": 1, "p3": 1})
+        assert [row["id"] for row in self.inventory.conn.execute("SELECT id FROM projects ORDER BY id")] == \
+            ["p1", "p3"]
+
+    def test_unknown_filter(self):
+        print("test : unknown filter.")
+        with pytest.raises(Exception, match="unknown inventory filters"):
+            self.inventory.clusters(detail="x")
+
+
+if __name__ == "__main__":
+    pytest.main()
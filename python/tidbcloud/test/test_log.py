@@ -0,0 +1,130 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import datetime
+import json
+import logging
+
+import pytest
+import requests
+
+from tidbcloud import log
+
+
+class _Response:
+    def __init__(self, status_code: int, text: str):
+        self.status_code = status_code
+        self.text = text
+        self.decoded = 0
+
+    def __getattribute__(self, name):
+        if name == "text":
+            object.__setattr__(self, "decoded", object.__getattribute__(self, "decoded") + 1)
+        return object.__getattribute__(self, name)
+
+
+class TestLog:
+    @pytest.fixture(autouse=True)
+    def config(self):
+        yield
+        log.configure()
+
+    def test_redact_root_password(self, caplog):
+        print("test : redact root password.")
+        caplog.set_level(logging.INFO, logger="tidbcloud")
+        payload = json.dumps({"name": "c1", "config": {"root_password": "my \"secret\" pwd", "port": 4000}})
+        log.log_request("POST", "https://api.tidbcloud.com/api/v1beta/projects/1/clusters", payload)
+
+        # assert content
+        assert "secret" not in caplog.text
+        assert '"root_password": "******"' in caplog.text
+        assert '"port": 4000' in caplog.text
+
+    def test_truncate_body(self, caplog):
+        print("test : truncate success body.")
+        caplog.set_level(logging.INFO, logger="tidbcloud")
+        log.configure(max_body=10)
+        log.log_response(_Response(200, "x" * 100))
+
+        # assert content
+        assert "x" * 10 + "... (100 chars)" in caplog.text
+        assert "x" * 11 not in caplog.text
+
+    def test_truncate_inside_password(self, caplog):
+        print("test : truncate a body inside the root password.")
+        caplog.set_level(logging.INFO, logger="tidbcloud")
+        log.configure(max_body=35)
+        payload = json.dumps({"config": {"root_password": "SuperSecretPassword", "port": 4000}, "name": "c" * 300})
+        log.log_request("POST", "https://api.tidbcloud.com/api/v1beta/projects/1/clusters", payload)
+
+        # assert content
+        assert "Super" not in caplog.text
+        assert '{"config": {"root_password": "*****... (' in caplog.text
+
+    def test_full_error_body(self, caplog):
+        print("test : keep the full error body.")
+        caplog.set_level(logging.INFO, logger="tidbcloud")
+        log.configure(max_body=10, sample_rate=0)
+        log.log_error(_Response(400, "y" * 100))
+
+        # assert content
+        assert "y" * 100 in caplog.text
+        assert "code : 400" in caplog.text
+
+    def test_sampling(self, caplog):
+        print("test : sample success logs.")
+        caplog.set_level(logging.INFO, logger="tidbcloud")
+        log.configure(sample_rate=0)
+        resp = _Response(200, "{}")
+        log.log_request("GET", "https://api.tidbcloud.com/api/v1beta/projects")
+        log.log_response(resp)
+
+        # assert content
+        assert caplog.records == []
+        assert resp.decoded == 0
+
+    def test_sample_exchanges(self, caplog):
+        print("test : sample a request and its response together.")
+        caplog.set_level(logging.INFO, logger="tidbcloud")
+        log.configure(sample_rate=0.5)
+        for _ in range(200):
+            log.log_request("GET", "https://api.tidbcloud.com/api/v1beta/projects")
+            log.log_response(_Response(200, "{}"))
+
+        # assert content
+        messages = [record.getMessage().split(" ")[0] for record in caplog.records]
+        assert 0 < len(messages) < 400
+        assert messages == ["Method:", "response"] * (len(messages) // 2)
+
+    def test_structured_fields(self, caplog):
+        print("test : attach the request fields to the records.")
+        caplog.set_level(logging.INFO, logger="tidbcloud")
+        resp = _Response(503, "unavailable")
+        resp.request = requests.Request("GET", "https://api.tidbcloud.com/api/v1beta/projects").prepare()
+        resp.url = resp.request.url
+        resp.elapsed = datetime.timedelta(milliseconds=250)
+        log.log_request("GET", "https://api.tidbcloud.com/api/v1beta/projects")
+        log.log_error(resp)
+
+        # assert content
+        request, error = caplog.records
+        assert (request.method, request.url) == ("GET", "https://api.tidbcloud.com/api/v1beta/projects")
+        assert (error.method, error.url, error.status_code, error.elapsed) == \
+               ("GET", "https://api.tidbcloud.com/api/v1beta/projects", 503, 0.25)
+
+    def test_lazy_body(self, caplog):
+        print("test : decode the body only when logged.")
+        caplog.set_level(logging.WARNING, logger="tidbcloud")
+        resp = _Response(200, "{}")
+        log.log_response(resp)
+
+        # assert content
+        assert resp.decoded == 0
+        caplog.set_level(logging.INFO, logger="tidbcloud")
+        log.log_response(resp)
+        assert resp.decoded > 0
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,142 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tidbcloud import metrics, transport
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"id": "1"}'
+        self.send_response(200 if "/clusters/" in self.path else 404)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestMetrics:
+    @pytest.fixture()
+    def server_url(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+        server.shutdown()
+        server.server_close()
+
+    def test_endpoint(self):
+        print("test : normalize endpoint.")
+
+        # assert content
+        assert metrics.endpoint("https://api.tidbcloud.com/api/v1beta/projects/1/clusters/2/backups/3") == \
+            "/api/v1beta/projects/{project_id}/clusters/{cluster_id}/backups/{backup_id}"
+        assert metrics.endpoint("https://api.tidbcloud.com/api/v1beta/projects/1/clusters?page=2") == \
+            "/api/v1beta/projects/{project_id}/clusters"
+        assert metrics.endpoint("https://api.tidbcloud.com/api/v1beta/clusters/provider/regions") == \
+            "/api/v1beta/clusters/provider/regions"
+
+    def test_percentiles(self):
+        print("test : latency percentiles.")
+        recorder = metrics.Metrics()
+        for i in range(1, 101):
+            recorder.record(metrics.RequestEvent("GET", "http://t/api/v1beta/projects/1", 200, i / 1000))
+        summary = recorder.summary()["endpoints"]["GET /api/v1beta/projects/{project_id}"]
+
+        # assert content
+        assert summary["count"] == 100
+        assert summary["p50"] == 0.05
+        assert summary["p95"] == 0.095
+        assert summary["p99"] == 0.099
+
+    def test_transport(self, server_url):
+        print("test : record transport requests.")
+        recorder = metrics.Metrics()
+        events = []
+        recorder.add_hook(events.append)
+        shared = transport.Transport(metrics=recorder)
+        shared.get(url=f"{server_url}/api/v1beta/projects/1/clusters/2")
+        shared.get(url=f"{server_url}/api/v1beta/projects/1/clusters/3")
+        shared.get(url=f"{server_url}/api/v1beta/projects")
+        shared.close()
+        summary = recorder.summary()
+
+        # assert content
+        assert len(events) == 3
+        assert "connect" in events[0].phases and "ttfb" in events[0].phases
+        assert "connect" not in events[1].phases
+        clusters = summary["endpoints"]["GET /api/v1beta/projects/{project_id}/clusters/{cluster_id}"]
+        assert clusters["count"] == 2
+        assert clusters["bytes_in"] == 22
+        assert clusters["errors"] == {}
+        assert summary["endpoints"]["GET /api/v1beta/projects"]["errors"] == {"404": 1}
+        assert summary["phases"]["connect"]["count"] == 1
+
+    def test_async_client(self):
+        httpx = pytest.importorskip("httpx")
+        from tidbcloud.aio import AsyncTiDBCloud
+        print("test : record async client requests.")
+        recorder = metrics.Metrics()
+
+        def handler(request):
+            return httpx.Response(200, json={"id": "3"})
+
+        async def run():
+            async with AsyncTiDBCloud("public", "private", host="http://tidbcloud.test", metrics=recorder,
+                                      http_transport=httpx.MockTransport(handler)) as client:
+                await client.create_manual_backup("1", "2")
+
+        asyncio.run(run())
+        endpoints = recorder.summary()["endpoints"]
+        backups = endpoints["POST /api/v1beta/projects/{project_id}/clusters/{cluster_id}/backups"]
+
+        # assert content
+        assert backups["count"] == 1
+        assert backups["bytes_out"] > 0
+        assert backups["bytes_in"] == len(json.dumps({"id": "3"}, separators=(",", ":")))
+
+    def test_prometheus(self, tmp_path):
+        print("test : export in the Prometheus text format.")
+        recorder = metrics.Metrics()
+        recorder.record(metrics.RequestEvent("PATCH", "http://t/api/v1beta/projects/1/clusters/2", 200, 0.2,
+                                             bytes_out=10, bytes_in=2, phases={"connect": 0.01}))
+        recorder.record(metrics.RequestEvent("PATCH", "http://t/api/v1beta/projects/1/clusters/2", 429, 0.02))
+        text = recorder.to_prometheus()
+        labels = 'method="PATCH",endpoint="/api/v1beta/projects/{project_id}/clusters/{cluster_id}"'
+
+        # assert content
+        assert f'tidbcloud_request_duration_seconds_bucket{{{labels},le="0.025"}} 1' in text
+        assert f'tidbcloud_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+        assert f"tidbcloud_request_duration_seconds_count{{{labels}}} 2" in text
+        assert f'tidbcloud_request_errors_total{{{labels},status="429"}} 1' in text
+        assert f"tidbcloud_request_bytes_total{{{labels}}} 10" in text
+        assert 'tidbcloud_connection_phase_seconds_count{phase="connect"} 1' in text
+        recorder.write(str(tmp_path / "tidbcloud.prom"))
+        recorder.write(str(tmp_path / "tidbcloud.json"))
+        assert (tmp_path / "tidbcloud.prom").read_text() == text
+        assert json.loads((tmp_path / "tidbcloud.json").read_text())["phases"]["connect"]["count"] == 1
+
+    def test_failing_hook(self):
+        print("test : failing hook.")
+        recorder = metrics.Metrics()
+        recorder.add_hook(lambda event: 1 / 0)
+        recorder.record(metrics.RequestEvent("GET", "http://t/api/v1beta/projects", 200, 0.1))
+
+        # assert content
+        assert recorder.summary()["endpoints"]["GET /api/v1beta/projects"]["count"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,177 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import asyncio
+import time
+
+import pytest
+import requests
+
+from tidbcloud import auth, ratelimit, transport
+from tidbcloud.mockserver import MockConfig, MockServer
+from tidbcloud.waiter import Backoff
+
+FAST = Backoff(initial=0.001, maximum=0.001)
+
+
+def _wait(fetch, status: str, timeout: float = 5) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        resource = fetch()
+        current = resource["status"]
+        if (current.get("cluster_status") if isinstance(current, dict) else current) == status:
+            return resource
+        assert time.monotonic() < deadline, resource
+        time.sleep(0.01)
+
+
+class TestMockServer:
+    def setup_method(self):
+        self.config = MockConfig(create_seconds=0.05, modify_seconds=0.05, backup_seconds=0.05,
+                                 restore_seconds=0.05, seed=1)
+        self.server = MockServer(self.config).start()
+        self.project_id, self.cluster_id = self.server.state.seed()[0]
+        self.transport = transport.Transport(limiter=ratelimit.RateLimiter(max_retries=0))
+        self.digest_auth = auth.PreemptiveDigestAuth("public", "private", cache=auth.ChallengeCache())
+
+    def teardown_method(self):
+        self.transport.close()
+        self.server.stop()
+
+    def _call(self, method: str, path: str, payload: dict = None) -> dict:
+        resp = self.transport.request(method, f"{self.server.url}/api/v1beta{path}", json=payload,
+                                      auth=self.digest_auth)
+        assert resp.status_code == 200, resp.text
+        return resp.json()
+
+    def test_digest_auth(self):
+        print("test : digest auth.")
+        wrong_auth = auth.PreemptiveDigestAuth("public", "wrong", cache=auth.ChallengeCache())
+        resp = self.transport.get(f"{self.server.url}/api/v1beta/projects", auth=wrong_auth)
+        projects = self._call("GET", "/projects")
+        self._call("GET", "/projects")
+
+        # assert content
+        assert resp.status_code == 401
+        assert projects["total"] == 1 and projects["items"][0]["id"] == self.project_id
+        # one challenge for the wrong key, and one for the first request with the right one
+        assert self.server.counters["challenges"] == 3
+
+    def test_cluster_lifecycle(self):
+        print("test : cluster lifecycle.")
+        regions = self._call("GET", "/clusters/provider/regions")
+        created = self._call("POST", f"/projects/{self.project_id}/clusters", {
+            "name": "mock", "cluster_type": "DEDICATED", "cloud_provider": "AWS", "region": "us-west-2",
+            "config": {"root_password": "password", "port": 4000, "components": {
+                "tidb": {"node_size": "8C16G", "node_quantity": "1"},
+                "tikv": {"node_size": "8C32G", "storage_size_gib": "500", "node_quantity": "3"}}}})
+        path = f"/projects/{self.project_id}/clusters/{created['id']}"
+        creating = self._call("GET", path)["status"]["cluster_status"]
+        _wait(lambda: self._call("GET", path), "AVAILABLE")
+        self._call("PATCH", path, {"config": {"components": {"tiflash": {
+            "node_size": "8C64G", "storage_size_gib": "500", "node_quantity": "1"}}}})
+        modifying = self._call("GET", path)["status"]["cluster_status"]
+        cluster = _wait(lambda: self._call("GET", path), "AVAILABLE")
+        clusters = self._call("GET", f"/projects/{self.project_id}/clusters?page=1&page_size=10")
+        self._call("DELETE", path)
+        resp = self.transport.get(f"{self.server.url}/api/v1beta{path}", auth=self.digest_auth)
+
+        # assert content
+        assert {item["cluster_type"] for item in regions["items"]} == {"DEDICATED", "DEVELOPER"}
+        assert (creating, modifying) == ("CREATING", "MODIFYING")
+        assert cluster["config"]["components"]["tiflash"] == {"node_size": "8C64G", "storage_size_gib": 500,
+                                                              "node_quantity": 1}
+        assert clusters["total"] == 2
+        assert resp.status_code == 404 and "not found" in resp.json()["message"]
+
+    def test_backup_and_restore(self):
+        print("test : backup and restore.")
+        backups_path = f"/projects/{self.project_id}/clusters/{self.cluster_id}/backups"
+        backup_id = self._call("POST", backups_path, {"name": "tidbcloud-backup-2022-11-30"})["id"]
+        pending = self._call("GET", f"{backups_path}/{backup_id}")["status"]
+        _wait(lambda: self._call("GET", f"{backups_path}/{backup_id}"), "SUCCESS")
+        cluster = self._call("GET", f"/projects/{self.project_id}/clusters/{self.cluster_id}")
+        restore = self._call("POST", f"/projects/{self.project_id}/restores", {
+            "backup_id": backup_id, "name": "tidbcloud-restore",
+            "config": {"root_password": "password", "port": 4000, "components": cluster["config"]["components"]}})
+        restoring = self._call("GET", f"/projects/{self.project_id}/clusters/{restore['cluster_id']}")
+        _wait(lambda: self._call("GET", f"/projects/{self.project_id}/clusters/{restore['cluster_id']}"), "AVAILABLE")
+        restore_detail = self._call("GET", f"/projects/{self.project_id}/restores/{restore['id']}")
+        backups = self._call("GET", f"{backups_path}?page=1&page_size=1")
+
+        # assert content
+        assert pending == "PENDING"
+        assert restoring["status"]["cluster_status"] == "RESTORING"
+        assert restore_detail["status"] == "SUCCESS" and restore_detail["backup_id"] == backup_id
+        assert backups["total"] == 2 and len(backups["items"]) == 1
+
+    def test_faults(self):
+        print("test : injected latency, errors and throttling.")
+        self.config.latency = 0.05
+        start = time.monotonic()
+        self._call("GET", "/projects")
+        latency = time.monotonic() - start
+        self.config.latency = 0
+        self.config.throttle_rate = 1.0
+        throttled = self.transport.get(f"{self.server.url}/api/v1beta/projects", auth=self.digest_auth)
+        self.config.throttle_rate = 0
+        self.config.error_rate = 1.0
+        failed = self.transport.get(f"{self.server.url}/api/v1beta/projects", auth=self.digest_auth)
+
+        # assert content
+        assert latency >= 0.05
+        assert throttled.status_code == 429 and throttled.headers["Retry-After"] == "1"
+        assert failed.status_code == 500
+        assert (self.server.counters["throttled"], self.server.counters["errors"]) == (1, 1)
+
+    def test_retries_against_throttling(self):
+        print("test : the shared clients retry the throttled requests.")
+        self.config.throttle_rate = 0.5
+        self.config.retry_after = 0
+        limited = transport.Transport(limiter=ratelimit.RateLimiter(max_retries=20, backoff=FAST))
+        try:
+            for _ in range(20):
+                resp = limited.get(f"{self.server.url}/api/v1beta/projects", auth=self.digest_auth)
+                assert resp.status_code == 200
+        finally:
+            limited.close()
+
+        # assert content
+        assert self.server.counters["throttled"] > 0
+
+    def test_async_client(self):
+        pytest.importorskip("httpx")
+        from tidbcloud import restore
+        from tidbcloud.aio import AsyncTiDBCloud
+        from tidbcloud.waiter import AsyncWaiter
+        print("test : restore drill with the async client.")
+        clusters = self.server.state.seed(projects=1, clusters=5)
+
+        async def run():
+            async with AsyncTiDBCloud("public", "private", host=self.server.url,
+                                      limiter=ratelimit.RateLimiter(max_retries=0)) as client:
+                return await restore.restore_drill(client, clusters, "secret", waiter=AsyncWaiter(FAST), timeout=5)
+
+        report = asyncio.run(run())
+
+        # assert content
+        assert len(report.succeeded) == 5
+
+    def test_unknown_routes(self):
+        print("test : unknown routes.")
+        url = f"{self.server.url}/api/v1beta/projects/{self.project_id}/clusters/{self.cluster_id}"
+        not_allowed = self.transport.request("POST", url, json={}, auth=self.digest_auth)
+        not_found = self.transport.get(f"{self.server.url}/api/v1beta/unknown", auth=self.digest_auth)
+        invalid = self.transport.request("PATCH", url, data="{", auth=self.digest_auth)
+        anonymous = requests.get(url)
+
+        # assert content
+        assert not_allowed.status_code == 405
+        assert not_found.status_code == 404
+        assert invalid.status_code == 400
+        assert anonymous.status_code == 401 and 'qop="auth"' in anonymous.headers["WWW-Authenticate"]
+
+
+if __name__ == "__main__":
+    pytest.main()
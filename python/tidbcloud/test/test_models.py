@@ -0,0 +1,107 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import json
+import tracemalloc
+
+import pytest
+
+from tidbcloud import payloads
+from tidbcloud.models import Backup, ClusterDetail, ComponentConfig, RestoreTask
+
+CLUSTER = {
+    "id": "1379661944646413143",
+    "project_id": "1372813089189561287",
+    "name": "Cluster0",
+    "port": 4000,
+    "cluster_type": "DEDICATED",
+    "cloud_provider": "AWS",
+    "region": "us-west-2",
+    "create_timestamp": "1656991448",
+    "config": {
+        "port": 4000,
+        "components": {
+            "tidb": {"node_size": "8C16G", "node_quantity": 2},
+            "tikv": {"node_size": "8C32G", "storage_size_gib": "500", "node_quantity": "3"},
+            "tiflash": None,
+        },
+    },
+    "status": {
+        "tidb_version": "v6.1.0",
+        "cluster_status": "AVAILABLE",
+        "connection_strings": {"default_user": "root", "standard": {"host": "tidb.test", "port": 4000}},
+    },
+}
+
+
+class TestModels:
+    def test_cluster(self):
+        print("test : decode and encode a cluster detail.")
+        cluster = ClusterDetail.from_json(CLUSTER)
+        encoded = cluster.to_json()
+
+        # assert content
+        assert cluster.tikv == ComponentConfig("8C32G", 3, 500)
+        assert cluster.tiflash is None
+        assert cluster.cluster_status == "AVAILABLE"
+        assert encoded["config"]["components"]["tikv"] == {"node_size": "8C32G", "node_quantity": 3,
+                                                            "storage_size_gib": 500}
+        assert "connection_strings" not in encoded["status"]
+        assert ClusterDetail.from_json(encoded) == cluster
+        assert not hasattr(cluster, "__dict__")
+        assert repr(cluster.tidb) == "ComponentConfig(node_size='8C16G', node_quantity=2, storage_size_gib=None)"
+
+    def test_backup(self):
+        print("test : decode and encode a backup.")
+        data = {"id": "1", "name": "b", "description": "", "type": "MANUAL", "create_timestamp": "1656991448",
+                "size": "1073741824", "status": "SUCCESS"}
+        backup = Backup.from_json(data)
+
+        # assert content
+        assert backup.size == 1024 ** 3
+        assert backup.to_json() == data
+
+    def test_restore_payload(self):
+        print("test : the restore payload keeps the shape of the source cluster.")
+        with_tiflash = json.loads(json.dumps(CLUSTER))
+        with_tiflash["config"]["components"]["tiflash"] = {"node_size": "8C64G", "storage_size_gib": 500,
+                                                           "node_quantity": 1}
+        payload = payloads.restore_payload("7", CLUSTER, "secret")
+
+        # assert content
+        assert payload["backup_id"] == "7"
+        assert payload["config"]["root_password"] == "secret"
+        assert payload["config"]["components"] == {
+            "tidb": {"node_size": "8C16G", "node_quantity": 2},
+            "tikv": {"node_size": "8C32G", "node_quantity": 3, "storage_size_gib": 500},
+        }
+        assert payloads.restore_payload("7", with_tiflash, "secret")["config"]["components"]["tiflash"] == \
+            {"node_size": "8C64G", "node_quantity": 1, "storage_size_gib": 500}
+        # a decoded cluster gives the same payload
+        assert payloads.restore_payload("7", ClusterDetail.from_json(CLUSTER), "secret") == payload
+        assert RestoreTask.from_json(payload).to_json() == payload
+        with pytest.raises(KeyError):
+            payloads.restore_payload("7", {"config": {"components": {"tidb": None}}}, "secret")
+
+    def test_memory(self):
+        print("test : clusters take a fraction of the memory of their dicts.")
+        texts = [json.dumps(dict(CLUSTER, id=str(i), name=f"cluster-{i}")) for i in range(5000)]
+        tracemalloc.start()
+        try:
+            details = [json.loads(text) for text in texts]
+            as_dicts = tracemalloc.get_traced_memory()[0]
+            del details
+            start = tracemalloc.get_traced_memory()[0]
+            clusters = [ClusterDetail.from_json(json.loads(text)) for text in texts]
+            as_models = tracemalloc.get_traced_memory()[0] - start
+        finally:
+            tracemalloc.stop()
+
+        # assert content
+        assert len(clusters) == 5000
+        assert as_models < as_dicts / 3
+
+
+if __name__ == "__main__":
+    pytest.main()
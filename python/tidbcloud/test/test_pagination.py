@@ -0,0 +1,68 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import asyncio
+import itertools
+
+import pytest
+
+from tidbcloud import pagination
+
+TOTAL = 25
+
+
+class _Projects:
+    def __init__(self):
+        self.pages = []
+
+    def get_all_projects(self, page: int = 1, page_size: int = 10) -> dict:
+        self.pages.append(page)
+        start = (page - 1) * page_size
+        items = [{"id": str(i)} for i in range(start, min(start + page_size, TOTAL))]
+        return {"items": items, "total": TOTAL}
+
+    async def get_clusters_of_project(self, project_id: str, page: int = 1, page_size: int = 10) -> dict:
+        await asyncio.sleep(0)
+        resp = self.get_all_projects(page, page_size)
+        return {"items": [{"id": item["id"], "project_id": project_id} for item in resp["items"]]}
+
+
+class TestPagination:
+    @pytest.mark.parametrize("prefetch", [False, True])
+    def test_iter_projects(self, prefetch):
+        print("test : iterate over all projects.")
+        projects = _Projects()
+        ids = [project["id"] for project in pagination.iter_projects(projects, page_size=10, prefetch=prefetch)]
+
+        # assert content
+        assert ids == [str(i) for i in range(TOTAL)]
+        assert projects.pages == [1, 2, 3]
+
+    def test_stop_early(self):
+        print("test : stop early.")
+        projects = _Projects()
+        first = list(itertools.islice(pagination.iter_projects(projects, page_size=10), 5))
+
+        # assert content
+        assert [project["id"] for project in first] == ["0", "1", "2", "3", "4"]
+        assert projects.pages == [1]
+
+    @pytest.mark.parametrize("prefetch", [False, True])
+    def test_aiter_clusters(self, prefetch):
+        print("test : iterate over all clusters without total.")
+        projects = _Projects()
+
+        async def run():
+            return [cluster["id"] async for cluster in
+                    pagination.aiter_clusters(projects, "1", page_size=10, prefetch=prefetch)]
+
+        ids = asyncio.run(run())
+
+        # assert content
+        assert ids == [str(i) for i in range(TOTAL)]
+        assert projects.pages == [1, 2, 3]
+
+
+if __name__ == "__main__":
+    pytest.main()
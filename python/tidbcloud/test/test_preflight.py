@@ -0,0 +1,133 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import asyncio
+import time
+
+import pytest
+
+from tidbcloud import catalog, payloads, preflight
+
+ITEM = {
+    "cluster_type": "DEDICATED",
+    "cloud_provider": "AWS",
+    "region": "us-west-2",
+    "tidb": [{"node_size": "4C16G", "node_quantity_range": {"min": 1, "step": 1}},
+             {"node_size": "8C16G", "node_quantity_range": {"min": 1, "step": 1}}],
+    "tikv": [{"node_size": "8C32G", "storage_size_gib_range": {"min": 500, "max": 4096},
+              "node_quantity_range": {"min": 3, "step": 3}}],
+    "tiflash": [{"node_size": "8C64G", "storage_size_gib_range": {"min": 500, "max": 2048},
+                 "node_quantity_range": {"min": 0, "step": 1}}],
+}
+CLUSTER = {
+    "id": "1",
+    "cloud_provider": "AWS",
+    "region": "us-west-2",
+    "config": {
+        "components": {
+            "tidb": {"node_size": "8C16G", "node_quantity": 2},
+            "tikv": {"node_size": "8C32G", "storage_size_gib": 500, "node_quantity": 3},
+            "tiflash": None,
+        }
+    },
+}
+
+
+def _create_payload(tidb_size: str = "8C16G", tikv_quantity: str = "3", tikv_storage: str = "500") -> dict:
+    return {
+        "name": "tidbcloud-sample",
+        "cluster_type": "DEDICATED",
+        "cloud_provider": "AWS",
+        "region": "us-west-2",
+        "config": {
+            "root_password": "input_your_password",
+            "port": 4000,
+            "components": {
+                "tidb": {"node_size": tidb_size, "node_quantity": "1"},
+                "tikv": {"node_size": "8C32G", "storage_size_gib": tikv_storage, "node_quantity": tikv_quantity},
+            },
+        },
+    }
+
+
+class TestPreflight:
+    def setup_method(self):
+        self.region_spec = catalog.RegionSpec(ITEM)
+
+    def test_valid_payloads(self):
+        print("test : valid payloads.")
+        preflight.check_cluster(_create_payload(), self.region_spec)
+        preflight.check_cluster(payloads.restore_payload("1", CLUSTER, "secret"), self.region_spec)
+        preflight.check_modify(payloads.add_tiflash_payload(CLUSTER, ITEM), CLUSTER, self.region_spec)
+
+        # assert content
+        assert preflight.vcpus("8C16G") == 8
+
+    def test_invalid_cluster(self):
+        print("test : invalid create payload.")
+        with pytest.raises(preflight.PreflightError) as e:
+            preflight.check_cluster(_create_payload("16C32G", tikv_quantity="4", tikv_storage="8000"),
+                                    self.region_spec)
+
+        # assert content
+        assert e.value.problems == [
+            "tidb node_size 16C32G not available in AWS us-west-2",
+            "tikv node_quantity 4 should be at least 3 and a multiple of 3",
+            "tikv storage_size_gib 8000 should be between 500 and 4096",
+        ]
+
+    def test_tiflash_on_small_tidb(self):
+        print("test : TiFlash on a 4 vCPUs TiDB.")
+        cluster = {**CLUSTER, "config": {"components": {**CLUSTER["config"]["components"],
+                                                        "tidb": {"node_size": "4C16G", "node_quantity": 2}}}}
+
+        # assert content
+        with pytest.raises(preflight.PreflightError, match="TiFlash is not supported when tidb has 4 vCPUs"):
+            preflight.check_modify(payloads.add_tiflash_payload(cluster, ITEM), cluster, self.region_spec)
+
+    def test_modify_checks_changed_components(self):
+        print("test : only check the changed components.")
+        cluster = {**CLUSTER, "config": {"components": {**CLUSTER["config"]["components"],
+                                                        "tidb": {"node_size": "2C8G", "node_quantity": 2}}}}
+        preflight.check_modify({"config": {"components": {"tikv": {"node_quantity": 6}}}}, cluster, self.region_spec)
+
+        # assert content
+        with pytest.raises(preflight.PreflightError, match="tikv node_quantity 5"):
+            preflight.check_modify({"config": {"components": {"tikv": {"node_quantity": 5}}}}, CLUSTER,
+                                   self.region_spec)
+
+    def test_fast(self):
+        print("test : reject bad plans in microseconds.")
+        payload = _create_payload(tikv_quantity="4")
+        start = time.perf_counter()
+        for _ in range(1000):
+            with pytest.raises(preflight.PreflightError):
+                preflight.check_cluster(payload, self.region_spec)
+
+        # assert content
+        assert (time.perf_counter() - start) / 1000 < 0.001
+
+    def test_async_client(self):
+        httpx = pytest.importorskip("httpx")
+        from tidbcloud.aio import AsyncTiDBCloud
+        print("test : reject before sending with the async client.")
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json={"items": [ITEM]})
+
+        async def run():
+            async with AsyncTiDBCloud("public", "private", host="http://tidbcloud.test",
+                                      http_transport=httpx.MockTransport(handler)) as client:
+                await client.apply("1", "1", {"tikv": {"node_quantity": 4}}, CLUSTER)
+
+        # assert content
+        with pytest.raises(preflight.PreflightError):
+            asyncio.run(run())
+        assert [request.method for request in requests] == ["GET"]
+
+
+if __name__ == "__main__":
+    pytest.main()
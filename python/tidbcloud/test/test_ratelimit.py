@@ -0,0 +1,80 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import asyncio
+import email.utils
+import time
+
+import pytest
+
+from tidbcloud import ratelimit
+from tidbcloud.waiter import Backoff
+
+FAST = Backoff(initial=0.001, maximum=0.001)
+
+
+class TestRateLimiter:
+    def test_token_bucket(self):
+        print("test : token bucket.")
+        bucket = ratelimit.TokenBucket(rate=100, burst=2)
+
+        # assert content
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == pytest.approx(0.01, abs=0.002)
+        assert bucket.reserve() == pytest.approx(0.02, abs=0.002)
+
+    def test_separate_budgets(self):
+        print("test : separate read and write budgets.")
+        limiter = ratelimit.RateLimiter(read_rate=200, write_rate=1, read_burst=1, write_burst=1)
+
+        async def run():
+            await asyncio.gather(*[limiter.aacquire("GET") for _ in range(5)])
+            await limiter.aacquire("POST")
+
+        start = time.monotonic()
+        asyncio.run(run())
+
+        # assert content
+        assert time.monotonic() - start < 0.5
+        metrics = limiter.metrics()
+        assert metrics["throttled_requests"] == 4
+        assert metrics["max_queue_depth"] == 4
+        assert metrics["queue_depth"] == 0
+        assert metrics["throttled_seconds"] > 0
+
+    def test_unlimited(self):
+        print("test : unlimited budget.")
+        limiter = ratelimit.RateLimiter()
+        for _ in range(100):
+            limiter.acquire("GET")
+
+        # assert content
+        assert limiter.metrics()["throttled_requests"] == 0
+
+    def test_retry_delay(self):
+        print("test : retry delay.")
+        limiter = ratelimit.RateLimiter(max_retries=2, backoff=FAST)
+
+        # assert content
+        assert limiter.retry_delay("GET", 200, {}, 0) is None
+        assert limiter.retry_delay("GET", 400, {}, 0) is None
+        assert limiter.retry_delay("GET", 503, {}, 0) == pytest.approx(0.001, abs=0.001)
+        assert limiter.retry_delay("POST", 503, {}, 0) is None
+        assert limiter.retry_delay("POST", 429, {"Retry-After": "2"}, 0) == 2
+        assert limiter.retry_delay("GET", 429, {}, 2) is None
+        assert limiter.metrics()["retries"] == 2
+
+    def test_retry_after_date(self):
+        print("test : Retry-After as a date.")
+        date = email.utils.formatdate(time.time() + 30, usegmt=True)
+
+        # assert content
+        assert 25 < ratelimit.retry_after({"Retry-After": date}) <= 30
+        assert ratelimit.retry_after({"Retry-After": "soon"}) is None
+        assert ratelimit.retry_after({}) is None
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,139 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import asyncio
+import json
+import re
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from tidbcloud import restore  # noqa: E402
+from tidbcloud.aio import AsyncTiDBCloud  # noqa: E402
+from tidbcloud.waiter import AsyncWaiter, Backoff  # noqa: E402
+
+FAST = Backoff(initial=0.001, maximum=0.001)
+SPECIFICATIONS = {
+    "items": [
+        {
+            "cluster_type": "DEDICATED",
+            "tidb": [{"node_size": "8C16G", "node_quantity_range": {"min": 1, "step": 1}}],
+            "tikv": [{"node_size": "8C32G", "storage_size_gib_range": {"min": 500, "max": 4096},
+                      "node_quantity_range": {"min": 3, "step": 3}}],
+        }
+    ]
+}
+
+
+def _cluster(cluster_id: str, status: str = "AVAILABLE") -> dict:
+    return {
+        "id": cluster_id,
+        "status": {"cluster_status": status},
+        "config": {
+            "components": {
+                "tidb": {"node_size": "8C16G", "node_quantity": 2},
+                "tikv": {"node_size": "8C32G", "storage_size_gib": 500, "node_quantity": 3},
+                "tiflash": None,
+            }
+        },
+    }
+
+
+class TestRestore:
+    def setup_method(self):
+        self.backup_pages = []
+        self.restores = []
+        self.polls = {}
+
+    def _handler(self, request):
+        path = request.url.path
+        if path == "/api/v1beta/clusters/provider/regions":
+            return httpx.Response(200, json=SPECIFICATIONS)
+        if path == "/api/v1beta/projects/p1/restores":
+            payload = json.loads(request.content)
+            self.restores.append(payload)
+            return httpx.Response(200, json={"id": f"r-{payload['backup_id']}",
+                                             "cluster_id": f"new-{payload['backup_id']}"})
+        match = re.fullmatch(r"/api/v1beta/projects/p1/clusters/([\w-]+)/backups", path)
+        if match:
+            cluster_id = match.group(1)
+            page = int(request.url.params["page"])
+            self.backup_pages.append((cluster_id, page))
+            if cluster_id == "empty":
+                return httpx.Response(200, json={"items": [], "total": 0})
+            backups = [{"id": f"{cluster_id}-old", "status": "SUCCESS", "create_timestamp": "100"},
+                       {"id": f"{cluster_id}-new", "status": "SUCCESS", "create_timestamp": "300"},
+                       {"id": f"{cluster_id}-failed", "status": "FAILED", "create_timestamp": "400"}]
+            page_size = int(request.url.params["page_size"])
+            items = backups[(page - 1) * page_size:page * page_size]
+            return httpx.Response(200, json={"items": items, "total": len(backups)})
+        cluster_id = re.fullmatch(r"/api/v1beta/projects/p1/clusters/([\w-]+)", path).group(1)
+        if cluster_id.startswith("new-"):
+            self.polls[cluster_id] = self.polls.get(cluster_id, 0) + 1
+            return httpx.Response(200, json=_cluster(cluster_id, "AVAILABLE" if self.polls[cluster_id] >= 3
+                                                     else "RESTORING"))
+        return httpx.Response(200, json=_cluster(cluster_id))
+
+    def _client(self) -> AsyncTiDBCloud:
+        return AsyncTiDBCloud("public", "private", host="http://tidbcloud.test",
+                              http_transport=httpx.MockTransport(self._handler))
+
+    def test_latest_backup(self):
+        print("test : pick the latest successful backup.")
+        backups = [{"id": "1", "status": "SUCCESS", "create_timestamp": "10"},
+                   {"id": "2", "status": "SUCCESS", "create_timestamp": "20"},
+                   {"id": "3", "status": "RUNNING", "create_timestamp": "30"}]
+
+        # assert content
+        assert restore.latest_backup(backups)["id"] == "2"
+        assert restore.latest_backup(backups[2:]) is None
+
+    def test_find_latest_backup_pages(self):
+        print("test : find the latest backup across pages.")
+
+        async def run():
+            async with self._client() as client:
+                return await restore.find_latest_backup(client, "p1", "c1", page_size=1)
+
+        # assert content
+        assert asyncio.run(run())["id"] == "c1-new"
+        assert self.backup_pages == [("c1", 1), ("c1", 2), ("c1", 3)]
+
+    def test_restore_latest(self):
+        print("test : restore the latest backup.")
+        statuses = []
+
+        async def run():
+            async with self._client() as client:
+                return await restore.restore_latest(client, "p1", "c1", "secret", waiter=AsyncWaiter(FAST), timeout=5,
+                                                    on_progress=lambda result: statuses.append(result.status))
+
+        result = asyncio.run(run())
+
+        # assert content
+        assert result.error is None
+        assert (result.backup_id, result.restore_id, result.new_cluster_id) == ("c1-new", "r-c1-new", "new-c1-new")
+        assert statuses == ["FINDING_BACKUP", "SUBMITTED", "RESTORING", "AVAILABLE"]
+        assert self.restores[0]["config"]["components"]["tikv"]["node_quantity"] == 3
+        assert self.restores[0]["config"]["root_password"] == "secret"
+
+    def test_restore_drill(self):
+        print("test : restore drill.")
+
+        async def run():
+            async with self._client() as client:
+                return await restore.restore_drill(client, [("p1", "c1"), ("p1", "c2"), ("p1", "empty")], "secret",
+                                                   max_concurrency=2, waiter=AsyncWaiter(FAST), timeout=5)
+
+        report = asyncio.run(run())
+
+        # assert content
+        assert [result.status for result in report.results] == ["AVAILABLE", "AVAILABLE", "ERROR"]
+        assert "no successful backup" in report.results[2].error
+        assert "clusters : 3, restored : 2" in report.summary()
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,113 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import asyncio
+import datetime
+import re
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from tidbcloud import retention  # noqa: E402
+from tidbcloud.aio import AsyncTiDBCloud  # noqa: E402
+
+NOW = datetime.datetime(2022, 11, 30, 12, tzinfo=datetime.timezone.utc)
+
+
+def _backup(backup_id: str, days_ago: float, status: str = "SUCCESS", name: str = None) -> dict:
+    created = NOW - datetime.timedelta(days=days_ago)
+    return {"id": backup_id, "name": name or f"tidbcloud-backup-{created:%Y-%m-%d}", "type": "MANUAL",
+            "status": status, "create_timestamp": str(int(created.timestamp()))}
+
+
+def _ids(backups: list) -> list:
+    return sorted(backup["id"] for backup in backups)
+
+
+class TestRetention:
+    def setup_method(self):
+        # One backup a day for 30 days, plus a second one today, a failed one and a running one
+        self.backups = [_backup(f"d{days}", days) for days in range(30)]
+        self.backups += [_backup("today", 0.1), _backup("failed", 1.5, "FAILED"), _backup("running", 0, "RUNNING"),
+                         _backup("other", 40, name="nightly"), {**_backup("auto", 40), "type": "AUTO"}]
+
+    def test_backup_time(self):
+        print("test : backup time.")
+
+        # assert content
+        assert retention.backup_time({"name": "tidbcloud-backup-2022-11-01"}) == \
+            datetime.datetime(2022, 11, 1, tzinfo=datetime.timezone.utc)
+        assert retention.backup_time({"name": "nightly"}) is None
+
+    def test_keep_last(self):
+        print("test : keep last.")
+        kept, expired = retention.RetentionPolicy(keep_last=3).plan(self.backups, NOW)
+
+        # assert content
+        assert _ids(kept) == ["d0", "d1", "running", "today"]
+        assert len(expired) == 29
+        assert "other" not in _ids(expired) and "auto" not in _ids(expired)
+
+    def test_keep_daily_and_weekly(self):
+        print("test : keep daily and weekly.")
+        kept, _ = retention.RetentionPolicy(keep_daily=2, keep_weekly=3).plan(self.backups, NOW)
+
+        # assert content
+        # 2022-11-30 is a Wednesday: the newest backups of this week and of the weeks ending on 11-27 and 11-20
+        assert _ids(kept) == ["d0", "d1", "d10", "d3", "running"]
+
+    def test_max_age(self):
+        print("test : max age.")
+        kept, expired = retention.RetentionPolicy(keep_last=1, max_age_days=6.5).plan(self.backups, NOW)
+
+        # assert content
+        assert len(kept) == 10
+        assert _ids(expired) == sorted(f"d{days}" for days in range(7, 30))
+
+    def test_no_rule(self):
+        print("test : no rule keeps everything.")
+        kept, expired = retention.RetentionPolicy().plan(self.backups, NOW)
+
+        # assert content
+        assert expired == []
+        assert len(kept) == 33
+
+    def test_collect_garbage(self):
+        print("test : collect garbage.")
+        deleted = []
+        backups = {f"c{i}": [_backup(f"c{i}-{days}", days) for days in range(5)] for i in range(20)}
+
+        def handler(request):
+            match = re.fullmatch(r"/api/v1beta/projects/p1/clusters/(\w+)/backups(?:/([\w-]+))?", request.url.path)
+            cluster_id, backup_id = match.groups()
+            if request.method == "DELETE":
+                deleted.append(backup_id)
+                return httpx.Response(200, json={})
+            if cluster_id == "broken":
+                return httpx.Response(404, text="cluster not found")
+            return httpx.Response(200, json={"items": backups[cluster_id], "total": len(backups[cluster_id])})
+
+        async def run(dry_run: bool):
+            async with AsyncTiDBCloud("public", "private", host="http://tidbcloud.test",
+                                      http_transport=httpx.MockTransport(handler)) as client:
+                clusters = [("p1", cluster_id) for cluster_id in [*backups, "broken"]]
+                return await retention.collect_garbage(client, retention.RetentionPolicy(keep_last=2), clusters,
+                                                       dry_run=dry_run, max_concurrency=4)
+
+        plan = asyncio.run(run(True))
+
+        # assert content
+        assert len(plan.deletions) == 60
+        assert deleted == []
+        assert plan.kept == 40
+        assert list(plan.errors) == [("p1", "broken")]
+        report = asyncio.run(run(False))
+        assert len(report.deleted) == 60
+        assert sorted(deleted) == sorted(f"c{i}-{days}" for i in range(20) for days in range(2, 5))
+        assert "deleted : 60, failed : 0" in report.summary()
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,137 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import asyncio
+import json
+import re
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from tidbcloud import catalog, scaling  # noqa: E402
+from tidbcloud.aio import AsyncTiDBCloud  # noqa: E402
+from tidbcloud.ratelimit import RateLimiter  # noqa: E402
+from tidbcloud.waiter import AsyncWaiter, Backoff  # noqa: E402
+
+FAST = Backoff(initial=0.001, maximum=0.001)
+SPECIFICATIONS = {
+    "items": [
+        {
+            "cluster_type": "DEDICATED",
+            "cloud_provider": "AWS",
+            "region": "us-west-2",
+            "tiflash": [{"node_size": "8C64G", "storage_size_gib_range": {"min": 500, "max": 2048},
+                         "node_quantity_range": {"min": 0, "step": 2}},
+                        {"node_size": "16C128G", "storage_size_gib_range": {"min": 500, "max": 2048},
+                         "node_quantity_range": {"min": 0, "step": 1}}],
+        }
+    ]
+}
+
+
+def _cluster(cluster_id: str, tiflash: dict = None) -> dict:
+    return {
+        "id": cluster_id,
+        "cloud_provider": "AWS",
+        "region": "us-west-2",
+        "status": {"cluster_status": "AVAILABLE"},
+        "config": {
+            "components": {
+                "tidb": {"node_size": "8C16G", "node_quantity": 2},
+                "tikv": {"node_size": "8C32G", "storage_size_gib": 500, "node_quantity": 3},
+                "tiflash": tiflash,
+            }
+        },
+    }
+
+
+class TestScaling:
+    def setup_method(self):
+        self.clusters = {
+            "1": _cluster("1"),
+            "2": _cluster("2", {"node_size": "8C64G", "storage_size_gib": 1000, "node_quantity": 2}),
+            "3": _cluster("3", {"node_size": "16C128G", "storage_size_gib": 500, "node_quantity": 4}),
+        }
+        self.patches = {}
+        self.polls = {}
+        self.modifying = 0
+        self.max_modifying = 0
+
+    async def _handler(self, request):
+        if request.url.path == "/api/v1beta/clusters/provider/regions":
+            return httpx.Response(200, json=SPECIFICATIONS)
+        cluster_id = re.fullmatch(r"/api/v1beta/projects/p1/clusters/(\w+)", request.url.path).group(1)
+        cluster = self.clusters[cluster_id]
+        if request.method == "PATCH":
+            self.modifying += 1
+            self.max_modifying = max(self.max_modifying, self.modifying)
+            await asyncio.sleep(0.01)
+            self.modifying -= 1
+            tiflash = json.loads(request.content)["config"]["components"]["tiflash"]
+            self.patches[cluster_id] = tiflash
+            cluster["config"]["components"]["tiflash"] = {**(cluster["config"]["components"]["tiflash"] or {}),
+                                                         **tiflash}
+            cluster["status"]["cluster_status"] = "MODIFYING"
+            return httpx.Response(200, json={})
+        if cluster["status"]["cluster_status"] == "MODIFYING":
+            self.polls[cluster_id] = self.polls.get(cluster_id, 0) + 1
+            if self.polls[cluster_id] >= 3:
+                cluster["status"]["cluster_status"] = "AVAILABLE"
+        return httpx.Response(200, json=cluster)
+
+    def _run(self, **kwargs) -> scaling.ScaleReport:
+        async def run():
+            async with AsyncTiDBCloud("public", "private", host="http://tidbcloud.test",
+                                      http_transport=httpx.MockTransport(self._handler),
+                                      limiter=RateLimiter(backoff=FAST)) as client:
+                return await scaling.scale_out_tiflash(client, clusters=[("p1", "1"), ("p1", "2"), ("p1", "3")],
+                                                       waiter=AsyncWaiter(FAST), timeout=5, **kwargs)
+
+        return asyncio.run(run())
+
+    def test_plan(self):
+        print("test : plan the TiFlash quantity.")
+        region_spec = catalog.SpecCatalog(SPECIFICATIONS).require("DEDICATED", "AWS", "us-west-2")
+
+        # assert content
+        assert scaling.plan_tiflash(_cluster("1"), region_spec, delta=1) == ("8C64G", 500, 0, 2)
+        tiflash = {"node_size": "8C64G", "storage_size_gib": 1000, "node_quantity": 2}
+        assert scaling.plan_tiflash(_cluster("2", tiflash), region_spec, delta=1) == ("8C64G", 1000, 2, 4)
+        assert scaling.plan_tiflash(_cluster("2", tiflash), region_spec, target=5) == ("8C64G", 1000, 2, 6)
+        assert scaling.plan_tiflash(_cluster("2", tiflash), region_spec, target=1) == ("8C64G", 1000, 2, 2)
+
+    def test_scale_by_delta(self):
+        print("test : scale out many clusters by a delta.")
+        report = self._run(delta=1, max_concurrency=2)
+
+        # assert content
+        assert [result.status for result in report.results] == ["AVAILABLE"] * 3
+        assert [(result.from_quantity, result.to_quantity) for result in report.results] == [(0, 2), (2, 4), (4, 5)]
+        assert self.patches["1"] == {"node_quantity": 2, "node_size": "8C64G", "storage_size_gib": 500}
+        assert self.patches["2"] == {"node_quantity": 4}
+        assert self.max_modifying == 2
+        assert all(self.polls[cluster_id] == 3 for cluster_id in self.clusters)
+
+    def test_scale_to_target(self):
+        print("test : scale out many clusters to a target.")
+        report = self._run(target=4)
+
+        # assert content
+        assert [result.status for result in report.results] == ["AVAILABLE", "AVAILABLE", "UNCHANGED"]
+        assert sorted(self.patches) == ["1", "2"]
+        assert self.patches["1"]["node_quantity"] == 4
+        assert self.patches["2"] == {"node_quantity": 4}
+        assert "scaled : 2, unchanged : 1, failed : 0" in report.summary()
+
+    def test_target_or_delta(self):
+        print("test : target or delta.")
+
+        # assert content
+        with pytest.raises(Exception, match="target or delta"):
+            self._run(target=2, delta=1)
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,108 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import asyncio
+import json
+
+import pytest
+
+from tidbcloud import shape
+
+SPECIFICATIONS = {
+    "items": [
+        {
+            "cluster_type": "DEDICATED",
+            "tidb": [{"node_size": "8C16G", "node_quantity_range": {"min": 1, "step": 1}}],
+            "tikv": [{"node_size": "8C32G", "storage_size_gib_range": {"min": 500, "max": 4096},
+                      "node_quantity_range": {"min": 3, "step": 3}}],
+        }
+    ]
+}
+CLUSTER = {
+    "id": "1",
+    "config": {
+        "components": {
+            "tidb": {"node_size": "8C16G", "node_quantity": 2},
+            "tikv": {"node_size": "8C32G", "storage_size_gib": 500, "node_quantity": 3},
+            "tiflash": None,
+        }
+    },
+}
+
+
+class TestShape:
+    def test_current_shape(self):
+        print("test : current shape.")
+
+        # assert content
+        assert shape.current_shape(CLUSTER) == {
+            "tidb": {"node_size": "8C16G", "node_quantity": 2},
+            "tikv": {"node_size": "8C32G", "storage_size_gib": 500, "node_quantity": 3},
+            "tiflash": None,
+        }
+
+    def test_no_op(self):
+        print("test : nothing to change.")
+
+        # assert content
+        assert shape.diff_shape(CLUSTER, shape.current_shape(CLUSTER)) == {}
+        assert shape.diff_shape(CLUSTER, {"tidb": {"node_quantity": "2"}, "tikv": {"node_quantity": 3}}) == {}
+        assert shape.diff_shape(CLUSTER, {"tiflash": {"node_quantity": 0}}) == {}
+
+    def test_smallest_change(self):
+        print("test : smallest change.")
+        desired = {
+            "tidb": {"node_size": "8C16G", "node_quantity": 3},
+            "tikv": {"node_quantity": 3, "storage_size_gib": 1000},
+            "tiflash": {"node_size": "8C64G", "storage_size_gib": 500, "node_quantity": "2"},
+        }
+
+        # assert content
+        assert shape.diff_shape(CLUSTER, desired) == {
+            "tidb": {"node_quantity": 3},
+            "tikv": {"storage_size_gib": 1000},
+            "tiflash": {"node_size": "8C64G", "storage_size_gib": 500, "node_quantity": 2},
+        }
+
+    def test_unknown_field(self):
+        print("test : unknown component or field.")
+
+        # assert content
+        with pytest.raises(Exception, match="unknown component :"):
+            shape.diff_shape(CLUSTER, {"pd": {"node_quantity": 3}})
+        with pytest.raises(Exception, match="unknown component field"):
+            shape.diff_shape(CLUSTER, {"tidb": {"quantity": 3}})
+
+    def test_async_apply(self):
+        httpx = pytest.importorskip("httpx")
+        from tidbcloud.aio import AsyncTiDBCloud
+        print("test : apply with the async client.")
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            if request.url.path == "/api/v1beta/clusters/provider/regions":
+                return httpx.Response(200, json=SPECIFICATIONS)
+            return httpx.Response(200, json=CLUSTER if request.method == "GET" else {})
+
+        async def run():
+            async with AsyncTiDBCloud("public", "private", host="http://tidbcloud.test",
+                                      http_transport=httpx.MockTransport(handler)) as client:
+                unchanged = await client.apply("2", "1", {"tidb": {"node_quantity": 2}})
+                changed = await client.apply("2", "1", {"tidb": {"node_quantity": 4}})
+                return unchanged, changed
+
+        unchanged, changed = asyncio.run(run())
+
+        # assert content
+        assert unchanged == {}
+        assert changed == {"tidb": {"node_quantity": 4}}
+        assert [request.url.path.rsplit("/", 1)[-1] for request in requests if request.method == "GET"] == \
+            ["1", "1", "regions"]
+        assert [request.method for request in requests][-1] == "PATCH"
+        assert json.loads(requests[-1].content) == {"config": {"components": {"tidb": {"node_quantity": 4}}}}
+
+
+if __name__ == "__main__":
+    pytest.main()
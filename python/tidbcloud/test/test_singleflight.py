@@ -0,0 +1,111 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tidbcloud import auth, ratelimit, transport
+from tidbcloud.mockserver import MockConfig, MockServer
+from tidbcloud.singleflight import Group
+
+
+class TestSingleflight:
+    def setup_method(self):
+        self.fetches = 0
+        self.release = threading.Event()
+
+    def _fetch(self):
+        self.fetches += 1
+        self.release.wait(5)
+        return {"fetch": self.fetches}
+
+    def _concurrent(self, group: Group, callers: int = 8) -> list:
+        with ThreadPoolExecutor(callers) as executor:
+            futures = [executor.submit(group.do, "key", self._fetch) for _ in range(callers)]
+            # Every caller is waiting on the first fetch before it returns
+            while group.as_dict()["calls"] + group.as_dict()["shared"] < callers:
+                time.sleep(0.001)
+            self.release.set()
+            return [future.result() for future in futures]
+
+    def test_identical_calls(self):
+        print("test : identical calls in flight share one fetch.")
+        group = Group(ttl=0)
+        results = self._concurrent(group)
+        after = group.do("key", self._fetch)
+
+        # assert content
+        assert self.fetches == 2
+        assert all(result is results[0] for result in results)
+        assert after == {"fetch": 2}
+        assert group.as_dict() == {"calls": 2, "shared": 7, "fresh": 0, "saved_ratio": 7 / 9}
+
+    def test_freshness_window(self):
+        print("test : a fresh result is served to the next calls.")
+        group = Group(ttl=60)
+        self.release.set()
+        first = group.do("key", self._fetch)
+        second = group.do("key", self._fetch)
+        group.forget()
+        third = group.do("key", self._fetch)
+
+        # assert content
+        assert first is second
+        assert third == {"fetch": 2}
+        assert group.as_dict()["fresh"] == 1
+
+    def test_shared_error(self):
+        print("test : the error of the fetch is raised to every caller.")
+        group = Group(ttl=60)
+
+        def fail():
+            self.fetches += 1
+            self.release.wait(5)
+            raise Exception("boom")
+
+        with ThreadPoolExecutor(4) as executor:
+            futures = [executor.submit(group.do, "key", fail) for _ in range(4)]
+            while group.as_dict()["calls"] + group.as_dict()["shared"] < 4:
+                time.sleep(0.001)
+            self.release.set()
+            errors = [future.exception() for future in futures]
+
+        # assert content
+        assert self.fetches == 1
+        assert all(str(error) == "boom" for error in errors)
+        # errors are not kept in the freshness window
+        with pytest.raises(Exception, match="boom"):
+            group.do("key", fail)
+        assert self.fetches == 2
+
+    def test_transport(self):
+        print("test : identical GET requests share one response, writes are never merged.")
+        with MockServer(MockConfig(latency=0.05, modify_seconds=0)) as server:
+            project_id, cluster_id = server.state.seed()[0]
+            shared = transport.Transport(limiter=ratelimit.RateLimiter(max_retries=0), singleflight=Group(ttl=0))
+            digest_auth = auth.PreemptiveDigestAuth("public", "private", cache=auth.ChallengeCache())
+            url = f"{server.url}/api/v1beta/projects/{project_id}/clusters/{cluster_id}"
+            shared.get(url, auth=digest_auth)
+            before = server.counters["requests"]
+            with ThreadPoolExecutor(16) as executor:
+                responses = list(executor.map(lambda _: shared.get(url, auth=digest_auth), range(16)))
+            reads = server.counters["requests"] - before
+            with ThreadPoolExecutor(4) as executor:
+                writes = list(executor.map(lambda _: shared.patch(url, auth=digest_auth, json={"config": {
+                    "components": {"tidb": {"node_quantity": 3}}}}), range(4)))
+            shared.close()
+
+        # assert content
+        assert all(resp.status_code == 200 for resp in responses + writes)
+        assert all(resp.json()["id"] == cluster_id for resp in responses)
+        # the first thread sends the request while the others wait for it, a late one may send a second one
+        assert reads <= 2
+        assert server.counters["requests"] - before - reads == 4
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,82 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tidbcloud import ratelimit, transport, waiter
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    rejections = 0
+
+    def do_GET(self):
+        body = b"{}"
+        if type(self).rejections > 0:
+            type(self).rejections -= 1
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTransport:
+    @pytest.fixture()
+    def server_url(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+        server.shutdown()
+        server.server_close()
+
+    def test_reuse_connection(self, server_url):
+        print("test : reuse keep-alive connection.")
+        shared = transport.Transport(pool_connections=1, pool_maxsize=2)
+        for _ in range(3):
+            resp = shared.get(url=f"{server_url}/api/v1beta/projects")
+            assert resp.status_code == 200
+
+        # assert content
+        assert shared.stats.as_dict()["misses"] == 1
+        assert shared.stats.as_dict()["hits"] == 2
+        shared.close()
+
+    def test_retry_rejected_request(self, server_url):
+        print("test : retry rejected request.")
+        _Handler.rejections = 2
+        limiter = ratelimit.RateLimiter(backoff=waiter.Backoff(initial=0.001, maximum=0.001))
+        shared = transport.Transport(limiter=limiter)
+        resp = shared.get(url=f"{server_url}/api/v1beta/projects")
+
+        # assert content
+        assert resp.status_code == 200
+        assert limiter.metrics()["retries"] == 2
+        shared.close()
+
+    def test_shared_transport(self, monkeypatch):
+        print("test : shared transport.")
+        monkeypatch.setenv("TIDBCLOUD_POOL_MAXSIZE", "32")
+        monkeypatch.setattr(transport, "_shared_transport", None)
+
+        # assert content
+        assert transport.get_transport() is transport.get_transport()
+        assert transport.get_transport().pool_maxsize == 32
+        assert transport.configure(pool_maxsize=4).pool_maxsize == 4
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,139 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Unit tests
+"""
+import asyncio
+
+import pytest
+
+from tidbcloud import waiter
+
+FAST = waiter.Backoff(initial=0.001, maximum=0.002)
+
+
+class _Cluster:
+    def __init__(self, ready_after: int):
+        self.calls = 0
+        self.ready_after = ready_after
+
+    def get_cluster_by_id(self, project_id: str, cluster_id: str) -> dict:
+        self.calls += 1
+        status = "AVAILABLE" if self.calls >= self.ready_after else "MODIFYING"
+        return {"id": cluster_id, "project_id": project_id, "status": {"cluster_status": status}}
+
+    async def async_get_cluster_by_id(self, project_id: str, cluster_id: str) -> dict:
+        await asyncio.sleep(0)
+        return self.get_cluster_by_id(project_id, cluster_id)
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"request invalid, code : {status_code}")
+        self.status_code = status_code
+
+
+class TestWaiter:
+    def test_backoff(self):
+        print("test : exponential backoff.")
+        delays = waiter.Backoff(initial=1, maximum=8, jitter=0).delays()
+
+        # assert content
+        assert [next(delays) for _ in range(5)] == [1, 2, 4, 8, 8]
+
+    def test_wait_for_cluster(self):
+        print("test : wait for cluster.")
+        cluster = _Cluster(ready_after=3)
+        detail = waiter.wait_for_cluster(cluster, "1", "2", backoff=FAST, timeout=5)
+
+        # assert content
+        assert detail["status"]["cluster_status"] == "AVAILABLE"
+        assert cluster.calls == 3
+
+    def test_wait_timeout(self):
+        print("test : wait timeout.")
+        cluster = _Cluster(ready_after=10 ** 6)
+        with pytest.raises(TimeoutError):
+            waiter.wait_for_cluster(cluster, "1", "2", backoff=FAST, timeout=0.01)
+
+    def test_wait_for_failed_backup(self):
+        print("test : wait for failed backup.")
+
+        class _Backup:
+            def get_backup_info(self, project_id: str, cluster_id: str, backup_id: str) -> dict:
+                return {"id": backup_id, "status": "FAILED"}
+
+        with pytest.raises(Exception, match="wait failed"):
+            waiter.wait_for_backup(_Backup(), "1", "2", "3", backoff=FAST, timeout=5)
+
+    def test_coalesce_waiters(self):
+        print("test : coalesce waiters.")
+        cluster = _Cluster(ready_after=4)
+        async_waiter = waiter.AsyncWaiter(FAST)
+
+        async def run():
+            return await asyncio.gather(*[
+                async_waiter.wait(("cluster", "1", "2"), lambda: cluster.async_get_cluster_by_id("1", "2"),
+                                  lambda detail: waiter.cluster_status(detail) == "AVAILABLE", timeout=5)
+                for _ in range(50)])
+
+        details = asyncio.run(run())
+
+        # assert content
+        assert len(details) == 50
+        assert cluster.calls == 4
+        assert async_waiter.fetches == 4
+        assert async_waiter.polls == {}
+
+    def test_coalesced_poll_error(self):
+        print("test : retry a failed poll for every waiter.")
+        cluster = _Cluster(ready_after=2)
+        failures = [_StatusError(503), asyncio.TimeoutError()]
+        async_waiter = waiter.AsyncWaiter(FAST)
+
+        async def flaky():
+            if failures:
+                raise failures.pop(0)
+            return await cluster.async_get_cluster_by_id("1", "2")
+
+        async def failing():
+            raise _StatusError(500)
+
+        async def run():
+            return await asyncio.gather(*[
+                async_waiter.wait(("cluster", "1", "2"), flaky,
+                                  lambda detail: waiter.cluster_status(detail) == "AVAILABLE", timeout=5)
+                for _ in range(10)])
+
+        async def run_failing():
+            return await async_waiter.wait(("cluster", "1", "3"), failing, lambda detail: True, timeout=0.05)
+
+        details = asyncio.run(run())
+
+        # assert content
+        assert len(details) == 10
+        assert async_waiter.fetches == 4
+        with pytest.raises(TimeoutError, match="last error : request invalid, code : 500"):
+            asyncio.run(run_failing())
+
+    def test_coalesced_poll_not_found(self):
+        print("test : fail every waiter on an error that cannot clear.")
+        async_waiter = waiter.AsyncWaiter(FAST)
+
+        async def deleted():
+            raise _StatusError(404)
+
+        async def run():
+            return await asyncio.gather(*[
+                async_waiter.wait(("backup", "1", "2", "3"), deleted, lambda backup: True, timeout=5)
+                for _ in range(10)], return_exceptions=True)
+
+        errors = asyncio.run(run())
+
+        # assert content
+        assert [error.status_code for error in errors] == [404] * 10
+        assert async_waiter.fetches == 1
+        assert async_waiter.polls == {}
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,284 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to share one keep-alive HTTP session between all the sample clients,
+so that consecutive API calls reuse the TCP and TLS connection to the TiDB Cloud API
+instead of paying a new handshake each time.
+"""
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from . import breaker as circuit_breaker
+from . import ratelimit
+from .hedge import HedgePolicy
+from .metrics import Metrics, RequestEvent, get_metrics
+from .singleflight import Group
+
+# Basic config
+HOST = os.environ.get("TIDBCLOUD_HOST", "https://api.tidbcloud.com")
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+# The GET requests merged with an identical one in flight, other arguments such as `stream` are never merged
+_COALESCED_ARGUMENTS = {"auth", "headers", "timeout"}
+
+
+class PoolStats:
+    def __init__(self):
+        """
+        Counters of the connection pool usage
+        `hits` is the number of requests sent on a reused connection,
+        `misses` is the number of requests that had to open a new connection.
+        """
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, reused: bool):
+        with self._lock:
+            if reused:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+
+_phases = threading.local()
+
+
+def _record_phase(phase: str, seconds: float):
+    phases = getattr(_phases, "current", None)
+    if phases is not None:
+        phases[phase] = phases.get(phase, 0.0) + seconds
+
+
+def _timed(connection_cls):
+    class _TimedConnection(connection_cls):
+        """
+        Connection recording the TCP connect and the TLS handshake durations of the current request
+        """
+        _connect_seconds = 0.0
+
+        def _new_conn(self):
+            start = time.perf_counter()
+            try:
+                return super()._new_conn()
+            finally:
+                self._connect_seconds = time.perf_counter() - start
+                _record_phase("connect", self._connect_seconds)
+
+        def connect(self):
+            start = time.perf_counter()
+            super().connect()
+            if isinstance(self, HTTPSConnection):
+                _record_phase("tls", max(0.0, time.perf_counter() - start - self._connect_seconds))
+
+    return _TimedConnection
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _timed(HTTPConnection)
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _timed(HTTPSConnection)
+
+
+def _size(body) -> int:
+    if body is None:
+        return 0
+    return len(body.encode()) if isinstance(body, str) else len(body)
+
+
+class _CountingAdapter(HTTPAdapter):
+    def __init__(self, stats: PoolStats, **kwargs):
+        """
+        HTTP adapter that records whether each request reused a pooled connection
+        :param stats: The stats to update
+        """
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TimedHTTPConnectionPool,
+                                                   "https": _TimedHTTPSConnectionPool}
+
+    def send(self, request, **kwargs):
+        pool = self.get_connection(request.url, kwargs.get("proxies"))
+        opened_before = pool.num_connections
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            self.stats.record(pool.num_connections == opened_before)
+
+
+class Transport:
+    def __init__(self, pool_connections: int = None, pool_maxsize: int = None, pool_block: bool = False,
+                 limiter: ratelimit.RateLimiter = None, metrics: Metrics = None, singleflight: Group = None,
+                 hedge: HedgePolicy = None, breaker: circuit_breaker.CircuitBreaker = None):
+        """
+        Keep-alive session with a bounded connection pool
+        :param pool_connections: The number of per-host pools to keep (env TIDBCLOUD_POOL_CONNECTIONS)
+        :param pool_maxsize: The maximum number of connections kept per host (env TIDBCLOUD_POOL_MAXSIZE)
+        :param pool_block: Whether to wait for a free connection when the per-host limit is reached
+        :param limiter: The rate limiter, the shared one if None
+        :param metrics: The request metrics, the shared ones if None
+        :param singleflight: Merges the identical GET requests of concurrent threads, a new group if None,
+                             none when TIDBCLOUD_SINGLEFLIGHT is 0
+        :param hedge: Sends a second request for the slow GET requests, from the environment if None,
+                      see tidbcloud.hedge
+        :param breaker: The circuit breaker, the shared one if None
+        """
+        self.limiter = limiter
+        self.metrics = metrics
+        self.hedge = hedge or HedgePolicy.from_environment()
+        self.breaker = breaker
+        if singleflight is None and os.environ.get("TIDBCLOUD_SINGLEFLIGHT", "1") != "0":
+            singleflight = Group()
+        self.singleflight = singleflight
+        if pool_connections is None:
+            pool_connections = int(os.environ.get("TIDBCLOUD_POOL_CONNECTIONS", DEFAULT_POOL_CONNECTIONS))
+        if pool_maxsize is None:
+            pool_maxsize = int(os.environ.get("TIDBCLOUD_POOL_MAXSIZE", DEFAULT_POOL_MAXSIZE))
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.stats = PoolStats()
+        self.session = requests.Session()
+        adapter = _CountingAdapter(self.stats,
+                                   pool_connections=pool_connections,
+                                   pool_maxsize=pool_maxsize,
+                                   pool_block=pool_block)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.models.Response:
+        """
+        Send a request on the shared session, within the rate limit
+        Requests rejected with 429 or a 5xx status are retried, see tidbcloud.ratelimit.
+        A GET identical to one in flight shares its response, see tidbcloud.singleflight.
+        A slow GET may be sent twice, see tidbcloud.hedge, and the requests to an endpoint failing most of
+        the time raise breaker.CircuitOpenError without being sent, see tidbcloud.breaker.
+        :param method: The HTTP method
+        :param url: The request url
+        :return: The response
+        """
+        if method.upper() != "GET":
+            if self.singleflight is None:
+                return self._request(method, url, **kwargs)
+            self.singleflight.forget()
+            try:
+                return self._request(method, url, **kwargs)
+            finally:
+                # A read sent during the write may have seen the previous state
+                self.singleflight.forget()
+        if self.singleflight is None or not kwargs.keys() <= _COALESCED_ARGUMENTS:
+            return self._read(method, url, **kwargs)
+        headers = kwargs.get("headers") or {}
+        key = (url, getattr(kwargs.get("auth"), "username", None), tuple(sorted(headers.items())))
+        return self.singleflight.do(key, lambda: self._read(method, url, **kwargs))
+
+    def _read(self, method: str, url: str, **kwargs) -> requests.models.Response:
+        if self.hedge is None:
+            return self._request(method, url, **kwargs)
+        return self.hedge.call(method, url, lambda: self._request(method, url, **kwargs),
+                               self.metrics or get_metrics(), discard=requests.models.Response.close)
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.models.Response:
+        limiter = self.limiter or ratelimit.get_rate_limiter()
+        breaker = self.breaker or circuit_breaker.get_circuit_breaker()
+        metrics = self.metrics or get_metrics()
+        attempt = 0
+        while True:
+            breaker.check(method, url, metrics)
+            limiter.acquire(method)
+            try:
+                resp = self._send(method, url, **kwargs)
+            except Exception:
+                breaker.record(method, url, True, metrics)
+                raise
+            breaker.record(method, url, resp.status_code >= 500, metrics)
+            delay = limiter.retry_delay(method, resp.status_code, resp.headers, attempt)
+            if delay is None:
+                return resp
+            resp.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.models.Response:
+        """
+        Send one request and record its latency, size and connection phases, see tidbcloud.metrics
+        """
+        metrics = self.metrics or get_metrics()
+        _phases.current = phases = {}
+        start = time.perf_counter()
+        try:
+            resp = self.session.request(method=method, url=url, **kwargs)
+        except Exception as e:
+            metrics.record(RequestEvent(method, url, seconds=time.perf_counter() - start, phases=phases, error=e))
+            raise
+        finally:
+            _phases.current = None
+        seconds = time.perf_counter() - start
+        # elapsed runs from sending the request to parsing the response headers, connection setup included
+        phases["ttfb"] = max(0.0, resp.elapsed.total_seconds() - phases.get("connect", 0.0) - phases.get("tls", 0.0))
+        metrics.record(RequestEvent(method, url, resp.status_code, seconds, _size(resp.request.body),
+                                    len(resp.content), phases))
+        return resp
+
+    def get(self, url: str, **kwargs) -> requests.models.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.models.Response:
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.models.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.models.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_shared_transport = None
+_shared_lock = threading.Lock()
+
+
+def get_transport() -> Transport:
+    """
+    Get the transport shared by every client in the process
+    :return: The shared transport
+    """
+    global _shared_transport
+    with _shared_lock:
+        if _shared_transport is None:
+            _shared_transport = Transport()
+        return _shared_transport
+
+
+def configure(**kwargs) -> Transport:
+    """
+    Replace the shared transport, e.g. to change the pool size
+    Clients created before this call keep using the previous transport.
+    :return: The new shared transport
+    """
+    global _shared_transport
+    with _shared_lock:
+        _shared_transport = Transport(**kwargs)
+        return _shared_transport
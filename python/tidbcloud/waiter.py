@@ -0,0 +1,244 @@
+# Copyright(C) 2022 PingCAP. All Rights Reserved.
+"""
+Purpose
+
+Shows how to wait until a cluster or a backup reaches a status without hand-written polling loops.
+Polls back off exponentially with jitter until a deadline, and concurrent async waiters on the same
+resource share a single poller, so many flows blocking on one cluster cost one stream of API calls.
+A transient failure of the shared poller, e.g. a 5xx error or a timeout, is logged and retried until the deadlines,
+while the errors that cannot clear, e.g. a 404 for a deleted cluster or an open circuit, fail every waiter at once.
+"""
+import random
+import time
+
+from . import log
+
+DEFAULT_TIMEOUT = 3600
+CLUSTER_AVAILABLE = "AVAILABLE"
+BACKUP_SUCCESS = "SUCCESS"
+BACKUP_FAILED = "FAILED"
+
+
+class Backoff:
+    def __init__(self, initial: float = 1, maximum: float = 30, multiplier: float = 2, jitter: float = 0.5):
+        """
+        Exponential backoff with jitter
+        :param initial: The first delay in seconds
+        :param maximum: The maximum delay in seconds
+        :param multiplier: The growth factor between two delays
+        :param jitter: The fraction of each delay that is randomized, between 0 and 1
+        """
+        self.initial = initial
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.jitter = jitter
+
+    def delays(self):
+        delay = self.initial
+        while True:
+            yield random.uniform(delay * (1 - self.jitter), delay)
+            delay = min(self.maximum, delay * self.multiplier)
+
+
+def cluster_status(cluster: dict) -> str:
+    return (cluster.get("status") or {}).get("cluster_status")
+
+
+def backup_status(backup: dict) -> str:
+    return backup.get("status")
+
+
+def _created(backup: dict) -> int:
+    try:
+        return int(backup.get("create_timestamp") or 0)
+    except ValueError:
+        return 0
+
+
+def latest_backup(backups) -> dict:
+    """
+    :param backups: Iterable of backups
+    :return: The newest successful backup, None if there is none
+    """
+    return max((backup for backup in backups if backup_status(backup) == BACKUP_SUCCESS), key=_created, default=None)
+
+
+def _transient(error: Exception) -> bool:
+    """
+    Whether a failed poll may succeed when retried
+    :param error: The error raised by the fetch
+    :return: True for a 429 or 5xx status, a connection error or a timeout
+    """
+    import asyncio
+
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        # e.g. aio.ApiError
+        return status_code == 429 or status_code >= 500
+    if isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    try:
+        import httpx
+    except ImportError:
+        return False
+    return isinstance(error, httpx.TransportError)
+
+
+def wait_until(fetch, ready, failed=None, backoff: Backoff = None, timeout: float = DEFAULT_TIMEOUT):
+    """
+    Call `fetch` until `ready` accepts its result
+    Each call polls on its own: only AsyncWaiter shares one poller between the waits on a resource.
+    :param fetch: Function returning the resource, e.g. the cluster detail
+    :param ready: Predicate on the resource
+    :param failed: Predicate on the resource telling the wait can never succeed
+    :param backoff: The backoff between two fetches
+    :param timeout: Seconds to wait
+    :return: The first resource accepted by `ready`
+    """
+    deadline = time.monotonic() + timeout
+    for delay in (backoff or Backoff()).delays():
+        resource = fetch()
+        if ready(resource):
+            return resource
+        if failed is not None and failed(resource):
+            raise Exception(f"wait failed, resource : {resource}")
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"wait timed out after {timeout}s, resource : {resource}")
+        time.sleep(min(delay, remaining))
+
+
+def wait_for_cluster(client, project_id: str, cluster_id: str, status: str = CLUSTER_AVAILABLE,
+                     backoff: Backoff = None, timeout: float = DEFAULT_TIMEOUT) -> dict:
+    """
+    Wait until the cluster status is `status`, using a sample client
+    :return: The cluster detail
+    """
+    return wait_until(lambda: client.get_cluster_by_id(project_id, cluster_id),
+                      lambda cluster: cluster_status(cluster) == status,
+                      backoff=backoff, timeout=timeout)
+
+
+def wait_for_backup(client, project_id: str, cluster_id: str, backup_id: str,
+                    backoff: Backoff = None, timeout: float = DEFAULT_TIMEOUT) -> dict:
+    """
+    Wait until the backup succeeds, using a sample client
+    :return: The backup detail
+    """
+    return wait_until(lambda: client.get_backup_info(project_id, cluster_id, backup_id),
+                      lambda backup: backup_status(backup) == BACKUP_SUCCESS,
+                      lambda backup: backup_status(backup) == BACKUP_FAILED,
+                      backoff=backoff, timeout=timeout)
+
+
+class _Poll:
+    def __init__(self):
+        """
+        Waiters sharing the poller of one resource, as [(ready, failed, future)]
+        """
+        self.waiters = []
+        self.task = None
+        # The error of the last poll, None once a poll succeeds
+        self.error = None
+
+
+class AsyncWaiter:
+    def __init__(self, backoff: Backoff = None):
+        """
+        Coalesces concurrent waits on the same resource into a single poller
+        :param backoff: The backoff between two polls
+        """
+        self.backoff = backoff or Backoff()
+        self.polls = {}
+        self.fetches = 0
+
+    async def wait(self, key, fetch, ready, failed=None, timeout: float = DEFAULT_TIMEOUT):
+        """
+        Wait until `ready` accepts the resource polled by `fetch`
+        :param key: The resource identity, waiters with the same key share one poller
+        :param fetch: Coroutine function returning the resource
+        :param ready: Predicate on the resource
+        :param failed: Predicate on the resource telling the wait can never succeed
+        :param timeout: Seconds to wait
+        :return: The first resource accepted by `ready`
+        """
+        import asyncio
+
+        future = asyncio.get_running_loop().create_future()
+        poll = self.polls.get(key)
+        if poll is None:
+            poll = self.polls[key] = _Poll()
+            poll.task = asyncio.ensure_future(self._poll(key, poll, fetch))
+        waiter = (ready, failed, future)
+        poll.waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            last_error = f", last error : {poll.error}" if poll.error is not None else ""
+            raise TimeoutError(f"wait for {key} timed out after {timeout}s{last_error}")
+        finally:
+            if waiter in poll.waiters:
+                poll.waiters.remove(waiter)
+
+    async def _poll(self, key, poll: _Poll, fetch):
+        import asyncio
+
+        try:
+            for delay in self.backoff.delays():
+                if not poll.waiters:
+                    # Every waiter timed out or was cancelled while sleeping
+                    return
+                try:
+                    self.fetches += 1
+                    resource = await fetch()
+                except Exception as e:
+                    if not _transient(e):
+                        for _, _, future in poll.waiters:
+                            if not future.done():
+                                future.set_exception(e)
+                        poll.waiters.clear()
+                        return
+                    # A transient error must not fail every waiter, they give up at their own deadline
+                    log.logger.warning("wait for %s : poll failed, retrying! exception: %s", key, e)
+                    poll.error = e
+                    await asyncio.sleep(delay)
+                    continue
+                poll.error = None
+                for waiter in list(poll.waiters):
+                    ready, failed, future = waiter
+                    if future.done():
+                        continue
+                    if ready(resource):
+                        future.set_result(resource)
+                    elif failed is not None and failed(resource):
+                        future.set_exception(Exception(f"wait failed, resource : {resource}"))
+                poll.waiters[:] = [waiter for waiter in poll.waiters if not waiter[2].done()]
+                if not poll.waiters:
+                    return
+                await asyncio.sleep(delay)
+        finally:
+            if self.polls.get(key) is poll:
+                del self.polls[key]
+
+    async def wait_for_cluster(self, client, project_id: str, cluster_id: str, status: str = CLUSTER_AVAILABLE,
+                               timeout: float = DEFAULT_TIMEOUT) -> dict:
+        """
+        Wait until the cluster status is `status`, using the async client
+        :return: The cluster detail
+        """
+        return await self.wait(("cluster", project_id, cluster_id),
+                               lambda: client.get_cluster_by_id(project_id, cluster_id),
+                               lambda cluster: cluster_status(cluster) == status,
+                               timeout=timeout)
+
+    async def wait_for_backup(self, client, project_id: str, cluster_id: str, backup_id: str,
+                              timeout: float = DEFAULT_TIMEOUT) -> dict:
+        """
+        Wait until the backup succeeds, using the async client
+        :return: The backup detail
+        """
+        return await self.wait(("backup", project_id, cluster_id, backup_id),
+                               lambda: client.get_backup_info(project_id, cluster_id, backup_id),
+                               lambda backup: backup_status(backup) == BACKUP_SUCCESS,
+                               lambda backup: backup_status(backup) == BACKUP_FAILED,
+                               timeout=timeout)